@@ -1,12 +1,29 @@
 import argparse
 from base64 import urlsafe_b64encode
-from json import loads
-from os.path import expandvars
+from json import dumps, loads
+from os import cpu_count, environ
+from os.path import expandvars, isfile
 import re
-from typing import Tuple, Union
+import signal
+import sys
+from threading import Event
+from types import FrameType
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
 
-from .caller import Caller, FailedAPICall, HTTPMethod
+from .body import BodyMode, BodyPolicy, DEFAULT_MAX_BYTES
+from .breaker import default_breakers, enable_breakers
+from .cache import enable_cache
+from .caller import Caller, CallPlan, FailedAPICall, HTTPMethod, HTTPResponse
+from .coalesce import enable_coalescing
+from .dns import default_dns, DNS_PREFETCH, enable_dns_cache
+from .encoding import check_compression, COMPRESS_MIN_BYTES, Compression
+from .http2 import check_http2
+from .load import DEFAULT_MAX_IN_FLIGHT, parse_rate
 from .logging import getLogger
+from .manifest import ManifestEntry, ManifestResult
+from .results import DEFAULT_RESULT_FIELDS, ResultField, ResultFields, ResultWriter
+from .retry import RetryPolicy, RetryStrategy
+from .timing import TimingHistograms
 
 logger = getLogger(__name__)
 
@@ -43,14 +60,30 @@ def kvp_type(value: str) -> Tuple[str, str]:
     )
 
 
-def get_cli_args() -> argparse.Namespace:
+def rate_type(value: str) -> float:
+    try:
+        return parse_rate(value)
+    except ValueError as err:
+        raise argparse.ArgumentTypeError(str(err))
+
+
+def period_type(value: str) -> float:
+    from .history import parse_period
+
+    try:
+        return parse_period(value)
+    except ValueError as err:
+        raise argparse.ArgumentTypeError(str(err))
+
+
+def get_cli_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser()
     parser.add_argument(
         "-u",
         "--host",
         type=str,
         help="Host to call (can use env vars)",
-        required=True,
+        default=None,
     )
     parser.add_argument(
         "-p",
@@ -111,6 +144,19 @@ def get_cli_args() -> argparse.Namespace:
         help="Request body as a json string (can use env vars)",
         default=None,
     )
+    parser.add_argument(
+        "--compress",
+        type=str,
+        choices=[compression.value for compression in Compression],
+        help="Compress request bodies (zstd needs the zstandard package)",
+        default=None,
+    )
+    parser.add_argument(
+        "--compress-min-bytes",
+        type=int,
+        help=f"Only compress request bodies of at least this many bytes (default: {COMPRESS_MIN_BYTES})",
+        default=COMPRESS_MIN_BYTES,
+    )
     parser.add_argument(
         "-t",
         "--timeout",
@@ -141,6 +187,32 @@ def get_cli_args() -> argparse.Namespace:
         help=f"HTTP response codes to fail on (matching \\{HTTP_CODE_PATTERN.pattern}\\)",
         default=[0, "50X"],
     )
+    parser.add_argument(
+        "--retry-strategy",
+        type=str,
+        choices=[s.value for s in RetryStrategy],
+        help="How to space out retries (default: exponential, or $RETRY_STRATEGY)",
+        default=None,
+    )
+    parser.add_argument(
+        "--retry-max-delay",
+        type=float,
+        help="Longest wait between attempts in seconds (default: 300, or $RETRY_MAX_DELAY)",
+        default=None,
+    )
+    parser.add_argument(
+        "--ignore-retry-after",
+        help="Don't wait as long as Retry-After or RateLimit-Reset response headers ask",
+        default=False,
+        action="store_true",
+    )
+    parser.add_argument(
+        "-d",
+        "--deadline",
+        type=float,
+        help="Seconds for all attempts together; per-attempt timeouts shrink to fit",
+        default=None,
+    )
     parser.add_argument(
         "-k",
         "--insecure",
@@ -148,14 +220,208 @@ def get_cli_args() -> argparse.Namespace:
         default=False,
         action="store_true",
     )
+    parser.add_argument(
+        "--response-body",
+        type=str,
+        choices=[m.value for m in BodyMode],
+        help="How to read response bodies; all but 'full' stream in constant memory",
+        default=BodyMode.FULL.value,
+    )
+    parser.add_argument(
+        "--response-max-bytes",
+        type=int,
+        help="Bytes of the response body to keep with --response-body truncate",
+        default=DEFAULT_MAX_BYTES,
+    )
+    parser.add_argument(
+        "--response-file",
+        type=str,
+        help="File to stream the response body to with --response-body file (can use env vars)",
+        default=None,
+    )
     parser.add_argument(
         "--quiet",
         help="Don't log the response",
         default=False,
         action="store_true",
     )
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        help="Directory to cache GET responses in, so repeat calls can be conditional (ETag/Last-Modified)",
+        default=None,
+    )
+    parser.add_argument(
+        "--history-file",
+        type=str,
+        help="SQLite file to record every attempt in, for `caller history` (default: $HISTORY_FILE)",
+        default=None,
+    )
+    parser.add_argument(
+        "--coalesce",
+        help="Make identical concurrent GET/HEAD calls once, sharing the response",
+        default=False,
+        action="store_true",
+    )
+    parser.add_argument(
+        "--dns-cache",
+        help="Resolve each host once per $DNS_CACHE_TTL seconds, instead of per connection",
+        default=False,
+        action="store_true",
+    )
+    parser.add_argument(
+        "--http2",
+        help="Speak HTTP/2, multiplexing concurrent calls to a host over one connection",
+        default=False,
+        action="store_true",
+    )
+    parser.add_argument(
+        "--h2c",
+        help="With --http2, speak HTTP/2 to plain-HTTP hosts too (they must support it)",
+        default=False,
+        action="store_true",
+    )
+    parser.add_argument(
+        "--circuit-breaker",
+        help="Fail calls fast while their host keeps failing, and adapt concurrency per host",
+        default=False,
+        action="store_true",
+    )
+    add_result_arguments(parser)
+    parser.add_argument(
+        "--timings-file",
+        type=str,
+        help="JSON file to merge per-phase latency histograms into, so they add up across runs",
+        default=None,
+    )
+    parser.add_argument(
+        "--metrics-file",
+        type=str,
+        help="File to write Prometheus metrics to at exit (eg, for node_exporter's textfile collector)",
+        default=None,
+    )
+    parser.add_argument(
+        "--metrics-push-url",
+        type=str,
+        help="Prometheus Pushgateway to push metrics to at exit",
+        default=None,
+    )
+    parser.add_argument(
+        "--metrics-job",
+        type=str,
+        help="Job name to push metrics under",
+        default="caller",
+    )
+    parser.add_argument(
+        "-M",
+        "--manifest",
+        type=str,
+        help="JSON, JSON-lines, or YAML file of calls to make instead of a single call",
+        default=None,
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        help="Maximum number of manifest calls in flight at once (per process)",
+        default=4,
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        help="Worker processes to run a manifest in, sharded by host (0 for one per CPU)",
+        default=1,
+    )
+    parser.add_argument(
+        "--rate",
+        type=rate_type,
+        help="Make the call this often (eg, 50/s or 600/m) for --duration, without waiting on responses",
+        default=None,
+    )
+    parser.add_argument(
+        "--duration",
+        type=float,
+        help="Seconds to make calls for at --rate",
+        default=None,
+    )
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        help="Maximum number of --rate calls in flight at once; beyond it, calls start late",
+        default=DEFAULT_MAX_IN_FLIGHT,
+    )
+    return parser
+
 
-    args = parser.parse_args()
+def add_result_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--results-file",
+        type=str,
+        help="File to append responses to as JSON lines (- for stdout), instead of logging them",
+        default=None,
+    )
+    parser.add_argument(
+        "--result-fields",
+        type=str,
+        nargs="+",
+        choices=[f.value for f in ResultField],
+        help="Parts of each response to write to the results file",
+        default=[f.value for f in DEFAULT_RESULT_FIELDS],
+    )
+    parser.add_argument(
+        "--result-headers",
+        type=str,
+        nargs="+",
+        help="Only write these response headers to the results file (default: all)",
+        default=None,
+    )
+    parser.add_argument(
+        "--result-max-body",
+        type=int,
+        help="Characters of each response body to write to the results file (default: all)",
+        default=None,
+    )
+
+
+def check_http2_args(parser: argparse.ArgumentParser, args: argparse.Namespace) -> None:
+    if args.h2c and not args.http2:
+        parser.error("--h2c needs --http2")
+    if args.http2:
+        try:
+            check_http2()
+        except ValueError as err:
+            parser.error(str(err))
+
+
+def get_cli_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = get_cli_parser()
+    args = parser.parse_args(argv)
+    if (args.rate is None) != (args.duration is None):
+        parser.error("--rate and --duration go together")
+    if args.duration is not None and args.duration <= 0:
+        parser.error("--duration must be positive")
+    if args.max_in_flight < 1:
+        parser.error("--max-in-flight must be at least 1")
+    if args.processes < 0:
+        parser.error("--processes can't be negative")
+    if args.processes == 0:
+        args.processes = cpu_count() or 1
+    if args.processes > 1 and args.manifest is None:
+        parser.error("--processes needs -M/--manifest")
+    check_http2_args(parser, args)
+    if args.manifest is not None:
+        if args.rate is not None:
+            parser.error("--rate can't be used with -M/--manifest")
+        return args
+    if args.host is None:
+        parser.error("the following arguments are required: -u/--host (or -M/--manifest)")
+    if args.response_body == BodyMode.FILE.value and not args.response_file:
+        parser.error("--response-file is required with --response-body file")
+    if args.compress is not None:
+        try:
+            check_compression(Compression(args.compress))
+        except ValueError as err:
+            parser.error(str(err))
     if args.port is None:
         args.port = 80 if args.insecure else 443
     if args.auth is not None:
@@ -185,28 +451,550 @@ def get_cli_args() -> argparse.Namespace:
     return args
 
 
+def args_from_mapping(values: Dict[str, Any]) -> List[str]:
+    """Render helm-style "args" values as CLI arguments (mirrors the chart's _args.tpl)"""
+    argv = ["--host", str(values["host"])]
+    if values.get("port"):
+        argv += ["--port", str(values["port"])]
+    if values.get("path"):
+        argv += ["--path", str(values["path"])]
+    if values.get("body"):
+        body = values["body"]
+        argv += ["--body", body if isinstance(body, str) else dumps(body)]
+    if values.get("compress"):
+        argv += ["--compress", str(values["compress"])]
+    if values.get("compress_min_bytes") is not None:
+        argv += ["--compress-min-bytes", str(values["compress_min_bytes"])]
+    for flag, key in (("--params", "params"), ("--headers", "headers")):
+        items = values.get(key)
+        if not items:
+            continue
+        if isinstance(items, dict):
+            items = [{"name": k, "value": v} for k, v in items.items()]
+        argv += [flag] + [f"{item['name']}={item['value']}" for item in items]
+    argv += ["--method", str(values.get("method") or "get")]
+    if values.get("auth"):
+        argv += ["--auth", values["auth"]["type"], "--credentials", values["auth"]["credentials"]]
+    if values.get("timeout"):
+        argv += ["--timeout", str(values["timeout"])]
+    argv += ["--retries", str(values.get("retries") or 0)]
+    if values.get("retry_on"):
+        argv += ["--retry-on-codes"] + [str(code) for code in values["retry_on"]]
+    if values.get("fail_on"):
+        argv += ["--fail-on-codes"] + [str(code) for code in values["fail_on"]]
+    if values.get("retry_strategy"):
+        argv += ["--retry-strategy", str(values["retry_strategy"])]
+    if values.get("retry_max_delay"):
+        argv += ["--retry-max-delay", str(values["retry_max_delay"])]
+    if values.get("ignore_retry_after"):
+        argv.append("--ignore-retry-after")
+    if values.get("deadline"):
+        argv += ["--deadline", str(values["deadline"])]
+    if values.get("insecure"):
+        argv.append("--insecure")
+    if values.get("response_body"):
+        argv += ["--response-body", str(values["response_body"])]
+    if values.get("response_max_bytes"):
+        argv += ["--response-max-bytes", str(values["response_max_bytes"])]
+    if values.get("response_file"):
+        argv += ["--response-file", str(values["response_file"])]
+    if values.get("quiet"):
+        argv.append("--quiet")
+    return argv
+
+
+def call_plan(args: argparse.Namespace) -> CallPlan:
+    return CallPlan(
+        host=args.host,
+        port=args.port,
+        insecure=args.insecure,
+        method=HTTPMethod(args.method.upper()),
+        path=args.path,
+        params=args.params,
+        headers=args.headers,
+        body=args.body,
+        timeout=args.timeout,
+        retries=args.retries,
+        retry_on=args.retry_on_codes,
+        fail_on=args.fail_on_codes,
+        body_policy=BodyPolicy(
+            mode=BodyMode(args.response_body),
+            max_bytes=args.response_max_bytes,
+            path=args.response_file,
+        ),
+        retry_policy=retry_policy(args),
+        compression=Compression(args.compress) if args.compress else None,
+        compress_min_bytes=args.compress_min_bytes,
+    )
+
+
+def retry_policy(args: argparse.Namespace) -> RetryPolicy:
+    # unset options keep the policy's (environment) defaults
+    options: Dict[str, Any] = {"deadline": args.deadline}
+    if args.retry_strategy is not None:
+        options["strategy"] = RetryStrategy(args.retry_strategy)
+    if args.retry_max_delay is not None:
+        options["max_delay"] = args.retry_max_delay
+    if args.ignore_retry_after:
+        options["honor_retry_after"] = False
+    return RetryPolicy(**options)
+
+
+def call(
+    args: argparse.Namespace, cancel: Optional[Event] = None, plan: Optional[CallPlan] = None
+) -> List[HTTPResponse]:
+    return Caller(
+        host=args.host,
+        port=args.port,
+        insecure=args.insecure,
+    ).execute(plan or call_plan(args), cancel)
+
+
+def get_serve_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="caller serve")
+    parser.add_argument(
+        "-s",
+        "--schedules",
+        type=str,
+        help="JSON or YAML file listing schedules (cron expression plus call arguments)",
+        required=True,
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        help="Maximum number of calls in flight at once",
+        default=16,
+    )
+    parser.add_argument(
+        "--timings-file",
+        type=str,
+        help="JSON file to merge per-phase latency histograms into on shutdown",
+        default=None,
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        help="Port to serve Prometheus metrics on (at /metrics)",
+        default=None,
+    )
+    add_result_arguments(parser)
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        help="Directory to cache GET responses in, so repeat calls can be conditional (ETag/Last-Modified)",
+        default=None,
+    )
+    parser.add_argument(
+        "--history-file",
+        type=str,
+        help="SQLite file to record every attempt in, for `caller history` (default: $HISTORY_FILE)",
+        default=None,
+    )
+    parser.add_argument(
+        "--coalesce",
+        help="Make identical concurrent GET/HEAD calls once, sharing the response",
+        default=False,
+        action="store_true",
+    )
+    parser.add_argument(
+        "--dns-cache",
+        help="Resolve each host once per $DNS_CACHE_TTL seconds, instead of per connection",
+        default=False,
+        action="store_true",
+    )
+    parser.add_argument(
+        "--http2",
+        help="Speak HTTP/2, multiplexing concurrent calls to a host over one connection",
+        default=False,
+        action="store_true",
+    )
+    parser.add_argument(
+        "--h2c",
+        help="With --http2, speak HTTP/2 to plain-HTTP hosts too (they must support it)",
+        default=False,
+        action="store_true",
+    )
+    parser.add_argument(
+        "--circuit-breaker",
+        help="Fail calls fast while their host keeps failing, and adapt concurrency per host",
+        default=False,
+        action="store_true",
+    )
+    parser.add_argument(
+        "--lease-file",
+        type=str,
+        help="SQLite file shared by replicas, which split the schedules between them by leasing "
+        "shards of them, so each tick fires once (default: $LEASE_FILE)",
+        default=None,
+    )
+    args = parser.parse_args(argv)
+    check_http2_args(parser, args)
+    return args
+
+
+def get_history_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="caller history")
+    parser.add_argument(
+        "-f",
+        "--file",
+        type=str,
+        help="History file to read (default: $HISTORY_FILE)",
+        default=environ.get("HISTORY_FILE"),
+    )
+    parser.add_argument(
+        "--since",
+        type=period_type,
+        help="Only attempts this long ago or later (eg, 24h or 7d)",
+        default=None,
+    )
+    parser.add_argument(
+        "--until",
+        type=period_type,
+        help="Only attempts from before this long ago",
+        default=None,
+    )
+    parser.add_argument(
+        "--target",
+        type=str,
+        help='Only targets containing this (targets look like "GET host:443/users/:id")',
+        default=None,
+    )
+    parser.add_argument(
+        "--trend",
+        type=period_type,
+        help="Also summarize each period this long (eg, 1h or 1d)",
+        default=None,
+    )
+    args = parser.parse_args(argv)
+    if not args.file:
+        parser.error("the following arguments are required: -f/--file (or $HISTORY_FILE)")
+    if not isfile(args.file):
+        parser.error(f"no history file at {args.file}")
+    return args
+
+
+def parse_entry_args(values: Union[List[str], Dict[str, Any]]) -> argparse.Namespace:
+    """Parse a schedule or manifest entry's call arguments like the CLI's"""
+    args = get_cli_args(values if isinstance(values, list) else args_from_mapping(values))
+    if args.manifest is not None:
+        raise ValueError("entries can't reference another manifest")
+    return args
+
+
+def result_writer(args: argparse.Namespace) -> Optional[ResultWriter]:
+    if not args.results_file:
+        return None
+    fields = ResultFields(
+        fields=tuple(ResultField(name) for name in args.result_fields),
+        headers=tuple(args.result_headers) if args.result_headers is not None else None,
+        max_body=args.result_max_body,
+    )
+    return ResultWriter.open(args.results_file, fields)
+
+
+def report_timings(histograms: TimingHistograms, path: Optional[str]) -> None:
+    logger.info("Latency by phase (seconds)", timings=histograms.summary())
+    if path:
+        histograms.save(path)
+
+
+def response_timings(responses: List[HTTPResponse]) -> TimingHistograms:
+    histograms = TimingHistograms()
+    histograms.record_all(response.timings for response in responses)
+    return histograms
+
+
+def export_metrics(args: argparse.Namespace) -> None:
+    if not (args.metrics_file or args.metrics_push_url):
+        return
+
+    from .metrics import default_metrics
+
+    metrics = default_metrics()
+    if args.metrics_file:
+        metrics.write(args.metrics_file)
+    if args.metrics_push_url:
+        try:
+            metrics.push(args.metrics_push_url, job=args.metrics_job)
+        except OSError as err:
+            # the call's outcome decides the exit code, not its metrics
+            logger.error("Failed to push metrics", url=args.metrics_push_url, error=str(err))
+
+
+def run_load_test(args: argparse.Namespace) -> int:
+    from .load import run_load
+
+    plan = call_plan(args)
+    caller = Caller(host=args.host, port=args.port, insecure=args.insecure)
+    cancel = Event()
+
+    def stop(signum: int, frame: Optional[FrameType]) -> None:
+        logger.info("Stopping load", signal=signum)
+        cancel.set()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    logger.info("Starting load", rate=args.rate, duration=args.duration)
+    report = run_load(
+        lambda: caller.execute(plan, cancel),
+        args.rate,
+        args.duration,
+        max_in_flight=args.max_in_flight,
+        cancel=cancel,
+    )
+    # latency is from when each call was due, so waiting behind slow calls counts
+    logger.info("Finished load (latency in seconds)", **report.summary())
+    report_timings(report.timings, args.timings_file)
+    return 0 if report.failed == 0 else 1
+
+
+def enable_features(args: argparse.Namespace) -> None:
+    """Turn on the process-wide features the (CLI or serve) arguments ask for"""
+    if args.circuit_breaker:
+        enable_breakers()
+    if args.cache_dir:
+        enable_cache(args.cache_dir)
+    if args.coalesce:
+        enable_coalescing()
+    if args.dns_cache:
+        enable_dns_cache()
+    if args.http2:
+        from .http2 import enable_http2, HTTP2_CLEARTEXT
+
+        enable_http2(args.h2c or HTTP2_CLEARTEXT)
+    if args.history_file:
+        from .history import enable_history
+
+        enable_history(args.history_file)
+
+
+def prefetch_hosts(hosts: Iterable[str]) -> None:
+    """Resolve the hosts about to be called, if the DNS cache is enabled"""
+    dns = default_dns()
+    if dns is not None and DNS_PREFETCH:
+        dns.prefetch(expandvars(host) for host in hosts)
+
+
+def run_manifest_file(args: argparse.Namespace) -> int:
+    from .manifest import exit_code, load_manifest, run_manifest
+
+    entries = load_manifest(args.manifest, parse_entry_args)
+    logger.info("Running manifest", manifest=args.manifest, entries=len(entries))
+    writer = result_writer(args)
+
+    def report(entry: ManifestEntry, result: ManifestResult) -> None:
+        if writer is not None:
+            writer.write(result.responses, entry=result.name, succeeded=result.succeeded)
+        if not result.succeeded:
+            logger.error(result.error, entry=result.name, status_code=f"{result.status:03d}")
+        elif not (writer or args.quiet or entry.args.quiet):
+            logger.info(result.responses, entry=result.name)
+
+    if args.processes > 1:
+        results = run_manifest_file_processes(args, entries, report)
+    else:
+        prefetch_hosts(entry.args.host for entry in entries)
+        results = run_manifest(entries, call, workers=args.workers)
+        for entry, result in zip(entries, results):
+            report(entry, result)
+    if writer is not None:
+        writer.close()
+
+    failed = [result.name for result in results if not result.succeeded]
+    logger.info(
+        "Finished manifest",
+        succeeded=len(results) - len(failed),
+        failed=failed,
+    )
+    report_timings(
+        response_timings([response for result in results for response in result.responses]),
+        args.timings_file,
+    )
+    return exit_code(results)
+
+
+def run_manifest_file_processes(
+    args: argparse.Namespace,
+    entries: List[ManifestEntry],
+    report: Callable[[ManifestEntry, ManifestResult], None],
+) -> List[ManifestResult]:
+    """Run a manifest across processes, reporting results as they arrive (not in order)"""
+    from importlib import import_module
+
+    from .manifest import run_manifest_processes
+    from .metrics import default_metrics
+
+    # run with -m, this module is "__main__", which spawned workers don't import,
+    # so hand them its functions as they're known elsewhere
+    cli = import_module(f"{__package__}.__main__")
+    metrics = default_metrics()
+    results: List[Optional[ManifestResult]] = [None] * len(entries)
+    for idx, result in run_manifest_processes(
+        entries,
+        cli.call,
+        processes=args.processes,
+        workers=args.workers,
+        initializer=cli.enable_features,
+        initargs=(args,),
+    ):
+        results[idx] = result
+        report(entries[idx], result)
+        # the calls were made (and measured) in the workers, so count them here
+        outcome = "succeeded" if result.succeeded else "failed"
+        metrics.observe(call_plan(entries[idx].args), result.responses, outcome, result.duration)
+    return [result for result in results if result is not None]
+
+
+def serve(argv: Optional[Sequence[str]] = None) -> None:
+    from .lease import Coordinator, LEASE_FILE, SQLiteLeaseBackend
+    from .metrics import default_metrics
+    from .pool import default_pool
+    from .schedule import load_schedules, Scheduler
+
+    serve_args = get_serve_args(argv)
+    schedules = load_schedules(serve_args.schedules, parse_entry_args)
+    enable_features(serve_args)
+    if serve_args.metrics_port is not None:
+        default_metrics().serve(serve_args.metrics_port)
+        logger.info("Serving metrics", port=serve_args.metrics_port)
+    # each schedule makes the same call on every tick, so prepare it once
+    plans = {id(schedule.args): call_plan(schedule.args) for schedule in schedules}
+    names = {id(schedule.args): schedule.name for schedule in schedules}
+    prefetch_hosts(schedule.args.host for schedule in schedules)
+    histograms = TimingHistograms()
+    writer = result_writer(serve_args)
+
+    def execute(args: argparse.Namespace, cancel: Event) -> None:
+        try:
+            results = call(args, cancel=cancel, plan=plans[id(args)])
+        except FailedAPICall as err:
+            histograms.record_all(response.timings for response in err.responses)
+            if writer is not None:
+                writer.write(err.responses, schedule=names[id(args)], succeeded=False)
+            logger.error(err)
+            return
+        histograms.record_all(response.timings for response in results)
+        if writer is not None:
+            writer.write(results, schedule=names[id(args)], succeeded=True)
+        elif not args.quiet:
+            logger.info(results)
+
+    coordinator = None
+    lease_file = serve_args.lease_file or LEASE_FILE
+    if lease_file:
+        coordinator = Coordinator(SQLiteLeaseBackend(lease_file))
+        logger.info("Sharing schedules", holder=coordinator.holder, shards=coordinator.shards)
+    scheduler = Scheduler(
+        schedules, execute, max_workers=serve_args.workers, coordinator=coordinator
+    )
+
+    def shutdown(signum: int, frame: Optional[FrameType]) -> None:
+        logger.info("Stopping scheduler", signal=signum)
+        scheduler.stop()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    scheduler.run()
+    if writer is not None:
+        writer.close()
+    logger.info("Connection pool stats", connections=default_pool().stats())
+    breakers = default_breakers()
+    if breakers is not None:
+        logger.info("Circuit breaker stats", breakers=breakers.stats())
+    dns = default_dns()
+    if dns is not None:
+        logger.info("DNS cache stats", **dns.stats())
+    report_timings(histograms, serve_args.timings_file)
+
+
+def history(argv: Optional[Sequence[str]] = None) -> None:
+    from time import time
+
+    from .history import query
+
+    args = get_history_args(argv)
+    now = time()
+    summaries = query(
+        args.file,
+        since=None if args.since is None else now - args.since,
+        until=None if args.until is None else now - args.until,
+        target=args.target,
+        bucket=args.trend,
+    )
+    for summary in summaries:
+        print(dumps(summary), flush=True)
+
+
+def exit_on_sigterm() -> None:
+    """Exit through sys.exit on SIGTERM, so exit handlers (like flushing logs) run"""
+
+    def terminate(signum: int, frame: Optional[FrameType]) -> None:
+        logger.warning("Terminated", signal=signum)
+        sys.exit(128 + signum)
+
+    signal.signal(signal.SIGTERM, terminate)
+
+
+def log_pool_stats() -> None:
+    from .http2 import default_http2
+    from .pool import default_pool
+
+    logger.debug("Connection pool stats", connections=default_pool().stats())
+    http2 = default_http2()
+    if http2 is not None:
+        logger.debug("HTTP/2 connection stats", connections=http2.stats())
+    breakers = default_breakers()
+    if breakers is not None:
+        logger.info("Circuit breaker stats", breakers=breakers.stats())
+    dns = default_dns()
+    if dns is not None:
+        logger.debug("DNS cache stats", **dns.stats())
+
+
 if __name__ == "__main__":
+    if sys.argv[1:2] == ["serve"]:
+        serve(sys.argv[2:])
+        exit(0)
+
+    if sys.argv[1:2] == ["history"]:
+        history(sys.argv[2:])
+        exit(0)
+
     args = get_cli_args()
+    enable_features(args)
+
+    if args.rate is not None:
+        code = run_load_test(args)
+        log_pool_stats()
+        export_metrics(args)
+        exit(code)
+
+    # load tests install their own handlers, to stop and report
+    exit_on_sigterm()
+    if args.manifest is not None:
+        code = run_manifest_file(args)
+        log_pool_stats()
+        export_metrics(args)
+        exit(code)
 
+    writer = result_writer(args)
     try:
-        results = Caller(
-            host=args.host,
-            port=args.port,
-            insecure=args.insecure,
-        )(
-            method=HTTPMethod(args.method.upper()),
-            path=args.path,
-            params=args.params,
-            headers=args.headers,
-            body=args.body,
-            timeout=args.timeout,
-            retries=args.retries,
-            retry_on=args.retry_on_codes,
-            fail_on=args.fail_on_codes,
-        )
+        results = call(args)
     except FailedAPICall as err:
+        if writer is not None:
+            writer.write(err.responses, succeeded=False)
+            writer.close()
         logger.error(err)
+        report_timings(response_timings(err.responses), args.timings_file)
+        export_metrics(args)
         exit(1)
 
-    if not args.quiet:
+    if writer is not None:
+        writer.write(results, succeeded=True)
+        writer.close()
+    elif not args.quiet:
         logger.info(results)
+    report_timings(response_timings(results), args.timings_file)
+    log_pool_stats()
+    export_metrics(args)
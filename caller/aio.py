@@ -0,0 +1,278 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+from functools import partial
+from time import perf_counter
+from types import TracebackType
+from typing import Dict, List, Optional, Type, Union
+
+import httpx
+
+from .body import BodyPolicy, BodyReader
+from .breaker import BreakerRegistry, default_breakers
+from .cache import default_cache, ResponseCache
+from .caller import CallAttempts, CallPlan, HTTPMethod, HTTPResponse
+from .coalesce import AsyncSingleFlight, coalesce_key
+from .encoding import Compression
+from .history import default_history, HistoryStore
+from .http2 import HTTP2_CLEARTEXT, HTTP2_ENABLED
+from .logging import getLogger
+from .metrics import CallMetrics, default_metrics
+from .retry import RetryPolicy
+from .timing import PhaseTrace, Timings
+
+logger = getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENCY = 100
+
+
+class AsyncSession:
+    """
+    An asyncio HTTP client plus a limit on requests in flight, shared by any
+    number of `AsyncCaller`s running in the same event loop. With `http2`,
+    concurrent requests to an origin are multiplexed over one connection (as
+    with `HTTP2Pool`, plain-HTTP origins are only spoken to in HTTP/2 with
+    `h2c`, and must then speak it).
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        http2: bool = HTTP2_ENABLED,
+        h2c: bool = HTTP2_CLEARTEXT,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.http2 = http2
+        self.h2c = h2c
+        limits = httpx.Limits(
+            max_connections=max_concurrency,
+            max_keepalive_connections=max_concurrency,
+        )
+        self.client = httpx.AsyncClient(
+            limits=limits,
+            mounts=(
+                {
+                    "http://": httpx.AsyncHTTPTransport(limits=limits, http1=not h2c, http2=h2c),
+                    "https://": httpx.AsyncHTTPTransport(limits=limits, http2=True),
+                }
+                if http2
+                else None
+            ),
+        )
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Dict],
+        headers: Optional[Dict],
+        content: Optional[bytes],
+        timeout: float,
+        body_policy: Optional[BodyPolicy] = None,
+        timings: Optional[Timings] = None,
+    ) -> HTTPResponse:
+        """`timings`, if given, is filled in with the phases of the request"""
+        trace = PhaseTrace(timings if timings is not None else Timings())
+        extensions = {"trace": trace.async_trace}
+        async with self.semaphore:
+            if body_policy is None or not body_policy.streams:
+                response = await self.client.request(
+                    method,
+                    url,
+                    params=params,
+                    headers=headers,
+                    content=content,
+                    timeout=timeout,
+                    extensions=extensions,
+                )
+                trace.body_read()
+                return HTTPResponse.from_httpx_response(response)
+
+            request = self.client.build_request(
+                method,
+                url,
+                params=params,
+                headers=headers,
+                content=content,
+                timeout=timeout,
+                extensions=extensions,
+            )
+            response = await self.client.send(request, stream=True)
+            reader = BodyReader(body_policy, response.encoding)
+            try:
+                async for chunk in response.aiter_bytes(body_policy.chunk_size):
+                    reader.write(chunk)
+            except BaseException:
+                reader.abort()
+                raise
+            finally:
+                await response.aclose()
+            trace.body_read()
+            return HTTPResponse.from_httpx_response(response, reader.close())
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+    async def __aenter__(self) -> AsyncSession:
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        await self.aclose()
+
+
+@dataclass
+class AsyncCaller:
+    """
+    Same semantics as `Caller`, but non-blocking: attempts and backoff yield to
+    the event loop, so many calls can be in flight at once. Without a session,
+    the caller opens its own on first use and keeps it; close it with `aclose`
+    (or use the caller as an async context manager) before using the caller
+    in another event loop.
+    """
+
+    host: str
+    port: int
+    insecure: bool = False
+    # share a session across callers to share connections and the concurrency limit
+    session: Optional[AsyncSession] = field(default=None, repr=False)
+    # metrics are shared process-wide unless given
+    metrics: Optional[CallMetrics] = field(default=None, repr=False)
+    # and so are circuit breakers, when enabled
+    breakers: Optional[BreakerRegistry] = field(default=None, repr=False)
+    # and a conditional-request cache for GETs, when enabled
+    cache: Optional[ResponseCache] = field(default=None, repr=False)
+    # and a single-flight group, sharing identical concurrent GETs (never a
+    # process-wide one, as its futures belong to one event loop)
+    flights: Optional[AsyncSingleFlight] = field(default=None, repr=False)
+    # and a store recording every attempt, when enabled
+    history: Optional[HistoryStore] = field(default=None, repr=False)
+
+    # without a session, one opened on first use (per event loop) and kept
+    _owned: Optional[AsyncSession] = field(default=None, init=False, repr=False)
+    _owned_loop: Optional[asyncio.AbstractEventLoop] = field(default=None, init=False, repr=False)
+
+    async def __call__(
+        self,
+        method: HTTPMethod = HTTPMethod.GET,
+        path: Optional[str] = None,
+        params: Optional[Dict] = None,
+        headers: Optional[Dict] = None,
+        body: Optional[Dict] = None,
+        timeout: float = 60.0,
+        retries: int = 0,
+        retry_on: Optional[List[Union[int, str]]] = None,
+        fail_on: Optional[List[Union[int, str]]] = None,
+        body_policy: Optional[BodyPolicy] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        compression: Optional[Compression] = None,
+    ) -> List[HTTPResponse]:
+        return await self.execute(
+            CallPlan(
+                self.host,
+                self.port,
+                self.insecure,
+                method,
+                path,
+                params,
+                headers,
+                body,
+                timeout,
+                retries,
+                retry_on,
+                fail_on,
+                body_policy,
+                retry_policy or RetryPolicy(),
+                compression,
+            )
+        )
+
+    async def execute(self, plan: CallPlan) -> List[HTTPResponse]:
+        """Make a planned call (to the plan's host) in this caller's session"""
+        session = self._session()
+        call = CallAttempts(
+            plan,
+            self.metrics or default_metrics(),
+            self.history or default_history(),
+            self.breakers or default_breakers(),
+            self.cache or default_cache(),
+        )
+        request, headers = call.request, await call.off_loop(call.lookup)
+        flight_key = coalesce_key(request, headers, plan.body_policy) if self.flights else None
+
+        async def exchange(timings: Timings, timeout: float) -> HTTPResponse:
+            return await session.request(
+                method=request.method,
+                url=request.url,
+                params=request.params,
+                headers=headers,
+                content=request.encoded.content if request.encoded is not None else None,
+                timeout=timeout,
+                body_policy=plan.body_policy,
+                timings=timings,
+            )
+
+        while True:
+            timeout = await call.begin_async()
+            response: HTTPResponse
+            timings = Timings()
+            start = perf_counter()
+            try:
+                if self.flights is not None and flight_key is not None:
+                    response = await self.flights.do(
+                        flight_key, partial(exchange, timings, timeout)
+                    )
+                else:
+                    response = await exchange(timings, timeout)
+            except httpx.HTTPError as err:
+                response = HTTPResponse.from_exception(err, perf_counter() - start)
+            except BaseException:
+                call.abort()
+                raise
+            timings.total = perf_counter() - start
+            response.timings = timings
+
+            backoff = await call.off_loop(call.end, response)
+            if backoff is None:
+                break
+            await asyncio.sleep(backoff)
+
+        return await call.off_loop(call.finish)
+
+    def _session(self) -> AsyncSession:
+        if self.session is not None:
+            return self.session
+        # a session's connections belong to the event loop they were opened in
+        loop = asyncio.get_running_loop()
+        if self._owned is None:
+            self._owned, self._owned_loop = AsyncSession(), loop
+        elif self._owned_loop is not loop:
+            # nor can they be closed from another, so replacing the session would leak them
+            raise RuntimeError(
+                "this caller's session was opened in another event loop; aclose the caller"
+                " in that loop before using it in another, or give it a session"
+            )
+        return self._owned
+
+    async def aclose(self) -> None:
+        """Close the session this caller opened, if it wasn't given one"""
+        if self._owned is not None:
+            await self._owned.aclose()
+            self._owned = self._owned_loop = None
+
+    async def __aenter__(self) -> AsyncCaller:
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        await self.aclose()
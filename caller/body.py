@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import codecs
+from dataclasses import dataclass
+from enum import Enum
+import hashlib
+from json import JSONDecodeError, loads
+import os
+from os.path import expandvars
+from typing import BinaryIO, Dict, Iterable, Optional, Union
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+DEFAULT_MAX_BYTES = 64 * 1024
+
+
+class BodyMode(str, Enum):
+    FULL = "full"  # read it all, parse JSON if possible (the default)
+    DISCARD = "discard"  # read and drop, keeping only the size
+    HASH = "hash"  # read and drop, keeping the size and a checksum
+    TRUNCATE = "truncate"  # keep at most max_bytes
+    FILE = "file"  # stream to a file, keeping the size and a checksum
+
+
+@dataclass(frozen=True)
+class BodyPolicy:
+    mode: BodyMode = BodyMode.FULL
+    max_bytes: int = DEFAULT_MAX_BYTES
+    # for FILE; can use env vars
+    path: Optional[str] = None
+    algorithm: str = "sha256"
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+
+    def __post_init__(self) -> None:
+        if self.mode == BodyMode.FILE and not self.path:
+            raise ValueError("a path is required to stream response bodies to a file")
+        if self.mode in (BodyMode.HASH, BodyMode.FILE):
+            hashlib.new(self.algorithm)  # fail early on unknown algorithms
+
+    @property
+    def streams(self) -> bool:
+        return self.mode != BodyMode.FULL
+
+
+def parse_body(text: str) -> Union[str, Dict]:
+    try:
+        return loads(text)  # type: ignore[no-any-return]
+    except JSONDecodeError:
+        return text
+
+
+class BodyReader:
+    """
+    Consume a response body chunk by chunk according to a `BodyPolicy`, holding
+    at most `max_bytes` (TRUNCATE) or one chunk (every other streaming mode).
+    """
+
+    def __init__(self, policy: BodyPolicy, encoding: Optional[str] = None) -> None:
+        self.policy = policy
+        self.encoding = "utf-8"
+        if encoding:
+            try:
+                self.encoding = codecs.lookup(encoding).name
+            except LookupError:
+                pass
+        self.size = 0
+        self.captured = bytearray()
+        self.digest = (
+            hashlib.new(policy.algorithm) if policy.mode in (BodyMode.HASH, BodyMode.FILE) else None
+        )
+        self.path: Optional[str] = None
+        self.file: Optional[BinaryIO] = None
+        if policy.mode == BodyMode.FILE and policy.path:
+            self.path = expandvars(policy.path)
+            self.file = open(f"{self.path}.part", "wb")
+
+    def write(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        if self.digest is not None:
+            self.digest.update(chunk)
+        if self.file is not None:
+            self.file.write(chunk)
+        if self.policy.mode == BodyMode.TRUNCATE:
+            room = self.policy.max_bytes - len(self.captured)
+            if room > 0:
+                self.captured += chunk[:room]
+
+    def read(self, chunks: Iterable[bytes]) -> Union[str, Dict]:
+        try:
+            for chunk in chunks:
+                self.write(chunk)
+        except BaseException:
+            self.abort()
+            raise
+        return self.close()
+
+    def abort(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            os.remove(f"{self.path}.part")
+            self.file = None
+
+    def close(self) -> Union[str, Dict]:
+        summary: Dict = {"bytes": self.size}
+        if self.digest is not None:
+            summary[self.policy.algorithm] = self.digest.hexdigest()
+
+        if self.file is not None:
+            self.file.close()
+            os.replace(f"{self.path}.part", str(self.path))
+            self.file = None
+            summary["path"] = self.path
+
+        if self.policy.mode == BodyMode.TRUNCATE:
+            text = bytes(self.captured).decode(self.encoding, errors="replace")
+            # only a complete body is worth parsing
+            if self.size <= self.policy.max_bytes:
+                return parse_body(text)
+            summary.update(truncated=True, content=text)
+
+        return summary
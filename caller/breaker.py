@@ -0,0 +1,295 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from enum import Enum
+from os import environ
+from threading import Condition, Lock
+from time import monotonic
+from typing import Any, Callable, Dict, List, Optional, Tuple, TYPE_CHECKING
+
+from .logging import getLogger
+
+if TYPE_CHECKING:
+    import asyncio
+
+logger = getLogger(__name__)
+
+# whether callers not given breakers share process-wide ones
+BREAKER_ENABLED = environ.get("BREAKER_ENABLED", "false").lower() == "true"
+
+
+@dataclass(frozen=True)
+class BreakerConfig:
+    # failed attempts in a row that open the circuit
+    failure_threshold: int = int(environ.get("BREAKER_FAILURE_THRESHOLD", "5"))
+    # seconds an open circuit fails calls fast before letting a trial call through
+    reset_timeout: float = float(environ.get("BREAKER_RESET_TIMEOUT", "30"))
+    # attempts allowed in flight at first; grows by about one per `limit` successes
+    initial_limit: int = int(environ.get("BREAKER_INITIAL_LIMIT", "16"))
+    min_limit: int = 1
+    max_limit: int = int(environ.get("BREAKER_MAX_LIMIT", "256"))
+    # the limit is multiplied by this on a failed attempt, once per window: failures
+    # of attempts that began before the last cut don't cut it again
+    backoff_ratio: float = 0.5
+    # seconds an attempt waits for a slot under the limit before failing
+    queue_timeout: float = float(environ.get("BREAKER_QUEUE_TIMEOUT", "10"))
+
+    def __post_init__(self) -> None:
+        if self.failure_threshold < 1:
+            raise ValueError("the failure threshold must be at least 1")
+        if not 1 <= self.min_limit <= self.initial_limit <= self.max_limit:
+            raise ValueError("concurrency limits must satisfy 1 <= min <= initial <= max")
+        if not 0 < self.backoff_ratio < 1:
+            raise ValueError("the backoff ratio must be between 0 and 1")
+        if self.queue_timeout < 0:
+            raise ValueError("the queue timeout must not be negative")
+
+
+class BreakerState(str, Enum):
+    CLOSED = "closed"  # calls go through
+    OPEN = "open"  # calls fail fast
+    HALF_OPEN = "half-open"  # one trial call goes through
+
+
+class BreakerRejected(Exception):
+    """An attempt the breaker won't let through; the message says why"""
+
+
+@dataclass(frozen=True)
+class Slot:
+    """An attempt let through, to hand back to `release` (or `cancel`)"""
+
+    # whether this is the half-open circuit's trial attempt
+    trial: bool
+    # the concurrency window it began in; the limit is cut once per window
+    window: int
+
+
+class CircuitBreaker:
+    """
+    Guards one origin (host and port): opens after `failure_threshold` failed
+    attempts in a row, failing calls fast until `reset_timeout` has passed and
+    a trial call succeeds. Also keeps an AIMD concurrency limit, adding about
+    one per `limit` successes and cutting it by `backoff_ratio` on failure, at
+    most once per window (the attempts in flight when it was last cut); over
+    the limit, attempts wait up to `queue_timeout` for a slot.
+    """
+
+    def __init__(
+        self, origin: str, config: BreakerConfig, clock: Callable[[], float] = monotonic
+    ) -> None:
+        self.origin = origin
+        self.config = config
+        self.clock = clock
+        self.state = BreakerState.CLOSED
+        self.failures = 0
+        self.limit = float(config.initial_limit)
+        self.in_flight = 0
+        self._opened = 0.0
+        # whether the trial attempt is in flight
+        self._trial = False
+        self._window = 0
+        self._lock = Lock()
+        # threads waiting for a slot wait on this, and coroutines on their futures
+        self._slots = Condition(self._lock)
+        self._futures: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future[None]]] = []
+
+    def _take(self) -> Optional[Slot]:
+        # with the lock held: a slot, None if at the limit, or BreakerRejected
+        if self.state == BreakerState.OPEN:
+            wait = self._opened + self.config.reset_timeout - self.clock()
+            if wait > 0:
+                raise BreakerRejected(
+                    f"Circuit open for {self.origin} after {self.failures} failed attempt(s)"
+                    f"; failing fast for another {wait:.1f} seconds"
+                )
+            self.state = BreakerState.HALF_OPEN
+        if self.state == BreakerState.HALF_OPEN and self._trial:
+            raise BreakerRejected(f"Circuit half-open for {self.origin}; waiting on a trial call")
+        if self.in_flight >= int(self.limit):
+            return None
+        self.in_flight += 1
+        # the first attempt let through a half-open circuit is its trial
+        trial = self.state == BreakerState.HALF_OPEN
+        if trial:
+            self._trial = True
+        return Slot(trial=trial, window=self._window)
+
+    def _queue_timeout(self, timeout: Optional[float]) -> float:
+        queue_timeout = self.config.queue_timeout
+        return queue_timeout if timeout is None else min(timeout, queue_timeout)
+
+    def _full(self, waited: float) -> BreakerRejected:
+        return BreakerRejected(
+            f"Concurrency limit ({int(self.limit)}) reached for {self.origin}"
+            f"; waited {waited:.1f} seconds for a slot"
+        )
+
+    def acquire(self, timeout: Optional[float] = None) -> Slot:
+        """
+        Claim a slot for an attempt, waiting for one up to `queue_timeout` (or
+        `timeout`, if shorter); `release` must follow. Raises BreakerRejected if
+        the circuit is open, or no slot frees up in time.
+        """
+        started = monotonic()
+        deadline = started + self._queue_timeout(timeout)
+        with self._lock:
+            while True:
+                slot = self._take()
+                if slot is not None:
+                    return slot
+                remaining = deadline - monotonic()
+                if remaining <= 0:
+                    raise self._full(monotonic() - started)
+                self._slots.wait(remaining)
+
+    async def acquire_async(self, timeout: Optional[float] = None) -> Slot:
+        """`acquire`, waiting for a slot without blocking the event loop"""
+        # deferred so that importing this module (as every CLI call does) doesn't import asyncio
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        started = monotonic()
+        deadline = started + self._queue_timeout(timeout)
+        while True:
+            with self._lock:
+                slot = self._take()
+                if slot is not None:
+                    return slot
+                remaining = deadline - monotonic()
+                if remaining <= 0:
+                    raise self._full(monotonic() - started)
+                waiter = (loop, loop.create_future())
+                self._futures.append(waiter)
+            try:
+                await asyncio.wait_for(waiter[1], remaining)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                with self._lock:
+                    if waiter in self._futures:
+                        self._futures.remove(waiter)
+
+    def release(self, slot: Slot, failed: bool) -> None:
+        """Return an attempt's slot, with whether it failed"""
+        with self._lock:
+            self.in_flight -= 1
+            if failed:
+                self.failures += 1
+                if slot.window == self._window:
+                    self.limit = max(self.limit * self.config.backoff_ratio, self.config.min_limit)
+                    self._window += 1
+            else:
+                self.failures = 0
+                self.limit = min(self.limit + 1.0 / self.limit, self.config.max_limit)
+
+            if slot.trial:
+                self._trial = False
+                if failed:
+                    self._open()
+                else:
+                    self.state = BreakerState.CLOSED
+                    logger.info("Circuit closed", origin=self.origin)
+            elif (
+                self.state == BreakerState.CLOSED and self.failures >= self.config.failure_threshold
+            ):
+                self._open()
+            self._wake()
+
+    def cancel(self, slot: Slot) -> None:
+        """Return a slot unused, as its attempt wasn't made after all"""
+        with self._lock:
+            self.in_flight -= 1
+            if slot.trial:
+                self._trial = False
+            self._wake()
+
+    def _wake(self) -> None:
+        # with the lock held: wake as many waiters as there are free slots (those
+        # that lose the race for one wait again), or all once the circuit opens,
+        # so they fail fast
+        if self.state == BreakerState.OPEN:
+            self._slots.notify_all()
+            waking, self._futures = self._futures, []
+        else:
+            free = int(self.limit) - self.in_flight
+            if free <= 0:
+                return
+            self._slots.notify(free)
+            waking, self._futures = self._futures[:free], self._futures[free:]
+        for loop, future in waking:
+            loop.call_soon_threadsafe(_resolve, future)
+
+    def _open(self) -> None:
+        self.state = BreakerState.OPEN
+        self._opened = self.clock()
+        logger.warning(
+            "Circuit opened",
+            origin=self.origin,
+            failures=self.failures,
+            reset_timeout=self.config.reset_timeout,
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self.state.value,
+                "failures": self.failures,
+                "limit": int(self.limit),
+                "in_flight": self.in_flight,
+            }
+
+
+def _resolve(future: asyncio.Future[None]) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class BreakerRegistry:
+    """A `CircuitBreaker` per origin, created on first use"""
+
+    def __init__(
+        self, config: Optional[BreakerConfig] = None, clock: Callable[[], float] = monotonic
+    ) -> None:
+        self.config = config or BreakerConfig()
+        self.clock = clock
+        self._breakers: Dict[Tuple[str, int], CircuitBreaker] = {}
+        self._lock = Lock()
+
+    def get(self, host: str, port: int) -> CircuitBreaker:
+        key = (host, port)
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.get(key)
+                if breaker is None:
+                    breaker = CircuitBreaker(f"{host}:{port}", self.config, self.clock)
+                    self._breakers[key] = breaker
+        return breaker
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {breaker.origin: breaker.stats() for breaker in breakers}
+
+
+_DEFAULT_BREAKERS: Optional[BreakerRegistry] = None
+_DEFAULT_BREAKERS_LOCK = Lock()
+
+
+def default_breakers() -> Optional[BreakerRegistry]:
+    """The process-wide breakers, if enabled ($BREAKER_ENABLED or `enable_breakers`)"""
+    global _DEFAULT_BREAKERS
+    with _DEFAULT_BREAKERS_LOCK:
+        if _DEFAULT_BREAKERS is None and BREAKER_ENABLED:
+            _DEFAULT_BREAKERS = BreakerRegistry()
+        return _DEFAULT_BREAKERS
+
+
+def enable_breakers(config: Optional[BreakerConfig] = None) -> BreakerRegistry:
+    """Have callers that aren't given breakers share process-wide ones"""
+    global _DEFAULT_BREAKERS
+    with _DEFAULT_BREAKERS_LOCK:
+        if _DEFAULT_BREAKERS is None:
+            _DEFAULT_BREAKERS = BreakerRegistry(config)
+        return _DEFAULT_BREAKERS
@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from hashlib import sha256
+from json import dumps, JSONDecodeError, loads
+import os
+from os import environ
+from threading import get_ident, Lock
+from time import time
+from typing import Any, Dict, List, Optional, Tuple, TYPE_CHECKING
+
+from .logging import getLogger
+
+if TYPE_CHECKING:
+    from .caller import HTTPResponse, RenderedRequest
+
+logger = getLogger(__name__)
+
+# where callers not given a cache keep one; unset means no caching
+CACHE_DIR = environ.get("CACHE_DIR") or None
+# bytes of cached responses kept on disk before the least recently stored go
+CACHE_MAX_BYTES = int(environ.get("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# seconds a cached response is revalidated for after it was last stored or confirmed
+CACHE_TTL = float(environ.get("CACHE_TTL", "86400"))
+
+# request headers that can change the response, so requests differing in them
+# are cached apart; they're hashed into the key, never stored
+KEY_HEADERS = ("accept", "accept-encoding", "accept-language", "authorization", "cookie")
+
+SUFFIX = ".json"
+
+
+@dataclass
+class CachedResponse:
+    key: str
+    stored: float
+    status: int
+    headers: Dict
+    body: Any
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    def validators(self) -> Dict[str, str]:
+        """Headers making a request conditional on this response having changed"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+def header(headers: Dict, name: str) -> Optional[str]:
+    for key, value in headers.items():
+        if key.lower() == name:
+            return str(value)
+    return None
+
+
+class ResponseCache:
+    """
+    GET responses carrying an ETag or Last-Modified, kept as one file each in
+    `directory`, so the next request for them can be conditional and a 304
+    can stand in for the whole body. Safe to share between threads and
+    processes: entries are replaced atomically, and a lost race just means a
+    full response.
+    """
+
+    def __init__(
+        self, directory: str, max_bytes: int = CACHE_MAX_BYTES, ttl: float = CACHE_TTL
+    ) -> None:
+        if max_bytes <= 0 or ttl <= 0:
+            raise ValueError("the cache size and TTL must be positive")
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = Lock()
+        # bytes on disk as of the last scan plus those written since, so the
+        # directory is only scanned once writes may have taken it over the limit;
+        # other processes' writes are only seen at the next scan
+        self._size: Optional[int] = None
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(request: RenderedRequest) -> str:
+        headers = request.headers or {}
+        varying = sorted(
+            (name.lower(), str(value))
+            for name, value in headers.items()
+            if name.lower() in KEY_HEADERS
+        )
+        params = sorted((str(k), str(v)) for k, v in (request.params or {}).items())
+        material = dumps([request.method.upper(), request.url, params, varying])
+        return sha256(material.encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + SUFFIX)
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """The response cached under `key`, unless there's none or it's expired"""
+        path = self._path(key)
+        try:
+            with open(path) as stream:
+                entry = CachedResponse(key=key, **loads(stream.read()))
+        except FileNotFoundError:
+            return None
+        except (OSError, JSONDecodeError, TypeError) as err:
+            logger.warning("Ignoring unreadable cache entry", path=path, error=str(err))
+            self._remove(path)
+            return None
+        if time() - entry.stored > self.ttl:
+            self._remove(path)
+            return None
+        return entry
+
+    def put(self, key: str, response: HTTPResponse) -> bool:
+        """Cache a response if it has a validator to revalidate it with"""
+        etag = header(response.headers, "etag")
+        last_modified = header(response.headers, "last-modified")
+        if response.status != 200 or not (etag or last_modified):
+            return False
+        entry = {
+            "stored": time(),
+            "status": response.status,
+            "headers": response.headers,
+            "body": response.body,
+            "etag": etag,
+            "last_modified": last_modified,
+        }
+        path = self._path(key)
+        part = f"{path}.{os.getpid()}.{get_ident()}.part"
+        try:
+            data = dumps(entry).encode()
+            with open(part, "wb") as stream:
+                stream.write(data)
+            os.replace(part, path)
+        except (OSError, TypeError, ValueError) as err:
+            logger.warning("Failed to cache response", path=path, error=str(err))
+            self._remove(part)
+            return False
+        with self._lock:
+            # replacing an entry overcounts, which just brings the next scan forward
+            if self._size is not None:
+                self._size += len(data)
+            over = self._size is None or self._size > self.max_bytes
+        if over:
+            self.evict()
+        return True
+
+    def touch(self, entry: CachedResponse) -> None:
+        """Record that the server confirmed `entry` is current (on a 304)"""
+        entry.stored = time()
+        path = self._path(entry.key)
+        try:
+            with open(path) as stream:
+                data = loads(stream.read())
+            data["stored"] = entry.stored
+            part = f"{path}.{os.getpid()}.{get_ident()}.part"
+            with open(part, "w") as stream:
+                stream.write(dumps(data))
+            os.replace(part, path)
+        except (OSError, JSONDecodeError) as err:
+            logger.warning("Failed to refresh cache entry", path=path, error=str(err))
+
+    def evict(self) -> None:
+        """Remove the least recently stored entries while over `max_bytes`"""
+        with self._lock:
+            entries: List[Tuple[float, int, str]] = []
+            with os.scandir(self.directory) as scan:
+                for item in scan:
+                    if not item.name.endswith(SUFFIX):
+                        continue
+                    try:
+                        stat = item.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, item.path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                self._remove(path)
+                total -= size
+            self._size = total
+
+    def _remove(self, path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def conditional(
+    cache: Optional[ResponseCache], request: RenderedRequest
+) -> Tuple[Optional[Dict], Optional[str], Optional[CachedResponse]]:
+    """
+    The headers to send for `request` (with validators, if a response is
+    cached), its cache key, and the cached response; GET requests only
+    """
+    if cache is None or request.method != "get":
+        return request.headers, None, None
+    key = cache.key(request)
+    entry = cache.get(key)
+    if entry is None:
+        return request.headers, key, None
+    return {**(request.headers or {}), **entry.validators()}, key, entry
+
+
+def revalidated(
+    cache: Optional[ResponseCache],
+    key: Optional[str],
+    entry: Optional[CachedResponse],
+    response: HTTPResponse,
+) -> HTTPResponse:
+    """
+    `response`, with a 304 filled in from the cached response (keeping the
+    status, so it's clear nothing was transferred); cacheable responses are
+    stored for next time
+    """
+    if cache is None or key is None:
+        return response
+    if response.status == 304 and entry is not None:
+        cache.touch(entry)
+        response.headers = {**entry.headers, **response.headers}
+        response.body = entry.body
+        return response
+    cache.put(key, response)
+    return response
+
+
+_DEFAULT_CACHE: Optional[ResponseCache] = None
+_DEFAULT_CACHE_LOCK = Lock()
+
+
+def default_cache() -> Optional[ResponseCache]:
+    """The process-wide cache, if enabled ($CACHE_DIR or `enable_cache`)"""
+    global _DEFAULT_CACHE
+    with _DEFAULT_CACHE_LOCK:
+        if _DEFAULT_CACHE is None and CACHE_DIR:
+            _DEFAULT_CACHE = ResponseCache(CACHE_DIR)
+        return _DEFAULT_CACHE
+
+
+def enable_cache(directory: str) -> ResponseCache:
+    """Have callers that aren't given a cache share one in `directory`"""
+    global _DEFAULT_CACHE
+    with _DEFAULT_CACHE_LOCK:
+        if _DEFAULT_CACHE is None or _DEFAULT_CACHE.directory != directory:
+            _DEFAULT_CACHE = ResponseCache(directory)
+        return _DEFAULT_CACHE
@@ -1,23 +1,41 @@
 from __future__ import annotations
 
-from dataclasses import asdict, dataclass
+from dataclasses import asdict, dataclass, field
 from enum import Enum
+from functools import partial
+from itertools import product
 from json import dumps, JSONDecodeError, loads
 from os import environ
 from os.path import expandvars
-from random import random
 import re
-from time import sleep
-from typing import Dict, List, Optional, Union
+from threading import Event
+from time import perf_counter, sleep, time
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, TYPE_CHECKING, TypeVar, Union
+
+from .body import BodyPolicy, BodyReader, parse_body
+from .breaker import BreakerRegistry, BreakerRejected, default_breakers, Slot
+from .cache import CachedResponse, conditional, default_cache, ResponseCache, revalidated
+from .coalesce import coalesce_key, default_flights, SingleFlight
+from .encoding import check_compression, COMPRESS_MIN_BYTES, Compression, encode_body, EncodedBody
+from .logging import getLogger, new_log_context_vars
+from .retry import RetryBudget, RetryPolicy
+from .timing import current, recording, Timings
 
-import requests
+if TYPE_CHECKING:
+    import httpx
+    import requests
 
-from .logging import getLogger, new_log_context_vars
+    from .history import HistoryStore
+    from .http2 import HTTP2Pool
+    from .metrics import CallMetrics
+    from .pool import SessionPool
 
 logger = getLogger(__name__)
 
 DEFAULT_HEADERS = loads(environ.get("DEFAULT_HEADERS", "{}"))
 
+T = TypeVar("T")
+
 
 class HTTPMethod(str, Enum):
     GET = "GET"
@@ -25,6 +43,11 @@ class HTTPMethod(str, Enum):
     PUT = "PUT"
     PATCH = "PATCH"
     DELETE = "DELETE"
+    HEAD = "HEAD"
+
+
+# methods whose requests can't have a body
+BODILESS_METHODS = (HTTPMethod.GET, HTTPMethod.DELETE, HTTPMethod.HEAD)
 
 
 @dataclass
@@ -33,15 +56,27 @@ class HTTPResponse:
     status: int
     headers: Dict
     body: Union[str, Dict]
+    # per-phase breakdown of `duration`, where the client provides one
+    timings: Optional[Timings] = None
 
     def __repr__(self) -> str:
-        return dumps(asdict(self))
+        # asdict would deep-copy the headers and body just to serialize them
+        return dumps(
+            {
+                "duration": self.duration,
+                "status": self.status,
+                "headers": self.headers,
+                "body": self.body,
+                "timings": asdict(self.timings) if self.timings else None,
+            }
+        )
 
     @staticmethod
-    def from_error(err: requests.RequestException) -> HTTPResponse:
+    def from_error(err: requests.RequestException, duration: float = 0) -> HTTPResponse:
+        """`duration` is how long the attempt took to fail, when there's no response"""
         if not err.response:
             return HTTPResponse(
-                duration=0,
+                duration=duration,
                 status=0,
                 headers={},
                 body={
@@ -61,7 +96,45 @@ class HTTPResponse:
         )
 
     @staticmethod
-    def from_requests_response(response: requests.Response) -> HTTPResponse:
+    def from_exception(err: Exception, duration: float = 0) -> HTTPResponse:
+        return HTTPResponse(
+            duration=duration,
+            status=0,
+            headers={},
+            body={
+                "error": err.__class__.__name__,
+                "message": str(err),
+            },
+        )
+
+    @staticmethod
+    def from_httpx_response(
+        response: httpx.Response, body: Optional[Union[str, Dict]] = None
+    ) -> HTTPResponse:
+        """`body` is the already-consumed body of a streamed response, if any"""
+        return HTTPResponse(
+            duration=response.elapsed.total_seconds(),
+            status=response.status_code,
+            headers=dict(response.headers),
+            body=parse_body(response.text) if body is None else body,
+        )
+
+    @staticmethod
+    def from_requests_response(
+        response: requests.Response, policy: Optional[BodyPolicy] = None
+    ) -> HTTPResponse:
+        if policy is not None and policy.streams:
+            # the response was requested with stream=True; consume it in chunks
+            with response:
+                body = BodyReader(policy, response.encoding).read(
+                    response.iter_content(chunk_size=policy.chunk_size)
+                )
+            return HTTPResponse(
+                duration=response.elapsed.total_seconds(),
+                status=response.status_code,
+                headers=dict(response.headers),
+                body=body,
+            )
         try:
             return HTTPResponse(
                 duration=response.elapsed.total_seconds(),
@@ -86,17 +159,177 @@ def expandvars_dict(data: Optional[Dict]) -> Optional[Dict]:
     }
 
 
-def patternize_codes(
-    codes: Optional[List[Union[int, str]]],
-) -> re.Pattern:
-    if not codes:
-        return re.compile(r"(000)")
-    _codes = [
-        code if isinstance(code, str) else f"{code:03d}"
-        for code in codes
-        if isinstance(code, str) or (100 <= code < 600 or code == 0)
-    ]
-    return re.compile("(" + "|".join(_codes).replace("X", "[0-9]").replace("x", "[0-9]") + ")")
+# status codes run from 000 (no response) to 599
+MAX_STATUS = 600
+
+# a status code where any digit can be a wildcard; eg. 404, 50X, 4xx
+STATUS_CODE_PATTERN = re.compile(r"^[0-9xX]{3}$")
+
+
+class StatusMatcher:
+    """
+    The status codes matched by a list like `[0, "50X", 404]`, kept as a lookup
+    table so that checking a response's status is a single index.
+    """
+
+    __slots__ = ("pattern", "_table")
+
+    def __init__(self, codes: Optional[List[Union[int, str]]]) -> None:
+        _codes = [
+            code if isinstance(code, str) else f"{code:03d}"
+            for code in codes or [0]
+            if isinstance(code, str) or (100 <= code < MAX_STATUS or code == 0)
+        ]
+        # the equivalent regex, for messages
+        self.pattern = "(" + "|".join(_codes).replace("X", "[0-9]").replace("x", "[0-9]") + ")"
+
+        table = bytearray(MAX_STATUS)
+        for code in _codes:
+            if not STATUS_CODE_PATTERN.match(code):
+                raise ValueError(f'invalid HTTP code value "{code}"')
+            digits = [range(10) if digit in "xX" else (int(digit),) for digit in code]
+            for hundreds, tens, units in product(*digits):
+                status = hundreds * 100 + tens * 10 + units
+                if status < MAX_STATUS:
+                    table[status] = 1
+        self._table = bytes(table)
+
+    def __contains__(self, status: int) -> bool:
+        return 0 <= status < MAX_STATUS and self._table[status] == 1
+
+    def __repr__(self) -> str:
+        return f"StatusMatcher({self.pattern})"
+
+
+# the references `os.path.expandvars` substitutes: $NAME or ${NAME}
+ENV_VAR_PATTERN = re.compile(r"\$(\w+|\{([^}]*)\})", re.ASCII)
+
+
+def referenced_env_vars(*templates: Union[None, str, Dict]) -> Tuple[str, ...]:
+    """Names of the environment variables strings (or the string values of dicts) refer to"""
+    names: Set[str] = set()
+    for template in templates:
+        values = template.values() if isinstance(template, dict) else [template]
+        for value in values:
+            if isinstance(value, str):
+                names.update(m.group(2) or m.group(1) for m in ENV_VAR_PATTERN.finditer(value))
+    return tuple(sorted(names))
+
+
+@dataclass
+class RenderedRequest:
+    scheme: str
+    method: str
+    host: str
+    url: str
+    params: Optional[Dict]
+    headers: Optional[Dict]
+    body: Optional[Dict]
+    # `body`, serialized once for every attempt
+    encoded: Optional[EncodedBody] = None
+
+    def send_headers(self, headers: Optional[Dict]) -> Optional[Dict]:
+        """`headers` plus those describing the encoded body (unless given, in any case)"""
+        if self.encoded is None:
+            return headers
+        given = {str(name).lower() for name in headers or {}}
+        encoded = {k: v for k, v in self.encoded.headers.items() if k.lower() not in given}
+        return {**encoded, **(headers or {})}
+
+
+@dataclass
+class CallPlan:
+    """
+    A call validated and prepared once, to be made any number of times: default
+    headers are merged and status codes compiled up front, and the request is
+    only re-rendered from the environment when a variable it refers to changes.
+    Rendered requests are shared between executions, so treat them as read-only.
+    """
+
+    host: str
+    port: int
+    insecure: bool = False
+    method: HTTPMethod = HTTPMethod.GET
+    path: Optional[str] = None
+    params: Optional[Dict] = None
+    headers: Optional[Dict] = None
+    body: Optional[Dict] = None
+    timeout: float = 60.0
+    retries: int = 0
+    retry_on: Optional[List[Union[int, str]]] = None
+    fail_on: Optional[List[Union[int, str]]] = None
+    body_policy: Optional[BodyPolicy] = None
+    retry_policy: RetryPolicy = field(default_factory=RetryPolicy)
+    # compress request bodies of at least `compress_min_bytes`
+    compression: Optional[Compression] = None
+    compress_min_bytes: int = COMPRESS_MIN_BYTES
+
+    scheme: str = field(init=False)
+    retry_matcher: StatusMatcher = field(init=False, repr=False)
+    fail_matcher: StatusMatcher = field(init=False, repr=False)
+    # call context for logs, excluding rendering from environment variables
+    # which may contain secrets
+    log_context: Dict[str, Any] = field(init=False, repr=False)
+    _env_names: Tuple[str, ...] = field(init=False, repr=False)
+    # (environment snapshot, request rendered from it); replaced, never mutated,
+    # so concurrent executions need no lock
+    _rendered: Optional[Tuple[Tuple[Optional[str], ...], RenderedRequest]] = field(
+        init=False, repr=False, default=None
+    )
+
+    def __post_init__(self) -> None:
+        # # TODO: choose if this is set; may affect testing convenience at least
+        # if params and method != HTTPMethod.GET:
+        #     raise ValueError(f"{method.value} requests cannot have query parameters")
+
+        if self.method in BODILESS_METHODS and self.body is not None:
+            raise ValueError(f"{self.method.value} requests cannot have a body")
+
+        self.scheme = "http" if self.insecure else "https"
+        self._method = self.method.value.lower()
+        self._path = self.path[1:] if self.path and self.path[0] == "/" else self.path or ""
+        self._headers = {**DEFAULT_HEADERS, **self.headers} if self.headers else DEFAULT_HEADERS
+        self._body = None if self.method in BODILESS_METHODS else (self.body or {})
+        check_compression(self.compression)
+        self.retry_matcher = StatusMatcher(self.retry_on)
+        self.fail_matcher = StatusMatcher(self.fail_on)
+        self.log_context = dict(
+            scheme=self.scheme,
+            method=self._method,
+            host=self.host,
+            path=self._path,
+            headers=self.headers,
+            params=self.params,
+        )
+        self._env_names = referenced_env_vars(
+            self.host, self._path, self.params, self._headers, self._body
+        )
+
+    def counts_as_failure(self, status: int) -> bool:
+        """Whether an attempt ending in `status` counts against its host's health"""
+        return status in self.retry_matcher or status in self.fail_matcher
+
+    def render(self) -> RenderedRequest:
+        """The request rendered from the current environment"""
+        snapshot = tuple(environ.get(name) for name in self._env_names)
+        rendered = self._rendered
+        if rendered is not None and rendered[0] == snapshot:
+            return rendered[1]
+
+        host = expandvars(self.host)
+        body = expandvars_dict(self._body)
+        request = RenderedRequest(
+            scheme=self.scheme,
+            method=self._method,
+            host=host,
+            url=f"{self.scheme}://{host}:{self.port}/{expandvars(self._path)}",
+            params=expandvars_dict(self.params),
+            headers=expandvars_dict(self._headers),
+            body=body,
+            encoded=encode_body(body, self.compression, self.compress_min_bytes),
+        )
+        self._rendered = (snapshot, request)
+        return request
 
 
 class FailedAPICall(Exception):
@@ -111,11 +344,185 @@ class FailedAPICall(Exception):
         self.responses = responses
 
 
+class CallAttempts:
+    """
+    One execution of a plan, attempt by attempt: what `Caller` and `AsyncCaller`
+    share around each attempt (breaker slots, cache revalidation, the retry
+    decision, and recording the outcome), so they only differ in how they make
+    an attempt and wait between them. The steps touching the cache or history
+    do disk I/O, so `AsyncCaller` runs them with `off_loop`.
+    """
+
+    def __init__(
+        self,
+        plan: CallPlan,
+        metrics: CallMetrics,
+        history: Optional[HistoryStore],
+        breakers: Optional[BreakerRegistry],
+        cache: Optional[ResponseCache],
+    ) -> None:
+        self.plan = plan
+        self.started = perf_counter()
+        self.request = plan.render()
+        new_log_context_vars(**plan.log_context)
+
+        logger.info("Making request")
+
+        self.metrics = metrics
+        self.history = history
+        self.breaker = breakers.get(self.request.host, plan.port) if breakers is not None else None
+        # streamed bodies are only summaries, so aren't worth caching
+        streams = plan.body_policy is not None and plan.body_policy.streams
+        self.cache = None if streams else cache
+        self.cache_key: Optional[str] = None
+        self.cached: Optional[CachedResponse] = None
+        self.budget = RetryBudget(plan.retry_policy)
+        # attempts made so far (and the unix seconds each finished), and the number of the next
+        self.responses: List[HTTPResponse] = []
+        self.finished: List[float] = []
+        self.attempt = 0
+        # the breaker slot of the attempt in flight
+        self.slot: Optional[Slot] = None
+
+    def lookup(self) -> Optional[Dict]:
+        """The headers to send, made conditional if the response is cached"""
+        headers, self.cache_key, self.cached = conditional(self.cache, self.request)
+        return self.request.send_headers(headers)
+
+    async def off_loop(self, step: Callable[..., T], *args: Any) -> T:
+        """Run a step in a thread if it may do disk I/O, so it doesn't block the event loop"""
+        if self.cache is None and self.history is None:
+            return step(*args)
+        # deferred so that importing this module doesn't import asyncio
+        import asyncio
+
+        return await asyncio.to_thread(step, *args)
+
+    def observe(self, outcome: str) -> None:
+        self.metrics.observe(self.plan, self.responses, outcome, perf_counter() - self.started)
+        if self.history is not None:
+            self.history.record(self.plan, self.responses, outcome, self.finished)
+
+    def begin(self) -> float:
+        """
+        Claim a breaker slot for the next attempt (waiting for one while the
+        breaker is at its concurrency limit), returning the attempt's timeout,
+        or fail fast if the breaker rejects it or the retry deadline has passed
+        """
+        self._timeout()
+        if self.breaker is not None:
+            try:
+                self.slot = self.breaker.acquire(self.budget.remaining())
+            except BreakerRejected as err:
+                raise self._rejected(err)
+        return self._timeout()
+
+    async def begin_async(self) -> float:
+        """`begin`, waiting for a slot without blocking the event loop"""
+        if self.budget.timeout(self.plan.timeout) is None:
+            raise await self.off_loop(self._expired)
+        if self.breaker is not None:
+            try:
+                self.slot = await self.breaker.acquire_async(self.budget.remaining())
+            except BreakerRejected as err:
+                raise await self.off_loop(self._rejected, err)
+        timeout = self.budget.timeout(self.plan.timeout)
+        if timeout is None:
+            raise await self.off_loop(self._expired)
+        return timeout
+
+    def _timeout(self) -> float:
+        timeout = self.budget.timeout(self.plan.timeout)
+        if timeout is None:
+            raise self._expired()
+        return timeout
+
+    def _expired(self) -> FailedAPICall:
+        if self.breaker is not None and self.slot is not None:
+            self.breaker.cancel(self.slot)
+            self.slot = None
+        logger.error("Retry deadline passed", attempts=self.attempt)
+        self.observe("deadline")
+        return FailedAPICall(
+            f"Retry deadline passed after {self.attempt} attempt(s)", self.responses
+        )
+
+    def _rejected(self, err: BreakerRejected) -> FailedAPICall:
+        logger.error("Failing fast", reason=str(err), attempts=self.attempt)
+        self.observe("rejected")
+        return FailedAPICall(str(err), self.responses)
+
+    def _release(self, failed: bool) -> None:
+        if self.breaker is not None and self.slot is not None:
+            self.breaker.release(self.slot, failed)
+            self.slot = None
+
+    def abort(self) -> None:
+        """Give up the slot of an attempt that raised"""
+        self._release(failed=True)
+
+    def end(self, response: HTTPResponse) -> Optional[float]:
+        """Record an attempt's response, returning how long to wait before retrying, if so"""
+        plan = self.plan
+        response = revalidated(self.cache, self.cache_key, self.cached, response)
+        self._release(failed=plan.counts_as_failure(response.status))
+        self.responses.append(response)
+        self.finished.append(time())
+
+        if response.status not in plan.retry_matcher or self.attempt >= plan.retries:
+            return None
+        backoff = self.budget.delay(self.attempt, response.headers)
+        if backoff is None:
+            logger.warning(
+                f"response ({response.status}) matches retry_on ({plan.retry_matcher.pattern})"
+                "; not retrying, as the retry deadline or max delay would be exceeded"
+            )
+            return None
+        logger.warning(
+            f"response ({response.status}) matches retry_on ({plan.retry_matcher.pattern})"
+            f"; retrying in {backoff:.2f} seconds"
+        )
+        self.attempt += 1
+        return backoff
+
+    def cancelled(self) -> FailedAPICall:
+        """The error to raise when cancelled while waiting to retry"""
+        logger.warning("Cancelled while waiting to retry", attempts=self.attempt)
+        self.observe("cancelled")
+        return FailedAPICall(f"Cancelled after {self.attempt} attempt(s)", self.responses)
+
+    def finish(self) -> List[HTTPResponse]:
+        """The responses, once attempts are over, unless the last one fails the call"""
+        last_status = f"{self.responses[-1].status:03d}"
+        if self.responses[-1].status in self.plan.fail_matcher:
+            logger.error("Failing due to status code", status_code=last_status)
+            self.observe("failed")
+            raise FailedAPICall(f"Failing due to status code {last_status}", self.responses)
+
+        logger.info("Succeeded on status code", status_code=last_status)
+        self.observe("succeeded")
+        return self.responses
+
+
 @dataclass
 class Caller:
     host: str
     port: int
     insecure: bool = False
+    # connections are shared process-wide unless a pool is given
+    pool: Optional[SessionPool] = field(default=None, repr=False)
+    # and so are metrics
+    metrics: Optional[CallMetrics] = field(default=None, repr=False)
+    # and circuit breakers, when enabled
+    breakers: Optional[BreakerRegistry] = field(default=None, repr=False)
+    # and a conditional-request cache for GETs, when enabled
+    cache: Optional[ResponseCache] = field(default=None, repr=False)
+    # and a single-flight group, sharing identical concurrent GETs, when enabled
+    flights: Optional[SingleFlight] = field(default=None, repr=False)
+    # and a store recording every attempt, when enabled
+    history: Optional[HistoryStore] = field(default=None, repr=False)
+    # and HTTP/2 connections, used instead of the pool when enabled
+    http2: Optional[HTTP2Pool] = field(default=None, repr=False)
 
     def __call__(
         self,
@@ -128,82 +535,115 @@ class Caller:
         retries: int = 0,
         retry_on: Optional[List[Union[int, str]]] = None,
         fail_on: Optional[List[Union[int, str]]] = None,
+        cancel: Optional[Event] = None,
+        body_policy: Optional[BodyPolicy] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        compression: Optional[Compression] = None,
     ) -> List[HTTPResponse]:
-        if not path:
-            path = ""
-        elif path[0] == "/":
-            path = path[1:]
-
-        # # TODO: choose if this is set; may affect testing convenience at least
-        # if params and method != HTTPMethod.GET:
-        #     raise ValueError(f"{method.value} requests cannot have query parameters")
-
-        if method in [HTTPMethod.GET, HTTPMethod.DELETE] and body is not None:
-            raise ValueError(f"{method.value} requests cannot have a body")
-        elif body is None:
-            body = {}
-
-        sch = "http" if self.insecure else "https"
-        mtd = method.value.lower()
-        url = f"{sch}://{expandvars(self.host)}:{self.port}/{expandvars(path)}"
-        prm = expandvars_dict(params)
-        hdr = expandvars_dict({**DEFAULT_HEADERS, **headers} if headers else DEFAULT_HEADERS)
-        bdy = expandvars_dict(body)
-
-        # add call context to logs, excluding rendering from environment variables
-        # which may contain secrets
-        new_log_context_vars(
-            scheme=sch,
-            method=mtd,
-            host=self.host,
-            path=path,
-            headers=headers,
-            params=params,
+        return self.execute(
+            CallPlan(
+                self.host,
+                self.port,
+                self.insecure,
+                method,
+                path,
+                params,
+                headers,
+                body,
+                timeout,
+                retries,
+                retry_on,
+                fail_on,
+                body_policy,
+                retry_policy or RetryPolicy(),
+                compression,
+            ),
+            cancel,
         )
 
-        logger.info("Making request")
-
-        _retry_on = patternize_codes(retry_on)
-        _fail_on = patternize_codes(fail_on)
-
-        responses: List[HTTPResponse] = []
+    def execute(self, plan: CallPlan, cancel: Optional[Event] = None) -> List[HTTPResponse]:
+        """Make a planned call (to the plan's host) over this caller's connections"""
+        # deferred so that importing this module doesn't import requests
+        import requests
+
+        from .history import default_history
+        from .http2 import default_http2
+        from .metrics import default_metrics
+        from .pool import default_pool
+
+        call = CallAttempts(
+            plan,
+            self.metrics or default_metrics(),
+            self.history or default_history(),
+            self.breakers or default_breakers(),
+            self.cache or default_cache(),
+        )
+        request, headers = call.request, call.lookup()
+        http2 = self.http2 or default_http2()
+        session = (
+            None
+            if http2 is not None
+            else (self.pool or default_pool()).session(request.scheme, request.host, plan.port)
+        )
+        body_policy = plan.body_policy
+        flights = self.flights or default_flights()
+        flight_key = coalesce_key(request, headers, body_policy) if flights is not None else None
+
+        def exchange(timeout: float) -> HTTPResponse:
+            if http2 is not None:
+                return http2.request(
+                    request,
+                    plan.port,
+                    headers,
+                    timeout,
+                    body_policy,
+                    current(),
+                )
+            assert session is not None
+            return HTTPResponse.from_requests_response(
+                session.request(
+                    method=request.method,
+                    url=request.url,
+                    params=request.params,
+                    headers=headers,
+                    data=request.encoded.content if request.encoded is not None else None,
+                    timeout=timeout,
+                    stream=body_policy is not None and body_policy.streams,
+                ),
+                body_policy,
+            )
 
-        attempt = 0
-        while attempt <= retries:
+        while True:
+            timeout = call.begin()
             response: HTTPResponse
             try:
-                if method == HTTPMethod.GET or method == HTTPMethod.DELETE:
-                    response = HTTPResponse.from_requests_response(
-                        requests.request(
-                            method=mtd, url=url, params=prm, headers=hdr, timeout=timeout
-                        )
-                    )
-                else:
-                    response = HTTPResponse.from_requests_response(
-                        requests.request(
-                            method=mtd, url=url, params=prm, headers=hdr, json=bdy, timeout=timeout
-                        )
-                    )
-            except requests.exceptions.RequestException as err:
-                response = HTTPResponse.from_error(err)
-
-            responses.append(response)
-
-            if _retry_on.match(f"{response.status:03d}") and attempt < retries:
-                backoff = 2**attempt + random() / 2.0
-                logger.warning(
-                    f"response ({response.status}) matches retry_on ({_retry_on.pattern})"
-                    f"; retrying in {backoff:.2f} seconds"
-                )
-                attempt += 1
-                sleep(backoff)
-            else:
+                with recording() as timings:
+                    start = perf_counter()
+                    try:
+                        if flights is not None and flight_key is not None:
+                            response = flights.do(flight_key, partial(exchange, timeout))
+                        else:
+                            response = exchange(timeout)
+                    except requests.exceptions.RequestException as err:
+                        timings.total = perf_counter() - start
+                        response = HTTPResponse.from_error(err, timings.total)
+                    else:
+                        timings.total = perf_counter() - start
+                        if http2 is None:
+                            # `duration` runs from sending the request until its headers are read
+                            timings.ttfb = max(response.duration - timings.connection(), 0.0)
+                            timings.body = max(timings.total - response.duration, 0.0)
+            except BaseException:
+                call.abort()
+                raise
+            response.timings = timings
+
+            backoff = call.end(response)
+            if backoff is None:
                 break
+            if cancel is None:
+                sleep(backoff)
+            elif cancel.wait(backoff):
+                raise call.cancelled()
 
-        last_status = f"{responses[-1].status:03d}"
-        if _fail_on.match(last_status):
-            logger.error("Failing due to status code", status_code=last_status)
-            raise FailedAPICall(f"Failing due to status code {last_status}", responses)
-
-        logger.info("Succeeded on status code", status_code=last_status)
-        return responses
+        return call.finish()
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+from dataclasses import replace
+from functools import partial
+from hashlib import sha256
+from json import dumps
+from os import environ
+from threading import Event, Lock
+from typing import Awaitable, Callable, Dict, Optional, TYPE_CHECKING
+
+from .body import BodyMode, BodyPolicy
+
+if TYPE_CHECKING:
+    import asyncio
+
+    from .caller import HTTPResponse, RenderedRequest
+
+# whether callers not given one share a process-wide single-flight group
+COALESCE_ENABLED = environ.get("COALESCE_ENABLED", "false").lower() == "true"
+
+# methods safe to make once on behalf of several callers
+COALESCED_METHODS = ("get", "head")
+
+# every request header makes requests distinct, except these per-request ids
+# (which name a request rather than change what it asks for)
+IGNORED_HEADERS = frozenset(
+    ("x-request-id", "x-correlation-id", "traceparent", "tracestate", "x-amzn-trace-id")
+)
+
+
+def coalesce_key(
+    request: RenderedRequest, headers: Optional[Dict], body_policy: Optional[BodyPolicy]
+) -> Optional[str]:
+    """
+    What identical requests have in common, or None if `request` can't be
+    shared: the method, URL, query parameters, headers (except IGNORED_HEADERS,
+    matched in any case), and how the body is read. Bodies streamed to a file
+    are never shared, as each call writes its own.
+    """
+    if request.method not in COALESCED_METHODS:
+        return None
+    if body_policy is not None and body_policy.mode == BodyMode.FILE:
+        return None
+    material = [
+        request.method,
+        request.url,
+        sorted((str(k), str(v)) for k, v in (request.params or {}).items()),
+        sorted(
+            (str(k).lower(), str(v))
+            for k, v in (headers or {}).items()
+            if str(k).lower() not in IGNORED_HEADERS
+        ),
+        repr(body_policy),
+    ]
+    return sha256(dumps(material).encode()).hexdigest()
+
+
+class _Flight:
+    def __init__(self) -> None:
+        self.done = Event()
+        self.response: Optional[HTTPResponse] = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Concurrent attempts with the same key share one exchange: the first makes
+    it, and the rest wait for it; all get a shallow copy of its response (sharing
+    the headers and body), or its error. Nothing is kept once it finishes.
+    """
+
+    def __init__(self) -> None:
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = Lock()
+
+    def do(self, key: str, exchange: Callable[[], HTTPResponse]) -> HTTPResponse:
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            assert flight.response is not None
+            return replace(flight.response)
+
+        try:
+            flight.response = exchange()
+            # everyone gets a copy, so each caller can set its own timings
+            return replace(flight.response)
+        except BaseException as err:
+            flight.error = err
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._flights)
+
+
+class _AsyncFlight:
+    def __init__(self, task: asyncio.Future[HTTPResponse]) -> None:
+        self.task = task
+        self.waiters = 0
+
+
+class AsyncSingleFlight:
+    """
+    `SingleFlight` for coroutines on one event loop. The exchange runs in its
+    own task, so a caller that's cancelled only stops waiting for it, and the
+    rest still get its response; it's cancelled once no one is waiting.
+    """
+
+    def __init__(self) -> None:
+        self._flights: Dict[str, _AsyncFlight] = {}
+
+    async def do(self, key: str, exchange: Callable[[], Awaitable[HTTPResponse]]) -> HTTPResponse:
+        import asyncio
+
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._flights[key] = _AsyncFlight(asyncio.ensure_future(exchange()))
+            flight.task.add_done_callback(partial(self._landed, key, flight))
+        flight.waiters += 1
+        try:
+            return replace(await asyncio.shield(flight.task))
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                self._landed(key, flight)
+                flight.task.cancel()
+
+    def _landed(self, key: str, flight: _AsyncFlight, *_: object) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if flight.task.done() and not flight.task.cancelled():
+            flight.task.exception()  # retrieved here, in case no one was waiting
+
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+
+_DEFAULT_FLIGHTS: Optional[SingleFlight] = None
+_DEFAULT_FLIGHTS_LOCK = Lock()
+
+
+def default_flights() -> Optional[SingleFlight]:
+    """The process-wide single-flight group, if enabled ($COALESCE_ENABLED or `enable_coalescing`)"""
+    global _DEFAULT_FLIGHTS
+    with _DEFAULT_FLIGHTS_LOCK:
+        if _DEFAULT_FLIGHTS is None and COALESCE_ENABLED:
+            _DEFAULT_FLIGHTS = SingleFlight()
+        return _DEFAULT_FLIGHTS
+
+
+def enable_coalescing() -> SingleFlight:
+    """Have callers that aren't given a single-flight group share a process-wide one"""
+    global _DEFAULT_FLIGHTS
+    with _DEFAULT_FLIGHTS_LOCK:
+        if _DEFAULT_FLIGHTS is None:
+            _DEFAULT_FLIGHTS = SingleFlight()
+        return _DEFAULT_FLIGHTS
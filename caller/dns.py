@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from os import environ
+import socket
+from threading import Lock
+from time import monotonic
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .logging import getLogger
+
+logger = getLogger(__name__)
+
+# whether connections resolve hosts through a process-wide cache
+DNS_CACHE_ENABLED = environ.get("DNS_CACHE_ENABLED", "false").lower() == "true"
+# seconds addresses are kept; the system resolver doesn't report record TTLs,
+# so keep this no longer than the shortest TTL of the hosts called
+DNS_CACHE_TTL = float(environ.get("DNS_CACHE_TTL", "60"))
+# seconds a name found not to exist is remembered as such
+DNS_NEGATIVE_TTL = float(environ.get("DNS_NEGATIVE_TTL", "10"))
+# whether to resolve the hosts of a manifest or schedules before making any calls
+DNS_PREFETCH = environ.get("DNS_PREFETCH", "true").lower() == "true"
+
+# resolver errors meaning the name doesn't exist, rather than that resolving
+# failed (say, timed out), so are worth remembering
+NEGATIVE_ERRORS = frozenset(
+    code for code in (socket.EAI_NONAME, getattr(socket, "EAI_NODATA", None)) if code is not None
+)
+
+# (host, address family)
+Key = Tuple[str, int]
+
+
+def lookup(host: str, family: int = socket.AF_UNSPEC) -> List[str]:
+    """The distinct addresses `host` resolves to, in the resolver's order"""
+    infos = socket.getaddrinfo(host, None, family, socket.SOCK_STREAM)
+    return list(dict.fromkeys(str(info[4][0]) for info in infos))
+
+
+@dataclass
+class _Entry:
+    expires: float
+    addresses: List[str]
+    # (errno, message) of a name that doesn't exist
+    error: Optional[Tuple[int, str]] = None
+
+
+class DNSCache:
+    """
+    Addresses hosts resolve to, kept for `ttl` seconds, and names that don't
+    exist, kept for `negative_ttl`. Resolves through the system resolver, so
+    /etc/hosts and search domains apply as usual, but a host is only looked up
+    once per TTL however many connections are made to it. Safe to share
+    between threads.
+    """
+
+    def __init__(
+        self,
+        ttl: float = DNS_CACHE_TTL,
+        negative_ttl: float = DNS_NEGATIVE_TTL,
+        clock: Callable[[], float] = monotonic,
+        resolver: Callable[[str, int], List[str]] = lookup,
+    ) -> None:
+        if ttl < 0 or negative_ttl < 0:
+            raise ValueError("DNS cache TTLs can't be negative")
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.clock = clock
+        self.resolver = resolver
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self._entries: Dict[Key, _Entry] = {}
+        self._lock = Lock()
+
+    def resolve(self, host: str, family: int = socket.AF_UNSPEC) -> List[str]:
+        """Addresses for `host`; raises `socket.gaierror` as `socket.getaddrinfo` would"""
+        key = (host, family)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires > self.clock():
+                if entry.error is not None:
+                    self.negative_hits += 1
+                    raise socket.gaierror(*entry.error)
+                self.hits += 1
+                return entry.addresses
+            self.misses += 1
+
+        try:
+            addresses = self.resolver(host, family)
+        except socket.gaierror as err:
+            if err.errno in NEGATIVE_ERRORS:
+                with self._lock:
+                    expires = self.clock() + self.negative_ttl
+                    self._entries[key] = _Entry(expires, [], (err.errno, err.strerror))
+            raise
+        with self._lock:
+            self._entries[key] = _Entry(self.clock() + self.ttl, addresses)
+        return addresses
+
+    def prefetch(self, hosts: Iterable[str], family: int = socket.AF_UNSPEC) -> int:
+        """Resolve `hosts` concurrently ahead of calling them; returns how many resolved"""
+        unique = list(dict.fromkeys(hosts))
+        if not unique:
+            return 0
+
+        def one(host: str) -> bool:
+            try:
+                self.resolve(host, family)
+                return True
+            except socket.gaierror as err:
+                logger.warning("Failed to resolve host", host=host, error=str(err))
+                return False
+
+        with ThreadPoolExecutor(max_workers=min(len(unique), 16)) as executor:
+            resolved = sum(executor.map(one, unique))
+        logger.info("Resolved hosts", hosts=len(unique), resolved=resolved)
+        return resolved
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries = {}
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "negative_hits": self.negative_hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+            }
+
+
+_DEFAULT_DNS: Optional[DNSCache] = None
+_DEFAULT_DNS_LOCK = Lock()
+
+
+def default_dns() -> Optional[DNSCache]:
+    """The process-wide cache, if enabled ($DNS_CACHE_ENABLED or `enable_dns_cache`)"""
+    global _DEFAULT_DNS
+    with _DEFAULT_DNS_LOCK:
+        if _DEFAULT_DNS is None and DNS_CACHE_ENABLED:
+            _DEFAULT_DNS = DNSCache()
+        return _DEFAULT_DNS
+
+
+def enable_dns_cache() -> DNSCache:
+    """Have connections resolve hosts through a process-wide cache"""
+    global _DEFAULT_DNS
+    with _DEFAULT_DNS_LOCK:
+        if _DEFAULT_DNS is None:
+            _DEFAULT_DNS = DNSCache()
+        return _DEFAULT_DNS
+
+
+def resolve(host: str, family: int = socket.AF_UNSPEC) -> List[str]:
+    """Addresses for `host`, through the process-wide cache if it's enabled"""
+    cache = default_dns()
+    return lookup(host, family) if cache is None else cache.resolve(host, family)
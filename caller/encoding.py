@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from enum import Enum
+import gzip
+from json import dumps
+from os import environ
+from typing import Dict, Optional
+
+# bytes a request body must reach to be compressed; smaller ones gain too little
+COMPRESS_MIN_BYTES = int(environ.get("COMPRESS_MIN_BYTES", "1024"))
+# 1 (fastest) to 9 (smallest); request bodies are compressed once per call, not per attempt
+GZIP_LEVEL = int(environ.get("GZIP_LEVEL", "6"))
+# 1 (fastest) to 22 (smallest)
+ZSTD_LEVEL = int(environ.get("ZSTD_LEVEL", "3"))
+
+
+class Compression(str, Enum):
+    GZIP = "gzip"
+    ZSTD = "zstd"  # needs the zstandard package
+
+
+def check_compression(compression: Optional[Compression]) -> None:
+    """Fail early on compression this process can't do"""
+    if compression == Compression.ZSTD:
+        try:
+            import zstandard  # noqa: F401
+        except ImportError:
+            raise ValueError("zstd compression needs the zstandard package installed")
+
+
+def compress(content: bytes, compression: Compression) -> bytes:
+    if compression == Compression.GZIP:
+        # mtime=0, so the same body always compresses to the same bytes
+        return gzip.compress(content, compresslevel=GZIP_LEVEL, mtime=0)
+    import zstandard
+
+    compressed: bytes = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(content)
+    return compressed
+
+
+@dataclass(frozen=True)
+class EncodedBody:
+    """A request body serialized (and maybe compressed) once, to be sent as-is on every attempt"""
+
+    content: bytes
+    # Content-Type, and Content-Encoding if compressed
+    headers: Dict[str, str]
+    # bytes before compression
+    size: int
+
+
+def encode_body(
+    body: Optional[Dict],
+    compression: Optional[Compression] = None,
+    min_bytes: int = COMPRESS_MIN_BYTES,
+) -> Optional[EncodedBody]:
+    """
+    `body` as JSON (serialized as `requests` would for `json=`), compressed if
+    `compression` is given and it's at least `min_bytes` long
+    """
+    if body is None:
+        return None
+    content = dumps(body, allow_nan=False).encode()
+    headers = {"Content-Type": "application/json"}
+    size = len(content)
+    if compression is not None and size >= min_bytes:
+        content = compress(content, compression)
+        headers["Content-Encoding"] = compression.value
+    return EncodedBody(content=content, headers=headers, size=size)
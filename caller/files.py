@@ -0,0 +1,27 @@
+from json import loads
+from typing import Any, Dict, List
+
+
+def load_entries(path: str, key: str) -> List[Dict[str, Any]]:
+    """
+    Load a list of entries from a JSON, JSON-lines, or YAML file. The file can
+    either hold the list itself or a mapping with the list under `key`.
+    """
+    with open(path, "r") as stream:
+        content = stream.read()
+
+    data: Any
+    if path.endswith((".yaml", ".yml")):
+        import yaml  # only needed for YAML files
+
+        data = yaml.safe_load(content)
+    elif path.endswith(".jsonl"):
+        data = [loads(line) for line in content.splitlines() if line.strip()]
+    else:
+        data = loads(content)
+
+    if isinstance(data, dict):
+        data = data.get(key)
+    if not isinstance(data, list):
+        raise ValueError(f'"{path}" should contain a list of entries (or a mapping with "{key}")')
+    return data
@@ -0,0 +1,16 @@
+from hashlib import blake2b
+
+
+def jump_hash(name: str, buckets: int) -> int:
+    """
+    The bucket (of `buckets`) `name` belongs to, by jump consistent hashing
+    (Lamping & Veach), so changing the number of buckets moves only the names
+    it must
+    """
+    key = int.from_bytes(blake2b(name.encode(), digest_size=8).digest(), "big")
+    bucket, candidate = -1, 0
+    while candidate < buckets:
+        bucket = candidate
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        candidate = int((bucket + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return bucket
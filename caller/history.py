@@ -0,0 +1,258 @@
+from __future__ import annotations
+
+import atexit
+from datetime import datetime, timezone
+from os import environ
+import re
+import sqlite3
+from threading import Lock
+from time import monotonic, time
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, TYPE_CHECKING
+
+from .metrics import path_template
+from .timing import LatencyHistogram
+
+if TYPE_CHECKING:
+    from .caller import CallPlan, HTTPResponse
+
+# where callers not given a store record their calls; unset means nowhere
+HISTORY_FILE = environ.get("HISTORY_FILE") or None
+# attempts held in memory before they're written
+HISTORY_BATCH_SIZE = int(environ.get("HISTORY_BATCH_SIZE", "500"))
+# seconds attempts are held at most (checked as calls finish)
+HISTORY_FLUSH_INTERVAL = float(environ.get("HISTORY_FLUSH_INTERVAL", "10"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS attempts (
+    -- unix seconds when the attempt finished
+    ts REAL NOT NULL,
+    -- method, origin, and path template; eg. "GET api.example.com:443/users/:id"
+    target TEXT NOT NULL,
+    -- 0 when there was no response
+    status INTEGER NOT NULL,
+    duration REAL NOT NULL,
+    -- from 1; 0 for a call that made none (as it was rejected, or out of time)
+    attempt INTEGER NOT NULL,
+    -- the call's: succeeded, failed, cancelled, rejected, or deadline
+    outcome TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS attempts_by_target ON attempts (target, ts);
+"""
+
+Row = Tuple[float, str, int, float, int, str]
+
+
+def target_name(plan: CallPlan) -> str:
+    return f"{plan.method.value} {plan.host}:{plan.port}{path_template(plan.path)}"
+
+
+def is_error(status: int) -> bool:
+    """Attempts that got no response, or a server error"""
+    return status == 0 or status >= 500
+
+
+class HistoryStore:
+    """
+    Every attempt of every call, appended to a SQLite file a batch at a time
+    (when `batch_size` attempts are waiting, or `flush_interval` seconds have
+    passed as a call finishes). Safe to record into from several threads;
+    several processes can share a file, as SQLite serializes their writes.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        batch_size: int = HISTORY_BATCH_SIZE,
+        flush_interval: float = HISTORY_FLUSH_INTERVAL,
+    ) -> None:
+        self.path = path
+        self.batch_size = max(batch_size, 1)
+        self.flush_interval = flush_interval
+        self._pending: List[Row] = []
+        self._flushed = monotonic()
+        self._lock = Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+
+    def record(
+        self,
+        plan: CallPlan,
+        responses: List[HTTPResponse],
+        outcome: str,
+        finished: Optional[Sequence[float]] = None,
+    ) -> None:
+        """
+        A call's attempts, with the unix seconds each `finished` (by default,
+        now); a call that made none gets a row of its own, with attempt 0
+        """
+        now = time()
+        finished = finished or [now] * len(responses)
+        target = target_name(plan)
+        rows = [
+            (ts, target, response.status, response.duration, idx + 1, outcome)
+            for idx, (ts, response) in enumerate(zip(finished, responses))
+        ] or [(now, target, 0, 0.0, 0, outcome)]
+        with self._lock:
+            self._pending += rows
+            due = monotonic() - self._flushed >= self.flush_interval
+            if len(self._pending) >= self.batch_size or due:
+                self._flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush()
+
+    def _flush(self) -> None:
+        self._flushed = monotonic()
+        if not self._pending:
+            return
+        with self._db:
+            self._db.executemany("INSERT INTO attempts VALUES (?, ?, ?, ?, ?, ?)", self._pending)
+        self._pending = []
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush()
+            self._db.close()
+
+
+PERIOD_PATTERN = re.compile(r"^\s*([0-9]*\.?[0-9]+)\s*([smhdw]?)\s*$")
+PERIOD_UNITS = {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+
+
+def parse_period(value: str) -> float:
+    """Seconds from "90", "90s", "15m", "24h", "7d", or "2w" """
+    match = PERIOD_PATTERN.match(value)
+    if not match:
+        raise ValueError(f'"{value}" is not a period like 15m, 24h, or 7d')
+    return float(match.group(1)) * PERIOD_UNITS[match.group(2)]
+
+
+class TargetStats:
+    """Attempt and call counts, errors, and latencies for one target and period"""
+
+    def __init__(self) -> None:
+        self.attempts = 0
+        self.errors = 0
+        self.calls = 0
+        self.failed_calls = 0
+        self.latency = LatencyHistogram()
+
+    def add(self, status: int, duration: float, attempt: int, outcome: str) -> None:
+        if attempt == 0:
+            # a call that made no attempt, so failed
+            self.calls += 1
+            self.failed_calls += 1
+            return
+        self.attempts += 1
+        self.errors += is_error(status)
+        if attempt == 1:
+            self.calls += 1
+            self.failed_calls += outcome != "succeeded"
+        self.latency.record(duration)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "attempts": self.attempts,
+            "calls": self.calls,
+            # attempts with no response or a 5xx
+            "error_rate": round(self.errors / self.attempts, 4) if self.attempts else 0.0,
+            # calls that didn't succeed
+            "failure_rate": round(self.failed_calls / self.calls, 4) if self.calls else 0.0,
+            "latency": self.latency.summary(),
+        }
+
+
+def iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat()
+
+
+def query(
+    path: str,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    target: Optional[str] = None,
+    bucket: Optional[float] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Per-target summaries of the attempts in `path` between `since` and `until`
+    (unix seconds) for targets containing `target`, with a trend of one summary
+    per `bucket` seconds if given. Rows are streamed from the database, and
+    each target's summary is yielded once its rows are read, so memory is
+    bounded by the number of buckets, not the number of attempts.
+    """
+    clauses: List[str] = []
+    params: List[Any] = []
+    if since is not None:
+        clauses.append("ts >= ?")
+        params.append(since)
+    if until is not None:
+        clauses.append("ts < ?")
+        params.append(until)
+    if target:
+        clauses.append("instr(target, ?) > 0")
+        params.append(target)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    sql = (
+        "SELECT target, ts, status, duration, attempt, outcome FROM attempts"
+        f" {where} ORDER BY target, ts"
+    )
+
+    db = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        current: Optional[str] = None
+        overall = TargetStats()
+        trend: Dict[float, TargetStats] = {}
+
+        def summarize(name: str) -> Dict[str, Any]:
+            summary = {"target": name, **overall.summary()}
+            if bucket:
+                summary["trend"] = [
+                    {"start": iso(start), **stats.summary()} for start, stats in trend.items()
+                ]
+            return summary
+
+        for name, ts, status, duration, attempt, outcome in db.execute(sql, params):
+            if name != current:
+                if current is not None:
+                    yield summarize(current)
+                current, overall, trend = name, TargetStats(), {}
+            overall.add(status, duration, attempt, outcome)
+            if bucket:
+                start = ts - ts % bucket
+                if start not in trend:
+                    trend[start] = TargetStats()
+                trend[start].add(status, duration, attempt, outcome)
+        if current is not None:
+            yield summarize(current)
+    finally:
+        db.close()
+
+
+_DEFAULT_HISTORY: Optional[HistoryStore] = None
+_DEFAULT_HISTORY_LOCK = Lock()
+
+
+def default_history() -> Optional[HistoryStore]:
+    """The process-wide store, if enabled ($HISTORY_FILE or `enable_history`)"""
+    global _DEFAULT_HISTORY
+    with _DEFAULT_HISTORY_LOCK:
+        if _DEFAULT_HISTORY is None and HISTORY_FILE:
+            _DEFAULT_HISTORY = HistoryStore(HISTORY_FILE)
+            atexit.register(_DEFAULT_HISTORY.close)
+        return _DEFAULT_HISTORY
+
+
+def enable_history(path: str) -> HistoryStore:
+    """Have callers that aren't given a store record into one at `path`"""
+    global _DEFAULT_HISTORY
+    with _DEFAULT_HISTORY_LOCK:
+        if _DEFAULT_HISTORY is None or _DEFAULT_HISTORY.path != path:
+            if _DEFAULT_HISTORY is not None:
+                atexit.unregister(_DEFAULT_HISTORY.close)
+                _DEFAULT_HISTORY.close()
+            _DEFAULT_HISTORY = HistoryStore(path)
+            # written out at exit, so single calls needn't wait on the batch
+            atexit.register(_DEFAULT_HISTORY.close)
+        return _DEFAULT_HISTORY
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+from importlib.util import find_spec
+from os import environ
+from threading import Lock
+from time import perf_counter
+from typing import Any, Dict, Optional, Tuple, TYPE_CHECKING
+
+from .body import BodyPolicy, BodyReader
+from .caller import HTTPResponse, RenderedRequest
+from .timing import PhaseTrace, Timings
+
+if TYPE_CHECKING:
+    import httpx
+
+# whether callers not given a pool speak HTTP/2 through a process-wide one
+HTTP2_ENABLED = environ.get("HTTP2_ENABLED", "false").lower() == "true"
+# whether plain-HTTP origins are spoken to in HTTP/2 too (h2c, with prior
+# knowledge, so they must speak it) rather than HTTP/1.1
+HTTP2_CLEARTEXT = environ.get("HTTP2_CLEARTEXT", "false").lower() == "true"
+
+# (scheme, host, port)
+Origin = Tuple[str, str, int]
+
+
+def check_http2() -> None:
+    """Fail early if this process can't speak HTTP/2"""
+    if find_spec("h2") is None:
+        raise ValueError("HTTP/2 needs the h2 package installed (the http2 extra)")
+
+
+@dataclass
+class HTTP2Stats:
+    # connections opened; concurrent calls share one unless it goes away
+    connections: int = 0
+    # requests made, each a stream on some connection
+    streams: int = 0
+
+
+class HTTP2Pool:
+    """
+    One HTTP/2 client per (scheme, host, port), so concurrent calls to an origin
+    are streams multiplexed over one connection instead of a connection each.
+    Over TLS, servers that don't agree to HTTP/2 are spoken to in HTTP/1.1; over
+    plain HTTP, HTTP/1.1 is spoken unless `h2c`, when HTTP/2 is spoken with
+    prior knowledge, so the server must speak it. Needs the h2 package (the
+    "http2" extra).
+    """
+
+    def __init__(self, h2c: bool = HTTP2_CLEARTEXT) -> None:
+        self.h2c = h2c
+        self._clients: Dict[Origin, httpx.Client] = {}
+        self._stats: Dict[Origin, HTTP2Stats] = {}
+        self._lock = Lock()
+
+    def client(self, scheme: str, host: str, port: int) -> httpx.Client:
+        # deferred so that importing this module doesn't import httpx
+        import httpx
+
+        origin = (scheme, host, port)
+        with self._lock:
+            if origin not in self._clients:
+                h2c = self.h2c and scheme == "http"
+                self._clients[origin] = httpx.Client(http1=not h2c, http2=True)
+                self._stats[origin] = HTTP2Stats()
+            return self._clients[origin]
+
+    def request(
+        self,
+        request: RenderedRequest,
+        port: int,
+        headers: Optional[Dict],
+        timeout: float,
+        body_policy: Optional[BodyPolicy] = None,
+        timings: Optional[Timings] = None,
+    ) -> HTTPResponse:
+        """
+        Make `request` as a stream on the origin's connection; `timings`, if
+        given, is filled in with the stream's phases. Failures to get a response
+        are responses with status 0, as with `Caller`.
+        """
+        import httpx
+
+        client = self.client(request.scheme, request.host, port)
+        stats = self._stats[(request.scheme, request.host, port)]
+        content = request.encoded.content if request.encoded is not None else None
+        trace = PhaseTrace(timings if timings is not None else Timings())
+
+        def record(event: str, info: Dict[str, Any]) -> None:
+            trace.record(event, info)
+            if event == "connection.connect_tcp.complete":
+                with self._lock:
+                    stats.connections += 1
+
+        with self._lock:
+            stats.streams += 1
+        start = perf_counter()
+        try:
+            if body_policy is None or not body_policy.streams:
+                response = client.request(
+                    request.method,
+                    request.url,
+                    params=request.params,
+                    headers=headers,
+                    content=content,
+                    timeout=timeout,
+                    extensions={"trace": record},
+                )
+                trace.body_read()
+                return HTTPResponse.from_httpx_response(response)
+
+            with client.stream(
+                request.method,
+                request.url,
+                params=request.params,
+                headers=headers,
+                content=content,
+                timeout=timeout,
+                extensions={"trace": record},
+            ) as response:
+                reader = BodyReader(body_policy, response.encoding)
+                try:
+                    for chunk in response.iter_bytes(body_policy.chunk_size):
+                        reader.write(chunk)
+                except BaseException:
+                    reader.abort()
+                    raise
+            trace.body_read()
+            return HTTPResponse.from_httpx_response(response, reader.close())
+        except httpx.HTTPError as err:
+            return HTTPResponse.from_exception(err, perf_counter() - start)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {
+                f"{scheme}://{host}:{port}": asdict(stats)
+                for (scheme, host, port), stats in self._stats.items()
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            for client in self._clients.values():
+                client.close()
+            self._clients = {}
+            self._stats = {}
+
+
+_DEFAULT_HTTP2: Optional[HTTP2Pool] = None
+_DEFAULT_HTTP2_LOCK = Lock()
+
+
+def default_http2() -> Optional[HTTP2Pool]:
+    """The process-wide HTTP/2 pool, if enabled ($HTTP2_ENABLED or `enable_http2`)"""
+    global _DEFAULT_HTTP2
+    with _DEFAULT_HTTP2_LOCK:
+        if _DEFAULT_HTTP2 is None and HTTP2_ENABLED:
+            _DEFAULT_HTTP2 = HTTP2Pool()
+        return _DEFAULT_HTTP2
+
+
+def enable_http2(h2c: bool = HTTP2_CLEARTEXT) -> HTTP2Pool:
+    """Have callers that aren't given a pool speak HTTP/2 through a process-wide one"""
+    global _DEFAULT_HTTP2
+    with _DEFAULT_HTTP2_LOCK:
+        if _DEFAULT_HTTP2 is None:
+            _DEFAULT_HTTP2 = HTTP2Pool(h2c)
+        return _DEFAULT_HTTP2
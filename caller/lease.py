@@ -0,0 +1,310 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from hashlib import blake2b
+from math import ceil
+from os import environ, getpid
+from socket import gethostname
+import sqlite3
+from threading import Lock
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set, TypeVar
+
+from .hashing import jump_hash
+from .logging import getLogger
+
+logger = getLogger(__name__)
+
+T = TypeVar("T")
+
+# SQLite file replicas coordinate through; unset means every replica fires every schedule
+LEASE_FILE = environ.get("LEASE_FILE") or None
+# seconds a replica's leases outlive its last renewal; a replica that dies
+# stops owning its schedules this long after, so they're picked up by others
+LEASE_TTL = float(environ.get("LEASE_TTL", "15"))
+# schedules are split into this many shards, each leased by one replica at a
+# time; must be the same for every replica, and at least the number of replicas
+LEASE_SHARDS = int(environ.get("LEASE_SHARDS", "64"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS members (
+    holder TEXT PRIMARY KEY,
+    -- unix seconds; a member that hasn't renewed by then is gone
+    expires REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS leases (
+    shard INTEGER PRIMARY KEY,
+    holder TEXT NOT NULL,
+    expires REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS fired (
+    -- schedule name
+    key TEXT PRIMARY KEY,
+    -- the latest tick claimed; ticks only move forward
+    tick REAL NOT NULL,
+    holder TEXT NOT NULL
+);
+"""
+
+
+class LeaseBackend(ABC):
+    """
+    Where replicas keep their membership, shard leases, and the ticks they've
+    fired. Each method is atomic; `now` is unix seconds, so the replicas'
+    clocks must roughly agree.
+    """
+
+    @abstractmethod
+    def join(self, holder: str, ttl: float, now: float) -> List[str]:
+        """Renew `holder`'s membership, returning every live member's, sorted"""
+
+    @abstractmethod
+    def leases(self, now: float) -> Dict[int, str]:
+        """Holders of shards whose leases haven't expired"""
+
+    @abstractmethod
+    def renew(self, holder: str, shards: Iterable[int], ttl: float, now: float) -> Set[int]:
+        """Take or extend leases on `shards` that are free or `holder`'s; returns those held"""
+
+    @abstractmethod
+    def release(self, holder: str, shards: Iterable[int]) -> None:
+        """Give up `holder`'s leases on `shards`"""
+
+    @abstractmethod
+    def leave(self, holder: str) -> None:
+        """Drop `holder`'s membership and leases, so others can take over at once"""
+
+    @abstractmethod
+    def claim(self, key: str, tick: float, shard: int, holder: str, now: float) -> bool:
+        """
+        Record that `holder` fires `key`'s `tick`; true only if `holder` still
+        holds `shard` and no tick this late has been claimed for `key`
+        """
+
+    @abstractmethod
+    def fired(self, keys: Iterable[str]) -> Dict[str, float]:
+        """The latest tick claimed for each of `keys` that has one"""
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteLeaseBackend(LeaseBackend):
+    """
+    Leases in a SQLite file, for replicas on one host (or sharing a volume whose
+    file locks work, which network filesystems often don't); every method is one
+    transaction, serialized by SQLite's file locks. The rollback journal is kept,
+    as WAL's shared-memory index only works for processes on the same host.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = Lock()
+        # transactions are begun explicitly, so reads and writes in one are atomic
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._db.executescript(SCHEMA)
+
+    def _write(self, statements: Callable[[sqlite3.Connection], T]) -> T:
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                result = statements(self._db)
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+            return result
+
+    def join(self, holder: str, ttl: float, now: float) -> List[str]:
+        def statements(db: sqlite3.Connection) -> List[str]:
+            db.execute("DELETE FROM members WHERE expires <= ?", (now,))
+            db.execute("INSERT OR REPLACE INTO members VALUES (?, ?)", (holder, now + ttl))
+            return [row[0] for row in db.execute("SELECT holder FROM members ORDER BY holder")]
+
+        return self._write(statements)
+
+    def leases(self, now: float) -> Dict[int, str]:
+        with self._lock:
+            rows = self._db.execute("SELECT shard, holder FROM leases WHERE expires > ?", (now,))
+            return {shard: holder for shard, holder in rows}
+
+    def renew(self, holder: str, shards: Iterable[int], ttl: float, now: float) -> Set[int]:
+        def statements(db: sqlite3.Connection) -> Set[int]:
+            held = set()
+            for shard in shards:
+                cursor = db.execute(
+                    """
+                    INSERT INTO leases VALUES (?, ?, ?)
+                    ON CONFLICT (shard) DO UPDATE SET holder = excluded.holder, expires = excluded.expires
+                    WHERE leases.holder = excluded.holder OR leases.expires <= ?
+                    """,
+                    (shard, holder, now + ttl, now),
+                )
+                if cursor.rowcount:
+                    held.add(shard)
+            return held
+
+        return self._write(statements)
+
+    def release(self, holder: str, shards: Iterable[int]) -> None:
+        def statements(db: sqlite3.Connection) -> None:
+            db.executemany(
+                "DELETE FROM leases WHERE shard = ? AND holder = ?",
+                [(shard, holder) for shard in shards],
+            )
+
+        self._write(statements)
+
+    def leave(self, holder: str) -> None:
+        def statements(db: sqlite3.Connection) -> None:
+            db.execute("DELETE FROM members WHERE holder = ?", (holder,))
+            db.execute("DELETE FROM leases WHERE holder = ?", (holder,))
+
+        self._write(statements)
+
+    def claim(self, key: str, tick: float, shard: int, holder: str, now: float) -> bool:
+        def statements(db: sqlite3.Connection) -> bool:
+            held = db.execute(
+                "SELECT 1 FROM leases WHERE shard = ? AND holder = ? AND expires > ?",
+                (shard, holder, now),
+            ).fetchone()
+            if held is None:
+                return False
+            cursor = db.execute(
+                """
+                INSERT INTO fired VALUES (?, ?, ?)
+                ON CONFLICT (key) DO UPDATE SET tick = excluded.tick, holder = excluded.holder
+                WHERE fired.tick < excluded.tick
+                """,
+                (key, tick, holder),
+            )
+            return cursor.rowcount == 1
+
+        return self._write(statements)
+
+    def fired(self, keys: Iterable[str]) -> Dict[str, float]:
+        wanted = set(keys)
+        with self._lock:
+            rows = self._db.execute("SELECT key, tick FROM fired")
+            return {key: tick for key, tick in rows if key in wanted}
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def default_holder() -> str:
+    # unique among live replicas; a restarted replica is a new member
+    return f"{gethostname()}:{getpid()}"
+
+
+def _preference(holder: str, shard: int) -> bytes:
+    # each holder tries free shards in its own order, so replicas joining
+    # together mostly don't contend for the same ones
+    return blake2b(f"{holder}:{shard}".encode(), digest_size=8).digest()
+
+
+class Coordinator:
+    """
+    Splits schedules between replicas sharing a `backend`. Schedule names hash
+    to one of `shards` shards, and each shard is leased by one replica at a
+    time. Every `ttl / 3` seconds a replica renews its membership and leases,
+    gives up shards beyond its fair share (so replicas that join get some),
+    and takes free ones up to it (so shards of replicas that left or died are
+    taken over). A tick is only fired by the replica that claims it, which it
+    can only do while its lease holds, so each tick fires at most once, and
+    (with catch-up by whoever takes over a shard) once.
+    """
+
+    def __init__(
+        self,
+        backend: LeaseBackend,
+        shards: int = LEASE_SHARDS,
+        ttl: float = LEASE_TTL,
+        holder: Optional[str] = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        if shards < 1:
+            raise ValueError("the number of lease shards must be at least 1")
+        if ttl <= 0:
+            raise ValueError("the lease TTL must be positive")
+        self.backend = backend
+        self.shards = shards
+        self.ttl = ttl
+        self.holder = holder or default_holder()
+        self.clock = clock
+        self.renew_at = 0.0
+        self._owned: Set[int] = set()
+        # when the leases on `_owned` lapse unless renewed
+        self._expires = 0.0
+
+    def shard(self, key: str) -> int:
+        return jump_hash(key, self.shards)
+
+    def owned(self) -> Set[int]:
+        """Shards this replica holds leases on"""
+        return set(self._owned) if self.clock() < self._expires else set()
+
+    def owns(self, key: str) -> bool:
+        return self.shard(key) in self.owned()
+
+    def rebalance(self) -> Set[int]:
+        """Renew and rebalance leases, returning the shards newly taken"""
+        now = self.clock()
+        self.renew_at = now + self.ttl / 3
+        try:
+            members = self.backend.join(self.holder, self.ttl, now)
+            leases = self.backend.leases(now)
+            share = ceil(self.shards / max(len(members), 1))
+            mine = sorted(shard for shard, holder in leases.items() if holder == self.holder)
+            if len(mine) > share:
+                self.backend.release(self.holder, mine[share:])
+                logger.info("Released shards", holder=self.holder, shards=len(mine) - share)
+                mine = mine[:share]
+            free = sorted(
+                (shard for shard in range(self.shards) if shard not in leases),
+                key=lambda shard: _preference(self.holder, shard),
+            )
+            wanted = mine + free[: max(share - len(mine), 0)]
+            held = self.backend.renew(self.holder, wanted, self.ttl, now)
+        except Exception as err:
+            # without knowing what we hold, hold nothing, so nothing fires twice
+            logger.error("Failed to renew leases", holder=self.holder, error=str(err))
+            self._owned, self._expires = set(), 0.0
+            return set()
+
+        gained = held - self.owned()
+        if gained or len(held) != len(self._owned):
+            logger.info(
+                "Rebalanced shards", holder=self.holder, shards=len(held), members=len(members)
+            )
+        self._owned, self._expires = held, now + self.ttl
+        return gained
+
+    def claim(self, key: str, tick: float) -> bool:
+        """Whether this replica should fire `key`'s `tick`; true for one replica only"""
+        shard = self.shard(key)
+        if shard not in self.owned():
+            return False
+        try:
+            return self.backend.claim(key, tick, shard, self.holder, self.clock())
+        except Exception as err:
+            logger.error("Failed to claim tick", key=key, error=str(err))
+            return False
+
+    def fired(self, keys: Iterable[str]) -> Dict[str, float]:
+        try:
+            return self.backend.fired(keys)
+        except Exception as err:
+            # missing ticks aren't fired twice either way, as claims only move forward
+            logger.error("Failed to read fired ticks", holder=self.holder, error=str(err))
+            return {}
+
+    def close(self) -> None:
+        """Leave, so the shards held are taken over at the others' next renewal"""
+        try:
+            self.backend.leave(self.holder)
+        except Exception as err:
+            logger.error("Failed to release leases", holder=self.holder, error=str(err))
+        self._owned, self._expires = set(), 0.0
+        self.backend.close()
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+import re
+from threading import BoundedSemaphore, Event, Lock
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Optional
+
+from .caller import FailedAPICall, HTTPResponse
+from .logging import getLogger
+from .timing import LatencyHistogram, TimingHistograms
+
+logger = getLogger(__name__)
+
+DEFAULT_MAX_IN_FLIGHT = 64
+
+RATE_PATTERN = re.compile(r"^\s*([0-9]*\.?[0-9]+)\s*(?:/\s*(s|sec|m|min|h|hr))?\s*$")
+RATE_UNITS = {None: 1.0, "s": 1.0, "sec": 1.0, "m": 60.0, "min": 60.0, "h": 3600.0, "hr": 3600.0}
+
+
+def parse_rate(value: str) -> float:
+    """Calls per second from "N", "N/s", "N/m", or "N/h" """
+    match = RATE_PATTERN.match(value)
+    if not match or float(match.group(1)) <= 0:
+        raise ValueError(f'"{value}" is not a rate like 10/s, 600/m, or 2.5')
+    return float(match.group(1)) / RATE_UNITS[match.group(2)]
+
+
+@dataclass
+class LoadReport:
+    """
+    The outcome of an open-loop run. `latency` is measured from when each call
+    was due to start, so calls delayed behind slow ones (or by the in-flight
+    limit) count their wait: it's corrected for coordinated omission.
+    `service_time` is measured from when each call actually started.
+    """
+
+    target_rate: float
+    duration: float
+    max_in_flight: int
+    sent: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    # calls that started more than one interval after they were due
+    late: int = 0
+    # from the first call being due until the last one finished (or the schedule ended)
+    elapsed: float = 0.0
+    statuses: Dict[str, int] = field(default_factory=dict)
+    latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+    service_time: LatencyHistogram = field(default_factory=LatencyHistogram)
+    timings: TimingHistograms = field(default_factory=TimingHistograms)
+
+    @property
+    def achieved_rate(self) -> float:
+        return (self.succeeded + self.failed) / self.elapsed if self.elapsed else 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "target_rate": self.target_rate,
+            "achieved_rate": round(self.achieved_rate, 3),
+            "duration": self.duration,
+            "elapsed": round(self.elapsed, 3),
+            "max_in_flight": self.max_in_flight,
+            "sent": self.sent,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "late": self.late,
+            "statuses": dict(sorted(self.statuses.items())),
+            "latency": self.latency.summary(),
+            "service_time": self.service_time.summary(),
+        }
+
+
+def run_load(
+    execute: Callable[[], List[HTTPResponse]],
+    rate: float,
+    duration: float,
+    max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+    cancel: Optional[Event] = None,
+    clock: Callable[[], float] = perf_counter,
+) -> LoadReport:
+    """
+    Call `execute` `rate` times a second for `duration` seconds on a fixed
+    schedule that doesn't wait for responses, with at most `max_in_flight`
+    calls outstanding. When the limit is reached, the schedule falls behind
+    (and the lateness is reported) instead of dropping calls.
+    """
+    if rate <= 0 or duration <= 0:
+        raise ValueError("the rate and duration must be positive")
+    if max_in_flight < 1:
+        raise ValueError("at least one call must be allowed in flight")
+
+    cancel = cancel or Event()
+    report = LoadReport(target_rate=rate, duration=duration, max_in_flight=max_in_flight)
+    interval = 1.0 / rate
+    slots = BoundedSemaphore(max_in_flight)
+    lock = Lock()
+    finished = [0.0]
+
+    def one(due: float) -> None:
+        started = clock()
+        try:
+            responses = execute()
+            succeeded = True
+        except FailedAPICall as err:
+            responses, succeeded = err.responses, False
+        except Exception as err:
+            logger.error("Call failed", error=f"{err.__class__.__name__}: {err}")
+            responses, succeeded = [], False
+        finally:
+            slots.release()
+        ended = clock()
+        status = f"{responses[-1].status:03d}" if responses else "000"
+        with lock:
+            report.latency.record(ended - due)
+            report.service_time.record(ended - started)
+            report.statuses[status] = report.statuses.get(status, 0) + 1
+            if succeeded:
+                report.succeeded += 1
+            else:
+                report.failed += 1
+            if started - due > interval:
+                report.late += 1
+            finished[0] = max(finished[0], ended)
+        report.timings.record_all(response.timings for response in responses)
+
+    calls = int(rate * duration)
+    with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="caller-load") as pool:
+        start = clock()
+        for idx in range(calls):
+            due = start + idx * interval
+            wait = due - clock()
+            if wait > 0 and cancel.wait(wait):
+                break
+            # blocks while max_in_flight calls are outstanding; `due` stays put
+            slots.acquire()
+            if cancel.is_set():
+                slots.release()
+                break
+            pool.submit(one, due)
+            report.sent += 1
+
+    # at least the schedule's own length, so keeping up reads as the target rate
+    report.elapsed = max(finished[0] - start, report.sent * interval)
+    return report
@@ -1,45 +1,157 @@
+import atexit
 import logging
 from os import environ
+from queue import Empty, Queue
 import sys
-from typing import Any, Dict
-
-import ddtrace
-from ddtrace import tracer
-import structlog
+from threading import Lock, Thread
+from typing import Any, Dict, List, Optional, TextIO
 
 LOG_LEVEL = getattr(logging, environ.get("LOG_LEVEL", "INFO").upper())
 
+# "fast" renders records without inspecting frames and writes them from a
+# background thread, in batches; "default" logs synchronously through logging
+LOG_MODE = environ.get("LOG_MODE", "default").lower()
+FAST_LOGGING = LOG_MODE == "fast"
+
+# add the filename, function, and line number of each log call (inspects frames)
+LOG_CALLSITE = environ.get("LOG_CALLSITE", "false" if FAST_LOGGING else "true").lower() == "true"
+
+# records waiting to be written in fast mode before logging blocks
+LOG_QUEUE_SIZE = int(environ.get("LOG_QUEUE_SIZE", "10000"))
+
+# same switch ddtrace itself uses; when off, ddtrace is never imported
+TRACING_ENABLED = environ.get("DD_TRACE_ENABLED", "true").lower() not in ("false", "0")
+
 # https://www.structlog.org/en/stable/standard-library.html
 
+_tracer_fields: Optional[Dict[str, str]] = None
+
 
 def tracer_injection(logger: Any, log_method: Any, event_dict: Dict) -> Dict:
+    global _tracer_fields
+    import ddtrace
+
     # get correlation ids from current tracer context
-    span = tracer.current_span()
+    span = ddtrace.tracer.current_span()
     trace_id, span_id = (span.trace_id, span.span_id) if span else (None, None)
 
     # add ids to structlog event dictionary
     event_dict["dd.trace_id"] = str(trace_id or 0)
     event_dict["dd.span_id"] = str(span_id or 0)
 
-    # add the env, service, and version configured for the tracer
-    event_dict["dd.env"] = ddtrace.config.env or ""
-    event_dict["dd.service"] = ddtrace.config.service or ""
-    event_dict["dd.version"] = ddtrace.config.version or ""
+    # add the env, service, and version configured for the tracer; these are
+    # fixed once the tracer is set up, so read them once
+    if _tracer_fields is None:
+        _tracer_fields = {
+            "dd.env": ddtrace.config.env or "",
+            "dd.service": ddtrace.config.service or "",
+            "dd.version": ddtrace.config.version or "",
+        }
+    event_dict.update(_tracer_fields)
 
     return event_dict
 
 
-structlog.configure(
-    processors=[
+class BackgroundWriter:
+    """
+    Writes lines to a stream from a daemon thread, joining whatever has queued
+    up into one write, so logging never waits on the stream (unless the queue
+    fills). `flush` waits for everything queued so far; `close` also stops.
+    """
+
+    def __init__(
+        self, stream: TextIO, max_queued: int = LOG_QUEUE_SIZE, max_batch: int = 512
+    ) -> None:
+        self.stream = stream
+        self.max_batch = max_batch
+        self._queue: "Queue[Optional[str]]" = Queue(maxsize=max_queued)
+        self._thread = Thread(target=self._run, name="caller-log-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, line: str) -> None:
+        self._queue.put(line)
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except Empty:
+                    break
+            lines = [line for line in batch if line is not None]
+            try:
+                if lines:
+                    self.stream.write("\n".join(lines) + "\n")
+                    self.stream.flush()
+            except (OSError, ValueError):
+                pass  # nowhere left to report it; keep draining so nothing blocks
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if len(lines) < len(batch):
+                return
+
+    def flush(self) -> None:
+        if self._thread.is_alive():
+            self._queue.join()
+
+    def close(self) -> None:
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+
+class QueueLogger:
+    """A structlog logger handing rendered records to a `BackgroundWriter`"""
+
+    def __init__(self, writer: BackgroundWriter, name: str) -> None:
+        self.writer = writer
+        self.name = name
+
+    def msg(self, message: str) -> None:
+        self.writer.write(message)
+
+    log = debug = info = warn = warning = error = err = critical = exception = fatal = msg
+
+
+_writer: Optional[BackgroundWriter] = None
+
+
+def flush() -> None:
+    """Wait until every record logged so far has been written (in fast mode)"""
+    if _writer is not None:
+        _writer.flush()
+
+
+_configured = False
+_configure_lock = Lock()
+
+
+def configure() -> None:
+    """
+    Configure structlog, on first use rather than import, so that importing
+    this package stays cheap (structlog, and ddtrace when tracing is enabled,
+    only get imported once something is actually logged).
+    """
+    global _configured
+    with _configure_lock:
+        if _configured:
+            return
+        _configure()
+        _configured = True
+
+
+def _configure() -> None:
+    global _writer
+    import structlog
+
+    shared: List[Any] = [
         structlog.contextvars.merge_contextvars,
         # https://docs.datadoghq.com/tracing/other_telemetry/connect_logs_and_traces/python/
-        tracer_injection,  # type: ignore[list-item]
-        # If log level is too low, abort pipeline and throw away log entry.
-        structlog.stdlib.filter_by_level,
-        # Add the name of the logger to event dict.
-        structlog.stdlib.add_logger_name,
-        # Add log level to event dict.
-        structlog.stdlib.add_log_level,
+        *([tracer_injection] if TRACING_ENABLED else []),
+    ]
+    formatting: List[Any] = [
         # Perform %-style formatting.
         structlog.stdlib.PositionalArgumentsFormatter(),
         # Add a timestamp in ISO 8601 format.
@@ -53,6 +165,8 @@ structlog.configure(
         structlog.processors.format_exc_info,
         # If some value is in bytes, decode it to a unicode str.
         structlog.processors.UnicodeDecoder(),
+    ]
+    callsite: List[Any] = [
         # Add callsite parameters.
         structlog.processors.CallsiteParameterAdder(
             {
@@ -61,21 +175,58 @@ structlog.configure(
                 structlog.processors.CallsiteParameter.LINENO,
             }
         ),
-        # Render the final event dict as JSON.
-        structlog.processors.JSONRenderer(),
-    ],
-    # `wrapper_class` is the bound logger that you get back from
-    # get_logger(). This one imitates the API of `logging.Logger`.
-    wrapper_class=structlog.stdlib.BoundLogger,
-    # `logger_factory` is used to create wrapped loggers that are used for
-    # OUTPUT. This one returns a `logging.Logger`. The final value (a JSON
-    # string) from the final processor (`JSONRenderer`) will be passed to
-    # the method of the same name as that you've called on the bound logger.
-    logger_factory=structlog.stdlib.LoggerFactory(),
-    # Effectively freeze configuration after creating the first bound
-    # logger.
-    cache_logger_on_first_use=True,
-)
+    ]
+
+    if FAST_LOGGING:
+        writer = _writer = BackgroundWriter(sys.stdout)
+        # flush on the way out, including after exit(); every entry point's
+        # SIGTERM handler exits through it, but a SIGKILL loses what's queued
+        atexit.register(writer.close)
+        structlog.configure(
+            processors=[
+                *shared,
+                # Add the name of the logger and the log level to event dict.
+                structlog.stdlib.add_logger_name,
+                structlog.processors.add_log_level,
+                *formatting,
+                *(callsite if LOG_CALLSITE else []),
+                # Render the final event dict as JSON.
+                structlog.processors.JSONRenderer(),
+            ],
+            # drops records below the level before running any processors
+            wrapper_class=structlog.make_filtering_bound_logger(LOG_LEVEL),
+            logger_factory=lambda *args: QueueLogger(writer, args[0] if args else ""),
+            cache_logger_on_first_use=True,
+        )
+        return
+
+    structlog.configure(
+        processors=[
+            # If log level is too low, abort pipeline and throw away log entry.
+            structlog.stdlib.filter_by_level,
+            *shared,
+            # Add the name of the logger to event dict.
+            structlog.stdlib.add_logger_name,
+            # Add log level to event dict.
+            structlog.stdlib.add_log_level,
+            *formatting,
+            *(callsite if LOG_CALLSITE else []),
+            # Render the final event dict as JSON.
+            structlog.processors.JSONRenderer(),
+        ],
+        # `wrapper_class` is the bound logger that you get back from
+        # get_logger(). This one imitates the API of `logging.Logger`.
+        wrapper_class=structlog.stdlib.BoundLogger,
+        # `logger_factory` is used to create wrapped loggers that are used for
+        # OUTPUT. This one returns a `logging.Logger`. The final value (a JSON
+        # string) from the final processor (`JSONRenderer`) will be passed to
+        # the method of the same name as that you've called on the bound logger.
+        logger_factory=structlog.stdlib.LoggerFactory(),
+        # Effectively freeze configuration after creating the first bound
+        # logger.
+        cache_logger_on_first_use=True,
+    )
+
 
 logging.basicConfig(
     format="%(message)s",
@@ -85,10 +236,28 @@ logging.basicConfig(
 
 
 def new_log_context_vars(**kwargs: Any) -> None:
+    import structlog
+
     structlog.contextvars.clear_contextvars()
     structlog.contextvars.bind_contextvars(**kwargs)
 
 
+class LazyLogger:
+    """Stands in for a structlog logger, configuring logging on the first call"""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._logger: Optional[Any] = None
+
+    def __getattr__(self, attr: str) -> Any:
+        if self._logger is None:
+            configure()
+            import structlog
+
+            self._logger = structlog.get_logger(self.name)
+        return getattr(self._logger, attr)
+
+
 # wrapper method to make logger definition "standard" and usable in any file
 def getLogger(name: str) -> Any:
-    return structlog.get_logger(name)
+    return LazyLogger(name)
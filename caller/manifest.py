@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+import argparse
+from concurrent.futures import as_completed, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from os.path import expandvars
+from queue import Empty
+from time import perf_counter
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, TYPE_CHECKING
+
+from .caller import FailedAPICall, HTTPResponse
+from .files import load_entries
+from .hashing import jump_hash
+from .logging import getLogger
+
+if TYPE_CHECKING:
+    from multiprocessing import Queue
+
+logger = getLogger(__name__)
+
+
+@dataclass
+class ManifestEntry:
+    name: str
+    args: argparse.Namespace
+
+
+@dataclass
+class ManifestResult:
+    name: str
+    succeeded: bool
+    status: int
+    attempts: int
+    responses: List[HTTPResponse] = field(repr=False)
+    error: Optional[str] = None
+    # seconds the call took, including every attempt and the waits between them
+    duration: float = 0.0
+
+
+def load_manifest(
+    path: str, parse_args: Callable[[Any], argparse.Namespace]
+) -> List[ManifestEntry]:
+    """
+    Read call specs from a JSON, JSON-lines, or YAML file; each entry takes the
+    same fields as the CLI (helm-style values, or a list of CLI arguments
+    under "args") and an optional "name".
+    """
+    entries = []
+    for idx, entry in enumerate(load_entries(path, "targets")):
+        if isinstance(entry, list):
+            name, values = f"entry-{idx}", entry
+        else:
+            values = entry.get("args", entry)
+            name = entry.get("name") or f"entry-{idx}"
+        entries.append(ManifestEntry(name=name, args=parse_args(values)))
+    return entries
+
+
+def run_entry(
+    entry: ManifestEntry, execute: Callable[[argparse.Namespace], List[HTTPResponse]]
+) -> ManifestResult:
+    start = perf_counter()
+    try:
+        responses = execute(entry.args)
+    except FailedAPICall as err:
+        return ManifestResult(
+            name=entry.name,
+            succeeded=False,
+            status=err.status,
+            attempts=err.attempts,
+            responses=err.responses,
+            error=str(err),
+            duration=perf_counter() - start,
+        )
+    except Exception as err:  # a bad entry shouldn't take down the rest of the run
+        return ManifestResult(
+            name=entry.name,
+            succeeded=False,
+            status=0,
+            attempts=0,
+            responses=[],
+            error=f"{err.__class__.__name__}: {err}",
+            duration=perf_counter() - start,
+        )
+    return ManifestResult(
+        name=entry.name,
+        succeeded=True,
+        status=responses[-1].status,
+        attempts=len(responses),
+        responses=responses,
+        duration=perf_counter() - start,
+    )
+
+
+def run_manifest(
+    entries: List[ManifestEntry],
+    execute: Callable[[argparse.Namespace], List[HTTPResponse]],
+    workers: int = 4,
+) -> List[ManifestResult]:
+    """Run every entry with at most `workers` calls in flight, results in manifest order"""
+    with ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix="caller") as pool:
+        return list(pool.map(lambda entry: run_entry(entry, execute), entries))
+
+
+def shard_of(host: str, port: int, shards: int) -> int:
+    """The shard (of `shards`) calls to an origin belong to"""
+    return jump_hash(f"{host}:{port}", shards)
+
+
+def shard_entries(
+    entries: Sequence[ManifestEntry], shards: int
+) -> List[List[Tuple[int, ManifestEntry]]]:
+    """Entries (with their index) split by the origin they call"""
+    split: List[List[Tuple[int, ManifestEntry]]] = [[] for _ in range(shards)]
+    for idx, entry in enumerate(entries):
+        split[shard_of(expandvars(entry.args.host), entry.args.port, shards)].append((idx, entry))
+    return split
+
+
+def _run_shard(
+    shard: int,
+    entries: List[Tuple[int, ManifestEntry]],
+    execute: Callable[[argparse.Namespace], List[HTTPResponse]],
+    workers: int,
+    results: Queue,
+    initializer: Optional[Callable[..., None]],
+    initargs: Tuple[Any, ...],
+) -> None:
+    """A worker process: run a shard's entries, sending each result as it finishes"""
+    if initializer is not None:
+        initializer(*initargs)
+    with ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix="caller") as pool:
+        futures = {pool.submit(run_entry, entry, execute): idx for idx, entry in entries}
+        for future in as_completed(futures):
+            results.put((shard, futures[future], future.result()))
+    results.put((shard, None, None))
+
+
+def run_manifest_processes(
+    entries: Sequence[ManifestEntry],
+    execute: Callable[[argparse.Namespace], List[HTTPResponse]],
+    processes: int,
+    workers: int = 4,
+    initializer: Optional[Callable[..., None]] = None,
+    initargs: Tuple[Any, ...] = (),
+) -> Iterator[Tuple[int, ManifestResult]]:
+    """
+    Run every entry across `processes` worker processes, each with at most
+    `workers` calls in flight, yielding (index, result) as results arrive.
+    Entries are sharded by origin, so each process keeps warm connections to
+    its own hosts (and a manifest calling one host runs in one process).
+    Workers are spawned rather than forked, so `execute` and `initializer`
+    (run first in each, say to enable process-wide features) must be
+    importable functions. An entry whose worker dies fails with status 0.
+    """
+    import multiprocessing
+
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    shards = {idx: shard for idx, shard in enumerate(shard_entries(entries, processes)) if shard}
+    workers_by_shard = {
+        idx: context.Process(
+            target=_run_shard,
+            args=(idx, shard, execute, workers, results, initializer, initargs),
+            name=f"caller-{idx}",
+            daemon=True,
+        )
+        for idx, shard in shards.items()
+    }
+    logger.info(
+        "Running manifest in processes",
+        processes=len(workers_by_shard),
+        entries={idx: len(shard) for idx, shard in shards.items()},
+    )
+    for process in workers_by_shard.values():
+        process.start()
+
+    pending: Dict[int, Dict[int, ManifestEntry]] = {
+        idx: dict(shard) for idx, shard in shards.items()
+    }
+    try:
+        while pending:
+            try:
+                shard, index, result = results.get(timeout=1)
+            except Empty:
+                for shard, process in list(workers_by_shard.items()):
+                    if shard in pending and not process.is_alive():
+                        logger.error("Worker died", worker=process.name, code=process.exitcode)
+                        for index, entry in pending.pop(shard).items():
+                            yield index, ManifestResult(
+                                name=entry.name,
+                                succeeded=False,
+                                status=0,
+                                attempts=0,
+                                responses=[],
+                                error=f"worker exited with code {process.exitcode}",
+                            )
+                continue
+            if index is None:
+                pending.pop(shard, None)
+                continue
+            pending[shard].pop(index, None)
+            yield index, result
+    finally:
+        for process in workers_by_shard.values():
+            if pending:
+                process.terminate()
+            process.join()
+
+
+def exit_code(results: List[ManifestResult]) -> int:
+    return 0 if all(result.succeeded for result in results) else 1
@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from os import environ, replace
+import re
+from threading import Lock, Thread
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence, Tuple, TYPE_CHECKING, Union
+from urllib.request import Request, urlopen
+
+if TYPE_CHECKING:
+    from .caller import CallPlan, HTTPResponse
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# label sets a metric keeps before folding new ones into OVERFLOW
+MAX_SERIES = int(environ.get("METRICS_MAX_SERIES", "500"))
+OVERFLOW = "__overflow__"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# path segments that are probably ids: numbers, uuids, and long hex strings
+ID_SEGMENT = re.compile(
+    r"^([0-9]+|[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}"
+    r"|[0-9a-fA-F]{16,})$"
+)
+
+Labels = Tuple[str, ...]
+Number = Union[int, float]
+
+
+def escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_value(value: Number) -> str:
+    # ints as is, floats in full: %g's six significant digits lose precision
+    # once a sum or count grows large
+    return str(value) if isinstance(value, int) else repr(value)
+
+
+def path_template(path: Optional[str]) -> str:
+    """
+    A call's path as configured (before env vars are expanded, so "/users/$ID"
+    stays as is) with id-like segments replaced by ":id", to bound cardinality
+    """
+    segments = (path or "").split("?", 1)[0].strip("/").split("/")
+    return "/" + "/".join(":id" if ID_SEGMENT.match(s) else s for s in segments if s)
+
+
+def status_class(status: int) -> str:
+    return "none" if status == 0 else f"{status // 100}xx"
+
+
+class Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str], max_series: int) -> None:
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.max_series = max_series
+
+    def _key(self, series: Mapping[Labels, object], labels: Labels) -> Labels:
+        if labels in series or len(series) < self.max_series:
+            return labels
+        return tuple(OVERFLOW for _ in labels)
+
+    def _format(self, labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(zip(self.labels, labels)) + ([extra] if extra else [])
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in pairs) + "}"
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    @abstractmethod
+    def lines(self) -> Iterator[str]:
+        """The metric's samples, one line each"""
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str], max_series: int) -> None:
+        super().__init__(name, help, labels, max_series)
+        self.series: Dict[Labels, Number] = {}
+
+    def inc(self, labels: Labels, amount: Number = 1) -> None:
+        key = self._key(self.series, labels)
+        self.series[key] = self.series.get(key, 0) + amount
+
+    def lines(self) -> Iterator[str]:
+        for labels, value in sorted(self.series.items()):
+            yield f"{self.name}{self._format(labels)} {format_value(value)}"
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str],
+        max_series: int,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, help, labels, max_series)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: counts per bucket (the last is +Inf), and the sum
+        self.series: Dict[Labels, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, labels: Labels, value: float) -> None:
+        key = self._key(self.series, labels)
+        if key not in self.series:
+            self.series[key] = ([0] * (len(self.buckets) + 1), [0.0])
+        counts, total = self.series[key]
+        counts[bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    def lines(self) -> Iterator[str]:
+        for labels, (counts, total) in sorted(self.series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                yield f"{self.name}_bucket{self._format(labels, ('le', le))} {cumulative}"
+            yield f"{self.name}_sum{self._format(labels)} {format_value(total[0])}"
+            yield f"{self.name}_count{self._format(labels)} {cumulative}"
+
+
+class CallMetrics:
+    """
+    Prometheus metrics for calls, in the text exposition format (0.0.4): served
+    on /metrics for long-running use, or written to a textfile (for
+    node_exporter's textfile collector) or pushed to a Pushgateway at exit.
+    Safe to update from several threads.
+    """
+
+    LABELS = ("host", "path", "method")
+
+    def __init__(self, max_series: int = MAX_SERIES) -> None:
+        self._lock = Lock()
+        self.calls = Counter(
+            "caller_calls_total",
+            "Calls made, by outcome (succeeded, failed, cancelled, rejected, or deadline)",
+            self.LABELS + ("outcome",),
+            max_series,
+        )
+        self.attempts = Counter(
+            "caller_attempts_total",
+            "Attempts made, by response status class (none for no response)",
+            self.LABELS + ("status_class",),
+            max_series,
+        )
+        self.retries = Counter(
+            "caller_retries_total", "Attempts made after the first", self.LABELS, max_series
+        )
+        self.call_duration = Histogram(
+            "caller_call_duration_seconds",
+            "Calls' duration, including every attempt and the waits between them",
+            self.LABELS,
+            max_series,
+        )
+        self.attempt_duration = Histogram(
+            "caller_attempt_duration_seconds", "Attempts' duration", self.LABELS, max_series
+        )
+        self.metrics: List[Metric] = [
+            self.calls,
+            self.attempts,
+            self.retries,
+            self.call_duration,
+            self.attempt_duration,
+        ]
+
+    def observe(
+        self, plan: CallPlan, responses: List[HTTPResponse], outcome: str, seconds: float
+    ) -> None:
+        labels = (plan.host, path_template(plan.path), plan.method.value.lower())
+        with self._lock:
+            self.calls.inc(labels + (outcome,))
+            self.call_duration.observe(labels, seconds)
+            if len(responses) > 1:
+                self.retries.inc(labels, len(responses) - 1)
+            for response in responses:
+                self.attempts.inc(labels + (status_class(response.status),))
+                total = response.timings.total if response.timings else None
+                self.attempt_duration.observe(labels, response.duration if total is None else total)
+
+    def expose(self) -> str:
+        with self._lock:
+            lines: List[str] = []
+            for metric in self.metrics:
+                lines += metric.header()
+                lines += metric.lines()
+            return "\n".join(lines) + "\n"
+
+    def write(self, path: str) -> None:
+        """Write a textfile (atomically, as node_exporter's textfile collector expects)"""
+        with open(f"{path}.part", "w") as stream:
+            stream.write(self.expose())
+        replace(f"{path}.part", path)
+
+    def push(self, url: str, job: str = "caller", timeout: float = 10.0) -> None:
+        """Replace this job's metrics on a Pushgateway at `url`"""
+        request = Request(
+            f"{url.rstrip('/')}/metrics/job/{job}",
+            data=self.expose().encode(),
+            headers={"Content-Type": CONTENT_TYPE},
+            method="PUT",
+        )
+        urlopen(request, timeout=timeout).close()
+
+    def serve(self, port: int, host: str = "") -> ThreadingHTTPServer:
+        """Serve /metrics from a daemon thread; shut it down with `.shutdown()`"""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.expose().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: object) -> None:
+                pass  # scrapes aren't worth a log line each
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        Thread(target=server.serve_forever, name="caller-metrics", daemon=True).start()
+        return server
+
+
+_DEFAULT_METRICS: Optional[CallMetrics] = None
+_DEFAULT_METRICS_LOCK = Lock()
+
+
+def default_metrics() -> CallMetrics:
+    """The process-wide metrics every caller records into"""
+    global _DEFAULT_METRICS
+    with _DEFAULT_METRICS_LOCK:
+        if _DEFAULT_METRICS is None:
+            _DEFAULT_METRICS = CallMetrics()
+        return _DEFAULT_METRICS
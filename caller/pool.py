@@ -0,0 +1,293 @@
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+from os import environ
+from os.path import isdir
+import socket
+import ssl
+from threading import Lock
+from time import perf_counter
+from typing import Any, Dict, List, Optional, Tuple, Union
+from weakref import ref, ReferenceType
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.utils import DEFAULT_CA_BUNDLE_PATH
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NameResolutionError, NewConnectionError
+from urllib3.util.connection import allowed_gai_family
+
+from .dns import default_dns, resolve
+from .timing import current
+
+# (scheme, host, port)
+Origin = Tuple[str, str, int]
+
+
+@dataclass(frozen=True)
+class PoolConfig:
+    # connections kept open per origin
+    pool_size: int = int(environ.get("POOL_SIZE", "10"))
+    # wait for a free connection instead of opening (and dropping) extras
+    pool_block: bool = environ.get("POOL_BLOCK", "false").lower() == "true"
+    # enable TCP keep-alive probes on pooled sockets, so idle connections survive
+    keepalive: bool = environ.get("POOL_KEEPALIVE", "true").lower() == "true"
+    # seconds idle before the first keep-alive probe
+    keepalive_idle: int = int(environ.get("POOL_KEEPALIVE_IDLE", "60"))
+    # resume TLS sessions when a new connection to a known host is needed
+    tls_session_reuse: bool = environ.get("POOL_TLS_SESSION_REUSE", "true").lower() == "true"
+
+
+@dataclass
+class PoolStats:
+    connections_created: int = 0
+    connections_reused: int = 0
+    tls_handshakes: int = 0
+    tls_sessions_resumed: int = 0
+
+    def __add__(self, other: PoolStats) -> PoolStats:
+        return PoolStats(
+            **{key: value + getattr(other, key) for key, value in asdict(self).items()}
+        )
+
+
+class TLSSessionCache(ssl.SSLContext):
+    """
+    An SSL context that remembers the last TLS session per server name and offers
+    it on the next handshake, so new connections can skip a full handshake.
+    """
+
+    sessions: Dict[Optional[str], ssl.SSLSession]
+    # TLS 1.3 tickets arrive after the handshake, so read the session from the
+    # most recent socket when it's next needed rather than right after wrapping
+    sockets: Dict[Optional[str], ReferenceType[ssl.SSLSocket]]
+    handshakes: int
+    resumed: int
+
+    @staticmethod
+    def create(ca_bundle: str = DEFAULT_CA_BUNDLE_PATH) -> TLSSessionCache:
+        context = TLSSessionCache(ssl.PROTOCOL_TLS_CLIENT)
+        if isdir(ca_bundle):
+            context.load_verify_locations(capath=ca_bundle)
+        else:
+            context.load_verify_locations(cafile=ca_bundle)
+        context.sessions = {}
+        context.sockets = {}
+        context.handshakes = 0
+        context.resumed = 0
+        return context
+
+    def session_for(self, server_hostname: Optional[str]) -> Optional[ssl.SSLSession]:
+        ref = self.sockets.get(server_hostname)
+        latest = ref() if ref is not None else None
+        if latest is not None and latest.session is not None:
+            self.sessions[server_hostname] = latest.session
+        return self.sessions.get(server_hostname)
+
+    def wrap_socket(self, sock: socket.socket, *args: Any, **kwargs: Any) -> ssl.SSLSocket:
+        server_hostname = kwargs.get("server_hostname")
+        if kwargs.get("session") is None:
+            kwargs["session"] = self.session_for(server_hostname)
+        try:
+            wrapped = super().wrap_socket(sock, *args, **kwargs)
+        except ssl.SSLError:
+            # a stale session can be refused; forget it and handshake from scratch
+            if kwargs["session"] is None:
+                raise
+            self.sessions.pop(server_hostname, None)
+            self.sockets.pop(server_hostname, None)
+            kwargs["session"] = None
+            wrapped = super().wrap_socket(sock, *args, **kwargs)
+        self.handshakes += 1
+        if wrapped.session_reused:
+            self.resumed += 1
+        self.sockets[server_hostname] = ref(wrapped)
+        return wrapped
+
+
+class TimedHTTPConnection(HTTPConnection):
+    """
+    Records how long resolving the host and connecting take into the calling
+    thread's `Timings` (see `timing.recording`), when there is one, and
+    resolves through the process-wide DNS cache, when it's enabled.
+    """
+
+    def _new_conn(self) -> socket.socket:
+        timings = current()
+        if timings is None and default_dns() is None:
+            return super()._new_conn()
+
+        start = perf_counter()
+        try:
+            addresses = resolve(self._dns_host.strip("[]"), allowed_gai_family())
+        except socket.gaierror as err:
+            raise NameResolutionError(self.host, self, err) from err
+        finally:
+            if timings is not None:
+                timings.dns = (timings.dns or 0.0) + perf_counter() - start
+
+        # connect to the resolved addresses in turn, as urllib3 would
+        start = perf_counter()
+        dns_host = self._dns_host
+        try:
+            for idx, address in enumerate(addresses):
+                self._dns_host = address
+                try:
+                    return super()._new_conn()
+                except (ConnectTimeoutError, NewConnectionError):
+                    if idx == len(addresses) - 1:
+                        raise
+            raise NewConnectionError(self, f"No addresses found for {self.host}")
+        finally:
+            self._dns_host = dns_host
+            if timings is not None:
+                timings.connect = (timings.connect or 0.0) + perf_counter() - start
+
+
+class TimedHTTPSConnection(TimedHTTPConnection, HTTPSConnection):
+    """Also records how long the TLS handshake takes"""
+
+    def connect(self) -> None:
+        timings = current()
+        if timings is None:
+            return super().connect()
+
+        start = perf_counter()
+        connecting = timings.connection()
+        try:
+            super().connect()
+        finally:
+            # everything but resolving and connecting (recorded by _new_conn)
+            elapsed = perf_counter() - start - (timings.connection() - connecting)
+            timings.tls = (timings.tls or 0.0) + elapsed
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class PooledAdapter(HTTPAdapter):
+    def __init__(self, config: PoolConfig) -> None:
+        # (HTTPAdapter already uses "config" for its own settings)
+        self.pool_config = config
+        # one context per trust store (requests passes `verify` as True or a CA bundle path)
+        self.tls: Dict[str, TLSSessionCache] = {}
+        super().__init__(
+            pool_connections=1,
+            pool_maxsize=config.pool_size,
+            pool_block=config.pool_block,
+        )
+
+    def socket_options(self) -> List[Tuple[int, int, Union[int, bytes]]]:
+        options = list(HTTPConnection.default_socket_options)
+        if self.pool_config.keepalive:
+            options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+            if hasattr(socket, "TCP_KEEPIDLE"):
+                options.append(
+                    (socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, self.pool_config.keepalive_idle)
+                )
+        return options
+
+    def init_poolmanager(
+        self, connections: int, maxsize: int, block: bool = False, **pool_kwargs: Any
+    ) -> None:
+        pool_kwargs["socket_options"] = self.socket_options()
+        super().init_poolmanager(connections, maxsize, block=block, **pool_kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": TimedHTTPConnectionPool,
+            "https": TimedHTTPSConnectionPool,
+        }
+
+    # only called since requests 2.32, hence the floor in pyproject.toml
+    def build_connection_pool_key_attributes(
+        self, request: requests.PreparedRequest, verify: Any, cert: Any = None
+    ) -> Tuple[Any, Any]:
+        host_params, pool_kwargs = super().build_connection_pool_key_attributes(
+            request, verify, cert
+        )
+        if not self.pool_config.tls_session_reuse or host_params["scheme"] != "https":
+            return host_params, pool_kwargs
+        if verify is False or cert is not None:
+            return host_params, pool_kwargs
+
+        ca_bundle = DEFAULT_CA_BUNDLE_PATH if verify is True else verify
+        if ca_bundle not in self.tls:
+            self.tls[ca_bundle] = TLSSessionCache.create(ca_bundle)
+        # the context already trusts the bundle, so don't have urllib3 reload it per connection
+        pool_kwargs.pop("ca_certs", None)
+        pool_kwargs.pop("ca_cert_dir", None)
+        pool_kwargs["ssl_context"] = self.tls[ca_bundle]
+        return host_params, pool_kwargs
+
+    def stats(self) -> PoolStats:
+        created = requested = 0
+        for key in self.poolmanager.pools.keys():
+            pool = self.poolmanager.pools.get(key)
+            if pool is None:
+                continue
+            created += pool.num_connections
+            requested += pool.num_requests
+        return PoolStats(
+            connections_created=created,
+            connections_reused=max(requested - created, 0),
+            tls_handshakes=sum(context.handshakes for context in self.tls.values()),
+            tls_sessions_resumed=sum(context.resumed for context in self.tls.values()),
+        )
+
+
+class SessionPool:
+    """
+    One `requests.Session` per (scheme, host, port), so every attempt and every
+    call to the same origin in this process shares warm connections.
+    """
+
+    def __init__(self, config: Optional[PoolConfig] = None) -> None:
+        self.config = config or PoolConfig()
+        self._sessions: Dict[Origin, Tuple[requests.Session, PooledAdapter]] = {}
+        self._lock = Lock()
+
+    def session(self, scheme: str, host: str, port: int) -> requests.Session:
+        origin = (scheme, host, port)
+        with self._lock:
+            if origin not in self._sessions:
+                session, adapter = requests.Session(), PooledAdapter(self.config)
+                session.mount(f"{scheme}://", adapter)
+                self._sessions[origin] = (session, adapter)
+            return self._sessions[origin][0]
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            adapters = {origin: adapter for origin, (_, adapter) in self._sessions.items()}
+        return {
+            f"{scheme}://{host}:{port}": asdict(adapter.stats())
+            for (scheme, host, port), adapter in adapters.items()
+        }
+
+    def totals(self) -> PoolStats:
+        with self._lock:
+            adapters = [adapter for _, adapter in self._sessions.values()]
+        return sum((adapter.stats() for adapter in adapters), PoolStats())
+
+    def close(self) -> None:
+        with self._lock:
+            for session, _ in self._sessions.values():
+                session.close()
+            self._sessions = {}
+
+
+_DEFAULT_POOL: Optional[SessionPool] = None
+_DEFAULT_POOL_LOCK = Lock()
+
+
+def default_pool() -> SessionPool:
+    """The process-wide pool used by callers that aren't given one"""
+    global _DEFAULT_POOL
+    with _DEFAULT_POOL_LOCK:
+        if _DEFAULT_POOL is None:
+            _DEFAULT_POOL = SessionPool()
+        return _DEFAULT_POOL
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+from enum import Enum
+import sys
+from threading import Lock
+from types import TracebackType
+from typing import Any, BinaryIO, Callable, Dict, Iterable, List, Optional, Tuple, Type
+
+from .caller import HTTPResponse
+
+DEFAULT_BUFFER_SIZE = 256 * 1024
+
+
+class ResultField(str, Enum):
+    STATUS = "status"
+    DURATION = "duration"
+    HEADERS = "headers"
+    BODY = "body"
+    TIMINGS = "timings"
+
+
+DEFAULT_RESULT_FIELDS = (
+    ResultField.STATUS,
+    ResultField.DURATION,
+    ResultField.HEADERS,
+    ResultField.BODY,
+)
+
+
+def json_encoder() -> Callable[[Any], bytes]:
+    """Serialize to compact JSON bytes, with orjson where it's installed"""
+    try:
+        import orjson
+    except ImportError:
+        from json import dumps
+
+        def encode(value: Any) -> bytes:
+            return dumps(value, separators=(",", ":"), ensure_ascii=False, default=str).encode()
+
+        return encode
+
+    def encode_fast(value: Any) -> bytes:
+        return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS)
+
+    return encode_fast
+
+
+@dataclass(frozen=True)
+class ResultFields:
+    """Which parts of each response to write"""
+
+    fields: Tuple[ResultField, ...] = DEFAULT_RESULT_FIELDS
+    # header names to keep (any case); None keeps them all
+    headers: Optional[Tuple[str, ...]] = None
+    # characters of each body to keep (as serialized, for JSON bodies); None keeps all
+    max_body: Optional[int] = None
+
+    def __post_init__(self) -> None:
+        if self.max_body is not None and self.max_body < 0:
+            raise ValueError("the body limit can't be negative")
+        if self.headers is not None:
+            object.__setattr__(self, "headers", tuple(name.lower() for name in self.headers))
+
+    def select(self, response: HTTPResponse, encode: Callable[[Any], bytes]) -> Dict[str, Any]:
+        """The selected fields of `response`, sharing (never copying) its values"""
+        selected: Dict[str, Any] = {}
+        for name in self.fields:
+            if name == ResultField.STATUS:
+                selected["status"] = response.status
+            elif name == ResultField.DURATION:
+                selected["duration"] = response.duration
+            elif name == ResultField.HEADERS:
+                selected["headers"] = self._headers(response.headers)
+            elif name == ResultField.BODY:
+                selected["body"] = self._body(response.body, encode)
+            elif name == ResultField.TIMINGS:
+                selected["timings"] = asdict(response.timings) if response.timings else None
+        return selected
+
+    def _headers(self, headers: Dict) -> Dict:
+        if self.headers is None:
+            return headers
+        return {key: value for key, value in headers.items() if key.lower() in self.headers}
+
+    def _body(self, body: Any, encode: Callable[[Any], bytes]) -> Any:
+        if self.max_body is None:
+            return body
+        # a JSON body is only serialized here when it might need truncating
+        text = body if isinstance(body, str) else encode(body).decode()
+        if len(text) <= self.max_body:
+            return body
+        return {"truncated": True, "length": len(text), "content": text[: self.max_body]}
+
+
+class ResultWriter:
+    """
+    Writes each call's responses as one JSON line to a buffered binary stream,
+    serializing them once. Safe to write to from several threads.
+    """
+
+    def __init__(
+        self,
+        stream: BinaryIO,
+        fields: ResultFields = ResultFields(),
+        flush_each: bool = False,
+        close_stream: bool = False,
+    ) -> None:
+        self.stream = stream
+        self.fields = fields
+        self.flush_each = flush_each
+        self.close_stream = close_stream
+        self.encode = json_encoder()
+        self._lock = Lock()
+
+    @staticmethod
+    def open(
+        path: str, fields: ResultFields = ResultFields(), buffer_size: int = DEFAULT_BUFFER_SIZE
+    ) -> ResultWriter:
+        """Append to the file at `path`, or write to stdout if it's "-" """
+        if path == "-":
+            # logs share stdout, so keep lines whole and in order
+            return ResultWriter(sys.stdout.buffer, fields, flush_each=True)
+        return ResultWriter(open(path, "ab", buffering=buffer_size), fields, close_stream=True)
+
+    def line(self, responses: Iterable[HTTPResponse], **context: Any) -> bytes:
+        record = {
+            **context,
+            "responses": [self.fields.select(response, self.encode) for response in responses],
+        }
+        return self.encode(record) + b"\n"
+
+    def write(self, responses: List[HTTPResponse], **context: Any) -> None:
+        line = self.line(responses, **context)
+        with self._lock:
+            if self.flush_each:
+                sys.stdout.flush()
+            self.stream.write(line)
+            if self.flush_each:
+                self.stream.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self.close_stream:
+                self.stream.close()
+            else:
+                self.stream.flush()
+
+    def __enter__(self) -> ResultWriter:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from enum import Enum
+from os import environ
+from random import random, uniform
+from time import monotonic
+from typing import Callable, Dict, Optional
+
+# headers a server can use to say when to try again, in order of preference
+RETRY_AFTER_HEADERS = ("retry-after", "ratelimit-reset")
+
+
+class RetryStrategy(str, Enum):
+    # 2^attempt seconds plus up to half a second (the original behaviour)
+    EXPONENTIAL = "exponential"
+    # anywhere from 0 to 2^attempt seconds, so many clients don't retry in step
+    FULL_JITTER = "full-jitter"
+    # anywhere from the base to 3x the previous delay
+    DECORRELATED_JITTER = "decorrelated-jitter"
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    strategy: RetryStrategy = RetryStrategy(environ.get("RETRY_STRATEGY", "exponential"))
+    # seconds; the first delay (and the scale of later ones)
+    base: float = 1.0
+    # seconds; no delay is longer, and a server asking for a longer one isn't retried
+    max_delay: float = float(environ.get("RETRY_MAX_DELAY", "300"))
+    # wait (at least) as long as a Retry-After or RateLimit-Reset header asks
+    honor_retry_after: bool = environ.get("RETRY_HONOR_RETRY_AFTER", "true").lower() == "true"
+    # seconds for all attempts and delays together; None means no limit
+    deadline: Optional[float] = None
+
+    def __post_init__(self) -> None:
+        if self.base <= 0 or self.max_delay < 0:
+            raise ValueError("retry delays must be positive")
+        if self.deadline is not None and self.deadline <= 0:
+            raise ValueError("the retry deadline must be positive")
+
+    def backoff(self, attempt: int, previous: float) -> float:
+        """Seconds to wait after the `attempt`th attempt (from 0), given the last delay"""
+        if self.strategy == RetryStrategy.FULL_JITTER:
+            delay = uniform(0, self.base * 2.0**attempt)
+        elif self.strategy == RetryStrategy.DECORRELATED_JITTER:
+            delay = uniform(self.base, max(previous, self.base) * 3)
+        else:
+            delay = self.base * 2.0**attempt + random() / 2.0
+        return min(delay, self.max_delay)
+
+
+def retry_after_seconds(headers: Dict[str, str], now: Optional[datetime] = None) -> Optional[float]:
+    """
+    Seconds a response asks to wait before retrying, from Retry-After (seconds or
+    an HTTP date) or RateLimit-Reset (seconds), if either is present and valid.
+    """
+    values = {key.lower(): value for key, value in headers.items()}
+    for header in RETRY_AFTER_HEADERS:
+        value = values.get(header, "").strip()
+        if not value:
+            continue
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            pass
+        if header == "retry-after":
+            try:
+                when = parsedate_to_datetime(value)
+            except (TypeError, ValueError):
+                continue
+            if when.tzinfo is None:
+                when = when.replace(tzinfo=timezone.utc)
+            now = now or datetime.now(timezone.utc)
+            return max((when - now).total_seconds(), 0.0)
+    return None
+
+
+class RetryBudget:
+    """
+    One call's retry clock: how long each attempt may take and how long to wait
+    between them, so that all of them together fit in the policy's deadline.
+    """
+
+    def __init__(self, policy: RetryPolicy, clock: Callable[[], float] = monotonic) -> None:
+        self.policy = policy
+        self.clock = clock
+        self.started = clock()
+        self.previous = policy.base
+
+    def remaining(self) -> float:
+        if self.policy.deadline is None:
+            return float("inf")
+        return self.policy.deadline - (self.clock() - self.started)
+
+    def timeout(self, timeout: float) -> Optional[float]:
+        """
+        The per-attempt `timeout`, shortened if less of the deadline is left, or
+        None once the deadline has passed, when no attempt should be made
+        """
+        remaining = self.remaining()
+        if remaining <= 0:
+            return None
+        return min(timeout, remaining)
+
+    def delay(self, attempt: int, headers: Dict[str, str]) -> Optional[float]:
+        """
+        Seconds to wait before retrying after the `attempt`th attempt, or None if
+        retrying isn't worthwhile: the deadline would pass before the next attempt
+        starts, or the server asked for a longer wait than `max_delay`.
+        """
+        delay = self.policy.backoff(attempt, self.previous)
+        self.previous = delay
+        if self.policy.honor_retry_after:
+            retry_after = retry_after_seconds(headers)
+            if retry_after is not None:
+                if retry_after > self.policy.max_delay:
+                    return None
+                delay = max(delay, retry_after)
+        if delay >= self.remaining():
+            return None
+        return delay
@@ -0,0 +1,293 @@
+from __future__ import annotations
+
+import argparse
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from enum import Enum
+import heapq
+from threading import Event, Lock
+import time
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Set, Tuple, TYPE_CHECKING
+from zoneinfo import ZoneInfo
+
+from .files import load_entries
+from .logging import getLogger
+
+if TYPE_CHECKING:
+    from .lease import Coordinator
+
+logger = getLogger(__name__)
+
+# the same macros kubernetes CronJobs accept
+CRON_MACROS = {
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+    "@monthly": "0 0 1 * *",
+    "@weekly": "0 0 * * 0",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@hourly": "0 * * * *",
+}
+
+MONTH_NAMES = {
+    name: idx + 1
+    for idx, name in enumerate(
+        ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"]
+    )
+}
+DAY_NAMES = {
+    name: idx for idx, name in enumerate(["sun", "mon", "tue", "wed", "thu", "fri", "sat"])
+}
+
+# bounds the search for the next tick; enough to find e.g. "0 0 29 2 *" (leap days)
+MAX_CRON_SEARCH_STEPS = 100_000
+
+
+def _parse_cron_value(value: str, names: Dict[str, int]) -> int:
+    return names[value.lower()] if value.lower() in names else int(value)
+
+
+def parse_cron_field(
+    value: str, low: int, high: int, names: Optional[Dict[str, int]] = None
+) -> FrozenSet[int]:
+    names = names or {}
+    values: Set[int] = set()
+    for part in value.split(","):
+        step = 1
+        if "/" in part:
+            part, _step = part.split("/", 1)
+            step = int(_step)
+            if step < 1:
+                raise ValueError(f'invalid step in cron field "{value}"')
+        if part in ("*", "?"):
+            start, stop = low, high
+        elif "-" in part:
+            _start, _stop = part.split("-", 1)
+            start, stop = _parse_cron_value(_start, names), _parse_cron_value(_stop, names)
+        else:
+            start = _parse_cron_value(part, names)
+            stop = high if step > 1 else start
+        if not (low <= start <= stop <= high):
+            raise ValueError(f'cron field "{value}" out of range [{low}, {high}]')
+        values.update(range(start, stop + 1, step))
+    return frozenset(values)
+
+
+@dataclass(frozen=True)
+class CronExpression:
+    expression: str
+    minutes: FrozenSet[int]
+    hours: FrozenSet[int]
+    days: FrozenSet[int]
+    months: FrozenSet[int]
+    weekdays: FrozenSet[int]
+    any_day: bool
+    any_weekday: bool
+
+    @staticmethod
+    def parse(expression: str) -> CronExpression:
+        fields = CRON_MACROS.get(expression.strip(), expression).split()
+        if len(fields) != 5:
+            raise ValueError(f'invalid cron expression "{expression}"; expected 5 fields')
+        minute, hour, day, month, weekday = fields
+        return CronExpression(
+            expression=expression,
+            minutes=parse_cron_field(minute, 0, 59),
+            hours=parse_cron_field(hour, 0, 23),
+            days=parse_cron_field(day, 1, 31),
+            months=parse_cron_field(month, 1, 12, MONTH_NAMES),
+            # 7 is also sunday
+            weekdays=frozenset(d % 7 for d in parse_cron_field(weekday, 0, 7, DAY_NAMES)),
+            any_day=day.startswith(("*", "?")),
+            any_weekday=weekday.startswith(("*", "?")),
+        )
+
+    def _day_matches(self, t: datetime) -> bool:
+        day = t.day in self.days
+        weekday = (t.weekday() + 1) % 7 in self.weekdays  # cron counts from sunday
+        # standard cron semantics: if both are restricted, either can match
+        if self.any_day or self.any_weekday:
+            return day and weekday
+        return day or weekday
+
+    def next_after(self, after: datetime) -> datetime:
+        """The first tick strictly after `after` (in `after`'s timezone)"""
+        t = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        for _ in range(MAX_CRON_SEARCH_STEPS):
+            if t.month not in self.months:
+                t = (t.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(t):
+                t = t.replace(hour=0, minute=0) + timedelta(days=1)
+            elif t.hour not in self.hours:
+                t = t.replace(minute=0) + timedelta(hours=1)
+            elif t.minute not in self.minutes:
+                t += timedelta(minutes=1)
+            else:
+                return t
+        raise ValueError(f'cron expression "{self.expression}" never fires')
+
+
+class ConcurrencyPolicy(str, Enum):
+    # same semantics as a kubernetes CronJob's concurrencyPolicy
+    ALLOW = "Allow"
+    FORBID = "Forbid"
+    REPLACE = "Replace"
+
+
+@dataclass
+class Schedule:
+    name: str
+    cron: CronExpression
+    args: argparse.Namespace
+    time_zone: str = "Etc/UTC"
+    concurrency: ConcurrencyPolicy = ConcurrencyPolicy.FORBID
+    # like a CronJob's startingDeadlineSeconds: a tick missed by more than
+    # this is skipped; None means a missed tick is always run (once)
+    starting_deadline_seconds: Optional[float] = None
+
+    def next_tick(self, after: float) -> float:
+        tz = ZoneInfo(self.time_zone)
+        return self.cron.next_after(datetime.fromtimestamp(after, tz)).timestamp()
+
+
+def load_schedules(path: str, parse_args: Callable[[Any], argparse.Namespace]) -> List[Schedule]:
+    """
+    Read schedules from a file; each entry has a name, a cron "schedule", optional
+    "time_zone", "concurrency", and "starting_deadline_seconds", and "args" given
+    either as CLI arguments or helm-style values (parsed with `parse_args`).
+    """
+    schedules = []
+    for idx, entry in enumerate(load_entries(path, "schedules")):
+        schedules.append(
+            Schedule(
+                name=entry.get("name", f"schedule-{idx}"),
+                cron=CronExpression.parse(entry["schedule"]),
+                args=parse_args(entry["args"]),
+                time_zone=entry.get("time_zone") or "Etc/UTC",
+                concurrency=ConcurrencyPolicy(entry.get("concurrency") or "Forbid"),
+                starting_deadline_seconds=entry.get("starting_deadline_seconds"),
+            )
+        )
+    names = [s.name for s in schedules]
+    if len(set(names)) != len(names):
+        raise ValueError(f'schedule names in "{path}" must be unique')
+    return schedules
+
+
+@dataclass
+class Run:
+    tick: float
+    cancel: Event = field(default_factory=Event)
+    future: Optional[Future] = None
+
+
+class Scheduler:
+    """
+    Fire many schedules from one process. Upcoming ticks are kept in a heap, so
+    each wakeup costs O(log n) in the number of schedules regardless of how
+    sparse or dense the cron expressions are.
+
+    Given a `coordinator`, several replicas can share the schedules: each only
+    fires the ticks it claims of schedules whose shard it leases, and on taking
+    over a shard fires (once, as if it had been behind) the ticks its previous
+    holder missed.
+    """
+
+    def __init__(
+        self,
+        schedules: List[Schedule],
+        execute: Callable[[argparse.Namespace, Event], Any],
+        max_workers: Optional[int] = None,
+        clock: Callable[[], float] = time.time,
+        coordinator: Optional[Coordinator] = None,
+    ) -> None:
+        self.schedules = schedules
+        self.execute = execute
+        self.clock = clock
+        self.coordinator = coordinator
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="caller")
+        self._stopped = Event()
+        self._lock = Lock()
+        self._running: Dict[str, List[Run]] = {s.name: [] for s in schedules}
+        self._heap: List[Tuple[float, int, Schedule]] = []
+        now = self._started = clock()
+        for idx, schedule in enumerate(schedules):
+            heapq.heappush(self._heap, (schedule.next_tick(now), idx, schedule))
+
+    def running(self, name: str) -> List[Run]:
+        with self._lock:
+            return [run for run in self._running[name] if not run.cancel.is_set()]
+
+    def _finished(self, name: str, run: Run) -> None:
+        with self._lock:
+            self._running[name].remove(run)
+
+    def _fire(self, schedule: Schedule, tick: float, now: float) -> Optional[Run]:
+        lateness = now - tick
+        deadline = schedule.starting_deadline_seconds
+        if deadline is not None and lateness > deadline:
+            logger.warning("Missed schedule tick", schedule=schedule.name, lateness=lateness)
+            return None
+
+        active = self.running(schedule.name)
+        if active and schedule.concurrency == ConcurrencyPolicy.FORBID:
+            logger.warning("Skipping tick, previous run still active", schedule=schedule.name)
+            return None
+        if active and schedule.concurrency == ConcurrencyPolicy.REPLACE:
+            logger.warning("Replacing previous run still active", schedule=schedule.name)
+            for previous in active:
+                previous.cancel.set()
+
+        run = Run(tick=tick)
+        with self._lock:
+            self._running[schedule.name].append(run)
+        run.future = self._executor.submit(self.execute, schedule.args, run.cancel)
+        run.future.add_done_callback(lambda _: self._finished(schedule.name, run))
+        return run
+
+    def _due(self, schedule: Schedule, tick: float, now: float) -> None:
+        if self.coordinator is not None and not self.coordinator.claim(schedule.name, tick):
+            return
+        self._fire(schedule, tick, now)
+
+    def _rebalance(self, coordinator: Coordinator, now: float) -> None:
+        gained = coordinator.rebalance()
+        if not gained:
+            return
+        taken = [s for s in self.schedules if coordinator.shard(s.name) in gained]
+        fired = coordinator.fired(s.name for s in taken)
+        for schedule in taken:
+            # the first tick after the last fired (by anyone) is due if it's passed
+            tick = schedule.next_tick(fired.get(schedule.name, self._started))
+            if tick <= now:
+                self._due(schedule, tick, now)
+
+    def tick(self, now: float) -> float:
+        """Fire every schedule due at `now`, returning when the next one is due"""
+        if self.coordinator is not None and self.coordinator.renew_at <= now:
+            self._rebalance(self.coordinator, now)
+        while self._heap and self._heap[0][0] <= now:
+            due, idx, schedule = heapq.heappop(self._heap)
+            self._due(schedule, due, now)
+            # ticks missed while we were behind are coalesced into the one above
+            heapq.heappush(self._heap, (schedule.next_tick(max(due, now)), idx, schedule))
+        due = self._heap[0][0] if self._heap else float("inf")
+        return due if self.coordinator is None else min(due, self.coordinator.renew_at)
+
+    def run(self) -> None:
+        logger.info("Starting scheduler", schedules=len(self.schedules))
+        while not self._stopped.is_set():
+            due = self.tick(self.clock())
+            self._stopped.wait(timeout=min(max(due - self.clock(), 0.0), 60.0))
+        with self._lock:
+            for runs in self._running.values():
+                for run in runs:
+                    run.cancel.set()
+        self._executor.shutdown(wait=True)
+        if self.coordinator is not None:
+            self.coordinator.close()
+        logger.info("Stopped scheduler")
+
+    def stop(self) -> None:
+        self._stopped.set()
@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, fields
+from json import dumps, loads
+from os import replace
+from os.path import exists
+from threading import local, Lock
+from time import perf_counter
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+# sub-buckets per power of two are 2^(bits - 1), so values are kept to within
+# 1 / 2^(bits - 1) of what was recorded; 8 bits is within 0.8%
+DEFAULT_SIGNIFICANT_BITS = 8
+
+
+@dataclass
+class Timings:
+    """
+    Seconds spent in each phase of one attempt. Connection phases are 0 when a
+    pooled connection was reused, and None when the client can't tell them apart.
+    """
+
+    # resolving the host
+    dns: Optional[float] = 0.0
+    # opening the TCP connection
+    connect: Optional[float] = 0.0
+    # the TLS handshake
+    tls: Optional[float] = 0.0
+    # from sending the request until the response headers arrive
+    ttfb: Optional[float] = None
+    # from the response headers until the body is read
+    body: Optional[float] = None
+    # the whole attempt, including failed ones
+    total: Optional[float] = None
+
+    def connection(self) -> float:
+        return (self.dns or 0.0) + (self.connect or 0.0) + (self.tls or 0.0)
+
+
+PHASES = tuple(f.name for f in fields(Timings))
+
+
+_recording = local()
+
+
+@contextmanager
+def recording() -> Iterator[Timings]:
+    """Collect connection timings from this thread's requests into a new `Timings`"""
+    timings = Timings()
+    _recording.timings = timings
+    try:
+        yield timings
+    finally:
+        _recording.timings = None
+
+
+def current() -> Optional[Timings]:
+    """The `Timings` being recorded in this thread, if any"""
+    return getattr(_recording, "timings", None)
+
+
+class PhaseTrace:
+    """
+    An httpx/httpcore "trace" extension recording an attempt's phases into
+    `timings`. httpcore resolves and connects in one step, so DNS is unknown.
+    """
+
+    # httpcore events (less their "connection." prefix) and the phases they time
+    CONNECTION_PHASES = {
+        "connect_tcp": "connect",
+        "connect_unix_socket": "connect",
+        "start_tls": "tls",
+    }
+
+    def __init__(self, timings: Timings) -> None:
+        self.timings = timings
+        self.timings.dns = None
+        self.started: Dict[str, float] = {}
+        self.sent: Optional[float] = None
+        self.received: Optional[float] = None
+
+    def record(self, event: str, info: Dict[str, Any]) -> None:
+        now = perf_counter()
+        name, _, stage = event.rpartition(".")
+        prefix, _, step = name.partition(".")
+        if prefix == "connection" and step in self.CONNECTION_PHASES:
+            phase = self.CONNECTION_PHASES[step]
+            if stage == "started":
+                self.started[phase] = now
+            elif phase in self.started:
+                elapsed = now - self.started.pop(phase)
+                setattr(self.timings, phase, (getattr(self.timings, phase) or 0.0) + elapsed)
+        elif step == "send_request_headers" and stage == "started":
+            self.sent = now
+        elif step == "receive_response_headers" and stage == "complete":
+            self.received = now
+            if self.sent is not None:
+                self.timings.ttfb = now - self.sent
+
+    def body_read(self) -> None:
+        """Call once the response body has been read"""
+        if self.received is not None:
+            self.timings.body = perf_counter() - self.received
+
+    def __call__(self, event: str, info: Dict[str, Any]) -> None:
+        self.record(event, info)
+
+    async def async_trace(self, event: str, info: Dict[str, Any]) -> None:
+        self.record(event, info)
+
+
+class LatencyHistogram:
+    """
+    An HDR-style histogram: log-linear buckets over integer microseconds with a
+    bounded relative error, so any number of histograms (attempts, calls, runs)
+    can be merged exactly by adding their counts.
+    """
+
+    def __init__(self, significant_bits: int = DEFAULT_SIGNIFICANT_BITS) -> None:
+        if significant_bits < 2:
+            raise ValueError("histograms need at least 2 significant bits")
+        self.significant_bits = significant_bits
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+
+    def _index(self, value: int) -> int:
+        magnitude = max(value.bit_length() - self.significant_bits, 0)
+        return (magnitude << (self.significant_bits - 1)) + (value >> magnitude)
+
+    def _highest(self, index: int) -> int:
+        """The highest value recorded in bucket `index`"""
+        half = 1 << (self.significant_bits - 1)
+        magnitude = max(index // half - 1, 0)
+        return (((index - (magnitude << (self.significant_bits - 1))) + 1) << magnitude) - 1
+
+    def record(self, seconds: float, count: int = 1) -> None:
+        index = self._index(max(int(seconds * 1_000_000), 0))
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.count += count
+
+    def merge(self, other: LatencyHistogram) -> None:
+        if other.significant_bits != self.significant_bits:
+            raise ValueError("can only merge histograms with the same significant bits")
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+
+    def percentile(self, percent: float) -> float:
+        """Seconds at or below which `percent` of recorded values fall (0 if empty)"""
+        if not self.count:
+            return 0.0
+        rank = max(percent / 100.0 * self.count, 1)
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return self._highest(index) / 1_000_000
+        return self._highest(max(self.counts)) / 1_000_000
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "max": self.percentile(100),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "significant_bits": self.significant_bits,
+            "counts": {str(index): count for index, count in sorted(self.counts.items())},
+        }
+
+    @staticmethod
+    def from_dict(data: Dict[str, Any]) -> LatencyHistogram:
+        histogram = LatencyHistogram(data.get("significant_bits", DEFAULT_SIGNIFICANT_BITS))
+        for index, count in data.get("counts", {}).items():
+            histogram.counts[int(index)] = count
+            histogram.count += count
+        return histogram
+
+
+class TimingHistograms:
+    """One `LatencyHistogram` per phase; safe to record into from several threads"""
+
+    def __init__(self, significant_bits: int = DEFAULT_SIGNIFICANT_BITS) -> None:
+        self.phases = {phase: LatencyHistogram(significant_bits) for phase in PHASES}
+        self._lock = Lock()
+
+    def record(self, timings: Optional[Timings]) -> None:
+        if timings is None:
+            return
+        with self._lock:
+            for phase, value in asdict(timings).items():
+                if value is not None:
+                    self.phases[phase].record(value)
+
+    def record_all(self, timings: Iterable[Optional[Timings]]) -> None:
+        for each in timings:
+            self.record(each)
+
+    def merge(self, other: TimingHistograms) -> None:
+        with self._lock:
+            for phase, histogram in other.phases.items():
+                self.phases[phase].merge(histogram)
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                phase: histogram.summary()
+                for phase, histogram in self.phases.items()
+                if histogram.count
+            }
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {phase: histogram.to_dict() for phase, histogram in self.phases.items()}
+
+    @staticmethod
+    def from_dict(data: Dict[str, Any]) -> TimingHistograms:
+        histograms = TimingHistograms()
+        for phase in PHASES:
+            if phase in data:
+                histograms.phases[phase] = LatencyHistogram.from_dict(data[phase])
+        return histograms
+
+    def save(self, path: str) -> None:
+        """Merge into the histograms already in `path` (if any), so runs accumulate"""
+        merged = TimingHistograms.load(path) if exists(path) else TimingHistograms()
+        merged.merge(self)
+        with open(f"{path}.part", "w") as stream:
+            stream.write(dumps(merged.to_dict()))
+        replace(f"{path}.part", path)
+
+    @staticmethod
+    def load(path: str) -> TimingHistograms:
+        with open(path) as stream:
+            return TimingHistograms.from_dict(loads(stream.read()))
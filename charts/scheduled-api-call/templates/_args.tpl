@@ -17,6 +17,14 @@
 - {{ .Values.args.body | toJson | quote }}
 {{- end }}
 {{- end }}
+{{- if .Values.args.compress }}
+- --compress
+- {{ .Values.args.compress }}
+{{- end }}
+{{- if not (kindIs "invalid" .Values.args.compress_min_bytes) }}
+- --compress-min-bytes
+- "{{ .Values.args.compress_min_bytes }}"
+{{- end }}
 {{- if .Values.args.params }}
 - --params
 {{- range .Values.args.params }}
@@ -44,18 +52,55 @@
 - --retries
 - "{{ .Values.args.retries }}"
 {{- if .Values.args.retry_on}}
-- --retry-on
+- --retry-on-codes
 {{- range .Values.args.retry_on }}
 - "{{ . }}"
 {{- end }}
 {{- end }}
 {{- if .Values.args.fail_on }}
-- --fail-on
+- --fail-on-codes
 {{- range .Values.args.fail_on }}
 - "{{ . }}"
 {{- end }}
 {{- end }}
+{{- if .Values.args.retry_strategy }}
+- --retry-strategy
+- {{ .Values.args.retry_strategy }}
+{{- end }}
+{{- if .Values.args.retry_max_delay }}
+- --retry-max-delay
+- "{{ .Values.args.retry_max_delay }}"
+{{- end }}
+{{- if .Values.args.ignore_retry_after }}
+- --ignore-retry-after
+{{- end }}
+{{- if .Values.args.deadline }}
+- --deadline
+- "{{ .Values.args.deadline }}"
+{{- end }}
+{{- if .Values.args.response_body }}
+- --response-body
+- {{ .Values.args.response_body }}
+{{- end }}
+{{- if .Values.args.response_max_bytes }}
+- --response-max-bytes
+- "{{ .Values.args.response_max_bytes }}"
+{{- end }}
+{{- if .Values.args.response_file }}
+- --response-file
+- {{ .Values.args.response_file }}
+{{- end }}
 {{- if .Values.args.insecure }}
 - --insecure
 {{- end }}
 {{- end -}}
+
+
+{{- define "metrics_args" -}}
+{{- if .Values.metrics.push_url }}
+- --metrics-push-url
+- {{ .Values.metrics.push_url }}
+- --metrics-job
+- {{ .Values.metrics.job | default .Values.name }}
+{{- end }}
+{{- end -}}
@@ -0,0 +1,108 @@
+"""
+Startup benchmark: how long it takes to import the CLI and to get through a
+trivial invocation, and which heavy modules get imported along the way.
+
+    python test/bench/startup.py                       # print results as JSON
+    python test/bench/startup.py --save baseline.json  # record a baseline
+    python test/bench/startup.py --baseline baseline.json --tolerance 0.25
+
+Exits non-zero if a deferred module gets imported eagerly, or if a median
+regresses by more than the tolerance against the baseline.
+"""
+import argparse
+from json import dumps, loads
+from os import environ
+from pathlib import Path
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parents[2]
+
+# modules that importing the CLI must not pull in
+DEFERRED_MODULES = ["ddtrace", "httpx", "requests", "structlog", "urllib3"]
+
+
+def run(args: List[str]) -> subprocess.CompletedProcess:
+    env = {**environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    return subprocess.run(
+        [sys.executable, *args], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+
+
+def import_time_us() -> Dict[str, int]:
+    """Cumulative import time (microseconds) of each top-level module"""
+    stderr = run(["-X", "importtime", "-c", "import caller.__main__"]).stderr
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        if not name.startswith("  "):  # nested imports are indented past one space
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def wall_time_ms(args: List[str]) -> float:
+    start = time.perf_counter()
+    run(args)
+    return (time.perf_counter() - start) * 1000
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    samples = sorted(samples)
+    return {
+        "median": statistics.median(samples),
+        "p90": samples[int(0.9 * (len(samples) - 1))],
+        "min": samples[0],
+    }
+
+
+def benchmark(runs: int) -> Dict:
+    # measure loading bytecode, not compiling it (the image ships precompiled)
+    run(["-m", "compileall", "-q", "caller"])
+    imports = [import_time_us() for _ in range(runs)]
+    loaded = run(
+        ["-c", "import caller.__main__, sys; print(' '.join(sorted(sys.modules)))"]
+    ).stdout.split()
+    return {
+        "python": sys.version.split()[0],
+        "runs": runs,
+        "import_caller_main_us": summarize([i.get("caller.__main__", 0) for i in imports]),
+        "cli_help_ms": summarize([wall_time_ms(["-m", "caller", "--help"]) for _ in range(runs)]),
+        "interpreter_ms": summarize([wall_time_ms(["-c", "pass"]) for _ in range(runs)]),
+        "eagerly_imported": [m for m in DEFERRED_MODULES if m in loaded],
+    }
+
+
+def regressions(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    problems = [f"{m} is imported eagerly" for m in results["eagerly_imported"]]
+    for key in ("import_caller_main_us", "cli_help_ms"):
+        now, then = results[key]["median"], baseline[key]["median"]
+        if now > then * (1 + tolerance):
+            problems.append(f"{key} median regressed: {now:.1f} vs baseline {then:.1f}")
+    return problems
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--save", type=str, default=None, help="write results to this file")
+    parser.add_argument("--baseline", type=str, default=None, help="compare against this file")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    results = benchmark(args.runs)
+    print(dumps(results, indent=2))
+    if args.save:
+        Path(args.save).write_text(dumps(results, indent=2) + "\n")
+
+    baseline = loads(Path(args.baseline).read_text()) if args.baseline else None
+    problems = regressions(results, baseline, args.tolerance) if baseline else []
+    if not baseline:
+        problems = [f"{m} is imported eagerly" for m in results["eagerly_imported"]]
+    for problem in problems:
+        print(problem, file=sys.stderr)
+    sys.exit(1 if problems else 0)
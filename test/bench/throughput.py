@@ -0,0 +1,268 @@
+"""
+Throughput benchmark: calls per second, and latency plus caller overhead (time
+outside the HTTP exchange itself) at p50/p99, for common call paths against a
+local receiver (test/mocks/receiver, started on a spare port unless --port;
+the asyncio one by default, so the receiver isn't what's measured).
+
+    python test/bench/throughput.py                       # print results as JSON
+    python test/bench/throughput.py --save baseline.json  # record a baseline
+    python test/bench/throughput.py --baseline baseline.json --tolerance 0.25
+
+Exits non-zero if a scenario's throughput drops, or its median overhead grows,
+by more than the tolerance against the baseline.
+"""
+import argparse
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from json import dumps, loads
+import logging
+from os import devnull, environ
+from pathlib import Path
+import socket
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.error import URLError
+from urllib.request import urlopen
+from uuid import uuid4
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+from caller.aio import AsyncCaller, AsyncSession  # noqa: E402
+from caller.body import BodyMode, BodyPolicy  # noqa: E402
+from caller.caller import Caller, CallPlan, HTTPMethod, HTTPResponse  # noqa: E402
+from caller.retry import RetryPolicy, RetryStrategy  # noqa: E402
+
+HOST = "127.0.0.1"
+LARGE = 1024 * 1024
+
+# retries that wait as little as possible, so the retry path itself is measured
+QUICK_RETRIES = RetryPolicy(strategy=RetryStrategy.FULL_JITTER, base=0.001, max_delay=0.001)
+
+
+@dataclass
+class Scenario:
+    name: str
+    call: Callable[[Caller, int], List[HTTPResponse]]
+    concurrency: int = 1
+
+
+def scenarios(port: int, concurrency: int) -> List[Scenario]:
+    plan = CallPlan(host=HOST, port=port, insecure=True, path="/noauth")
+    return [
+        Scenario("single", lambda caller, _: caller(path="/noauth")),
+        Scenario("single-plan", lambda caller, _: caller.execute(plan)),
+        Scenario(
+            "retry",
+            lambda caller, _: caller(
+                path="/noauth",
+                params={"fails": 2, "requestId": str(uuid4())},
+                retries=2,
+                retry_on=["50X"],
+                retry_policy=QUICK_RETRIES,
+            ),
+        ),
+        Scenario(
+            "large-request-body",
+            lambda caller, _: caller(
+                method=HTTPMethod.POST, path="/noauth", body={"padding": "x" * LARGE}
+            ),
+        ),
+        Scenario(
+            "large-response-body",
+            lambda caller, _: caller(path="/noauth", params={"size": LARGE}),
+        ),
+        Scenario(
+            "large-response-body-discard",
+            lambda caller, _: caller(
+                path="/noauth",
+                params={"size": LARGE},
+                body_policy=BodyPolicy(mode=BodyMode.DISCARD),
+            ),
+        ),
+        Scenario("concurrent", lambda caller, _: caller(path="/noauth"), concurrency=concurrency),
+    ]
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    samples = sorted(samples)
+    return {
+        "p50": samples[int(0.50 * (len(samples) - 1))],
+        "p99": samples[int(0.99 * (len(samples) - 1))],
+        "mean": sum(samples) / len(samples),
+    }
+
+
+def attempt_seconds(response: HTTPResponse) -> float:
+    total = response.timings.total if response.timings is not None else None
+    return response.duration if total is None else total
+
+
+def summarize(
+    timings: List[Tuple[float, List[HTTPResponse]]], concurrency: int, wall: float
+) -> Dict:
+    latency = [elapsed * 1000 for elapsed, _ in timings]
+    # everything but the attempts themselves, each from sending its request to
+    # reading its body (`duration` stops at the headers)
+    overhead = [
+        (elapsed - sum(attempt_seconds(r) for r in responses)) * 1000
+        for elapsed, responses in timings
+    ]
+    return {
+        "calls": len(timings),
+        "concurrency": concurrency,
+        "calls_per_second": len(timings) / wall,
+        "errors": sum(1 for _, responses in timings if responses[-1].status >= 400),
+        "latency_ms": percentiles(latency),
+        "overhead_ms": percentiles(overhead),
+    }
+
+
+def timed(fn: Callable[[], List[HTTPResponse]]) -> Tuple[float, List[HTTPResponse]]:
+    start = time.perf_counter()
+    responses = fn()
+    return time.perf_counter() - start, responses
+
+
+def run_scenario(scenario: Scenario, port: int, calls: int, warmup: int) -> Dict:
+    caller = Caller(host=HOST, port=port, insecure=True)
+    for idx in range(warmup):
+        scenario.call(caller, idx)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=scenario.concurrency) as pool:
+        timings = list(
+            pool.map(lambda idx: timed(lambda: scenario.call(caller, idx)), range(calls))
+        )
+    return summarize(timings, scenario.concurrency, time.perf_counter() - start)
+
+
+async def run_async(port: int, calls: int, concurrency: int) -> Dict:
+    async with AsyncSession(max_concurrency=concurrency) as session:
+        caller = AsyncCaller(host=HOST, port=port, insecure=True, session=session)
+
+        async def one() -> Tuple[float, List[HTTPResponse]]:
+            start = time.perf_counter()
+            responses = await caller(path="/noauth")
+            return time.perf_counter() - start, responses
+
+        await asyncio.gather(*(one() for _ in range(concurrency)))  # warm up connections
+        start = time.perf_counter()
+        timings = await asyncio.gather(*(one() for _ in range(calls)))
+        return summarize(list(timings), concurrency, time.perf_counter() - start)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return int(sock.getsockname()[1])
+
+
+# module to run, and the variable it takes its port from
+RECEIVERS = {"aio": ("receiver.aio", "AIO_PORT"), "flask": ("receiver", "PORT")}
+
+
+@contextmanager
+def receiver(port: Optional[int], kind: str = "aio") -> Iterator[int]:
+    """Use the receiver on `port`, or start one on a spare port for the duration"""
+    if port is not None:
+        yield port
+        return
+
+    port = free_port()
+    module, port_variable = RECEIVERS[kind]
+    process = subprocess.Popen(
+        [sys.executable, "-m", module],
+        cwd=ROOT / "test" / "mocks",
+        env={**environ, "HOST": HOST, port_variable: str(port)},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        for _ in range(100):
+            try:
+                urlopen(f"http://{HOST}:{port}/status/health", timeout=1).close()
+                break
+            except (URLError, ConnectionError):
+                time.sleep(0.1)
+        else:
+            raise RuntimeError("the receiver didn't start")
+        yield port
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def benchmark(
+    port: Optional[int],
+    calls: int,
+    warmup: int,
+    concurrency: int,
+    only: List[str],
+    kind: str = "aio",
+) -> Dict:
+    results: Dict = {"python": sys.version.split()[0], "scenarios": {}}
+    with receiver(port, kind) as _port:
+        for scenario in scenarios(_port, concurrency):
+            if not only or scenario.name in only:
+                results["scenarios"][scenario.name] = run_scenario(scenario, _port, calls, warmup)
+        if not only or "concurrent-async" in only:
+            results["scenarios"]["concurrent-async"] = asyncio.run(
+                run_async(_port, calls, concurrency)
+            )
+    return results
+
+
+def regressions(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    problems = []
+    for name, now in results["scenarios"].items():
+        then = baseline["scenarios"].get(name)
+        if then is None:
+            continue
+        if now["calls_per_second"] < then["calls_per_second"] * (1 - tolerance):
+            problems.append(
+                f"{name} throughput regressed: {now['calls_per_second']:.1f}/s"
+                f" vs baseline {then['calls_per_second']:.1f}/s"
+            )
+        if now["overhead_ms"]["p50"] > then["overhead_ms"]["p50"] * (1 + tolerance):
+            problems.append(
+                f"{name} median overhead regressed: {now['overhead_ms']['p50']:.3f}ms"
+                f" vs baseline {then['overhead_ms']['p50']:.3f}ms"
+            )
+    return problems
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=None, help="use a receiver already running")
+    parser.add_argument("--receiver", choices=sorted(RECEIVERS), default="aio")
+    parser.add_argument("--calls", type=int, default=200, help="calls per scenario")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--scenario", type=str, nargs="+", default=[], help="only these")
+    parser.add_argument("--save", type=str, default=None, help="write results to this file")
+    parser.add_argument("--baseline", type=str, default=None, help="compare against this file")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    # keep logging's cost (it's part of every call) but not the terminal's
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, logging.StreamHandler):
+            handler.setStream(open(devnull, "w"))
+
+    results = benchmark(
+        args.port, args.calls, args.warmup, args.concurrency, args.scenario, args.receiver
+    )
+    print(dumps(results, indent=2))
+    if args.save:
+        Path(args.save).write_text(dumps(results, indent=2) + "\n")
+
+    baseline = loads(Path(args.baseline).read_text()) if args.baseline else None
+    problems = regressions(results, baseline, args.tolerance) if baseline else []
+    for problem in problems:
+        print(problem, file=sys.stderr)
+    sys.exit(1 if problems else 0)
@@ -1,8 +1,10 @@
 from __future__ import annotations
 
+import gzip
+from json import loads
 import logging
 from time import sleep
-from typing import Dict, Tuple
+from typing import Any, Dict, Tuple
 from uuid import uuid4
 
 from flask import Flask, jsonify, request, Response
@@ -14,6 +16,7 @@ DEFAULT_CODES = {
     "POST": 201,
     "PATCH": 200,
     "DELETE": 204,
+    "HEAD": 200,
 }
 
 ALL_METHODS = list(DEFAULT_CODES.keys())
@@ -33,18 +36,22 @@ bearer_auth = HTTPTokenAuth()
 setup_logger(app)
 
 
+def request_json() -> Any:
+    """The request's JSON body (gzip-decoded if need be), or None"""
+    data = request.get_data()
+    if request.headers.get("Content-Encoding") == "gzip":
+        data = gzip.decompress(data)
+    try:
+        return loads(data) if data else None
+    except ValueError:
+        return None
+
+
 @app.before_request
 def log_request() -> None:
-    if request.get_json(silent=True):
-        app.logger.info(
-            " ".join(
-                [
-                    request.method,
-                    request.path,
-                    str(request.get_json()),
-                ]
-            )
-        )
+    body = request_json()
+    if body:
+        app.logger.info(" ".join([request.method, request.path, str(body)]))
 
 
 @basic_auth.verify_password
@@ -90,8 +97,26 @@ def respond(subpath: str) -> Tuple[Response, int]:
     if fails > 0 and REQUEST_COUNT[request_id] <= fails:
         status = 500
 
-    response = jsonify({"subpath": ("/" if subpath else "") + subpath})
+    content: Dict[str, Any] = {"subpath": ("/" if subpath else "") + subpath}
+    size = get_int_from_params("size")
+    if size > 0:
+        content["padding"] = "x" * size
+    if "echo" in request.args:
+        content["body"] = request_json()
+        content["content_encoding"] = request.headers.get("Content-Encoding")
+    response = jsonify(content)
     response.headers["X-Request-Id"] = request_id
+    if status >= 400 and "retry_after" in request.args:
+        response.headers["Retry-After"] = request.args["retry_after"]
+    if status == 200 and "etag" in request.args:
+        # answers If-None-Match with a 304 when the content is the same
+        response.add_etag()
+        response.make_conditional(request)  # in place
+        status = response.status_code
+    if status == 200 and "gzip" in request.args:
+        if "gzip" in request.headers.get("Accept-Encoding", ""):
+            response.set_data(gzip.compress(response.get_data()))
+            response.headers["Content-Encoding"] = "gzip"
 
     return response, status
 
@@ -111,9 +136,16 @@ def respond(subpath: str) -> Tuple[Response, int]:
 #   * status: int (the desired status code of the response)
 #   * wait: int (sleep for this many seconds before responding)
 #   * fails: int (number of times to fail with 500 before succeeding)
+#   * size: int (pad the response body with this many bytes)
+#   * retry_after: str (Retry-After header value to send with error responses)
+#   * etag: any (send an ETag with 200 responses, and 304 when If-None-Match matches)
+#   * echo: any (include the request body, gzip-decoded if need be, in the response)
+#   * gzip: any (gzip 200 responses, if the request accepts it)
 #   failing works by tracking X-Request-Id in the request/response headers
 #   if one is supplied in the request headers or params, it is used in the response.
 #
+#   receiver.aio serves the same routes without Flask, for load and fault injection
+#
 
 
 @app.route("/status/health")
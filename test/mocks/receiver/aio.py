@@ -0,0 +1,595 @@
+"""
+The receiver's routes served by asyncio alone (no Flask, no threads), for load
+and resilience testing: it answers tens of thousands of requests per second
+locally, and injects faults on request. Besides the query params the Flask app
+takes (status, wait, fails, size, retry_after, etag, echo, gzip; here `wait`
+may be fractional), every route takes:
+
+  * latency: str (delay before responding, in milliseconds, drawn from a
+    distribution: "25" fixed, "10-200" uniform, "exp:50" exponential with mean
+    50, "normal:100:20" with mean and standard deviation, or "lognormal:50:0.5"
+    with median and sigma, for a heavy tail)
+  * error_rate: float (chance of responding with error_status instead)
+  * error_status: int (status of injected errors, default 503)
+  * reset: float (chance of resetting the connection instead of responding;
+    default 1 if reset_after is given)
+  * reset_after: int (bytes of the response to send before resetting)
+  * chunked: int (send the body chunked, in chunks of this many bytes)
+  * chunk_delay: float (milliseconds to wait between chunks, for a slow body)
+
+Large bodies (?size=100000000) are streamed from one shared block, so they cost
+no memory. Counts for ?fails= are kept for the request ids clients give
+(X-Request-Id or ?requestId=), the $MAX_REQUEST_IDS most recent of them. $FAULTS
+is a query string (say "latency=exp:20&error_rate=0.01") applied to every
+request that doesn't set the same params.
+
+    python -m receiver.aio  # listens on $HOST:$AIO_PORT (default 0.0.0.0:8081)
+
+With $WORKERS > 1, that many processes accept connections on the port; each
+keeps its own counts, so calls with ?fails= should keep their connection.
+uvloop is used if it's installed.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from base64 import b64decode
+from collections import deque, OrderedDict
+from dataclasses import dataclass, field
+from functools import lru_cache
+import gzip
+from hashlib import sha1
+from http import HTTPStatus
+from json import dumps, loads
+from math import exp
+import os
+import random
+import signal
+import socket
+import struct
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple, Union
+from urllib.parse import parse_qsl, unquote
+from uuid import uuid4
+
+from . import app, DEFAULT_CODES
+
+try:
+    import uvloop
+
+    new_event_loop: Callable[[], asyncio.AbstractEventLoop] = uvloop.new_event_loop
+except ImportError:
+    new_event_loop = asyncio.new_event_loop
+
+DEFAULT_HOST = "0.0.0.0"
+DEFAULT_PORT = 8081
+
+# request ids whose counts are kept, for ?fails=; the least recently seen go first
+MAX_REQUEST_IDS = int(os.environ.get("MAX_REQUEST_IDS", "100000"))
+# faults for every request, as a query string; params a request gives win
+FAULTS = dict(parse_qsl(os.environ.get("FAULTS", ""), keep_blank_values=True))
+# requests with larger heads or bodies are refused
+MAX_HEAD_BYTES = 64 * 1024
+MAX_BODY_BYTES = 64 * 1024 * 1024
+# chunk size when only ?chunk_delay= is given
+DEFAULT_CHUNK_SIZE = 1024
+
+# padding for ?size=, written a block at a time
+BLOCK = memoryview(b"x" * 64 * 1024)
+
+AUTH_SCHEMES = {"noauth": None, "basic": "Basic", "bearer": "Bearer"}
+
+
+class BadRequest(Exception):
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass
+class Request:
+    method: str
+    path: str
+    params: Dict[str, str]
+    # names lowercased
+    headers: Dict[str, str]
+    body: bytes
+    keep_alive: bool
+
+
+@dataclass
+class Reply:
+    status: int
+    headers: List[Tuple[str, str]] = field(default_factory=list)
+    body: bytes = b""
+    # bytes of padding streamed between `body` and `tail`
+    padding: int = 0
+    tail: bytes = b""
+    # seconds to wait before responding
+    delay: float = 0.0
+    # send the body chunked in pieces this big, waiting `chunk_delay` seconds between
+    chunk_size: int = 0
+    chunk_delay: float = 0.0
+    # reset the connection once this many bytes of the response are sent
+    reset_after: Optional[int] = None
+
+    @property
+    def length(self) -> int:
+        return len(self.body) + self.padding + len(self.tail)
+
+    @property
+    def immediate(self) -> bool:
+        """Whether it can be written at once, in one piece"""
+        return (
+            self.delay <= 0
+            and self.chunk_size <= 0
+            and self.reset_after is None
+            and self.padding <= len(BLOCK)
+        )
+
+    def content(self) -> bytes:
+        return self.body + b"x" * self.padding + self.tail
+
+    def stream(self) -> Iterator[Union[bytes, memoryview]]:
+        if self.body:
+            yield self.body
+        remaining = self.padding
+        while remaining > 0:
+            yield BLOCK[: min(remaining, len(BLOCK))]
+            remaining -= len(BLOCK)
+        if self.tail:
+            yield self.tail
+
+
+class RequestCounts:
+    """Requests seen by id, for the most recent `limit` ids"""
+
+    def __init__(self, limit: int = MAX_REQUEST_IDS) -> None:
+        self.limit = max(limit, 1)
+        self._counts: OrderedDict[str, int] = OrderedDict()
+
+    def add(self, request_id: str) -> int:
+        count = self._counts.pop(request_id, 0) + 1
+        self._counts[request_id] = count
+        if len(self._counts) > self.limit:
+            self._counts.popitem(last=False)
+        return count
+
+    def get(self, request_id: str) -> int:
+        return self._counts.get(request_id, 0)
+
+    def clear(self, request_id: Optional[str] = None) -> None:
+        if request_id is None:
+            self._counts.clear()
+        else:
+            self._counts.pop(request_id, None)
+
+
+REQUEST_COUNTS = RequestCounts()
+
+
+@lru_cache(maxsize=256)
+def parse_latency(spec: str) -> Callable[[], float]:
+    """A sampler of delays in seconds, from a distribution of milliseconds (see above)"""
+    kind, _, rest = spec.partition(":")
+    try:
+        if not rest and "-" in kind:
+            low, high = (float(value) / 1000 for value in kind.split("-", 1))
+            return lambda: random.uniform(low, high)
+        if not rest:
+            fixed = float(kind) / 1000
+            return lambda: fixed
+        values = [float(value) for value in rest.split(":")]
+        if kind == "exp" and len(values) == 1 and values[0] > 0:
+            rate = 1000 / values[0]
+            return lambda: random.expovariate(rate)
+        if kind == "normal" and len(values) == 2:
+            mean, deviation = values
+            return lambda: max(random.gauss(mean, deviation), 0.0) / 1000
+        if kind == "lognormal" and len(values) == 2:
+            median, sigma = values
+            return lambda: median * exp(random.gauss(0, sigma)) / 1000
+    except ValueError:
+        pass
+    raise BadRequest(400, f'invalid latency "{spec}"')
+
+
+def number(params: Dict[str, str], key: str, default: float = 0) -> float:
+    try:
+        return float(params[key]) if key in params else default
+    except ValueError:
+        raise BadRequest(400, f'invalid {key} "{params[key]}"')
+
+
+def integer(params: Dict[str, str], key: str, default: int = 0) -> int:
+    try:
+        return int(params[key]) if key in params else default
+    except ValueError:
+        raise BadRequest(400, f'invalid {key} "{params[key]}"')
+
+
+def chance(params: Dict[str, str], key: str) -> bool:
+    rate = number(params, key)
+    return rate > 0 and random.random() < rate
+
+
+def json_reply(status: int, content: Any, headers: Optional[List[Tuple[str, str]]] = None) -> Reply:
+    return Reply(
+        status, [("Content-Type", "application/json"), *(headers or [])], dumps(content).encode()
+    )
+
+
+def request_json(request: Request) -> Any:
+    """The request's JSON body (gzip-decoded if need be), or None"""
+    data = request.body
+    try:
+        if request.headers.get("content-encoding") == "gzip":
+            data = gzip.decompress(data)
+        return loads(data) if data else None
+    except (OSError, ValueError):
+        return None
+
+
+def authorized(request: Request, scheme: str) -> bool:
+    kind, _, credentials = request.headers.get("authorization", "").partition(" ")
+    credentials = credentials.strip()
+    if kind.lower() != scheme.lower() or not credentials:
+        return False
+    if scheme == "Basic":
+        try:
+            username, _, password = b64decode(credentials).decode().partition(":")
+        except ValueError:
+            return False
+        return bool(username and password)
+    return True
+
+
+def respond(request: Request, subpath: str) -> Reply:
+    params = {**FAULTS, **request.params} if FAULTS else request.params
+    given_id = request.headers.get("x-request-id") or params.get("requestId")
+    request_id = given_id or str(uuid4())
+    count = REQUEST_COUNTS.add(given_id) if given_id else 1
+
+    status = integer(params, "status", DEFAULT_CODES[request.method])
+    fails = integer(params, "fails")
+    if fails > 0 and count <= fails:
+        status = 500
+    if chance(params, "error_rate"):
+        status = integer(params, "error_status", 503)
+
+    content: Dict[str, Any] = {"subpath": ("/" if subpath else "") + subpath}
+    if "echo" in params:
+        content["body"] = request_json(request)
+        content["content_encoding"] = request.headers.get("content-encoding")
+    reply = json_reply(status, content, [("X-Request-Id", request_id)])
+    size = integer(params, "size")
+    if size > 0:
+        # the padding goes last, so it can be streamed
+        reply.body, reply.padding, reply.tail = reply.body[:-1] + b', "padding": "', size, b'"}'
+    if status >= 400 and "retry_after" in params:
+        reply.headers.append(("Retry-After", params["retry_after"]))
+
+    if status == 200 and ("etag" in params or "gzip" in params):
+        data = reply.content()
+        reply.body, reply.padding, reply.tail = data, 0, b""
+        if "etag" in params:
+            # answers If-None-Match with a 304 when the content is the same
+            etag = f'"{sha1(data).hexdigest()}"'
+            reply.headers.append(("ETag", etag))
+            matches = [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]
+            if etag in matches or "*" in matches:
+                reply.status, reply.body = 304, b""
+        if reply.status == 200 and "gzip" in request.headers.get("accept-encoding", ""):
+            reply.body = gzip.compress(data)
+            reply.headers.append(("Content-Encoding", "gzip"))
+
+    reply.delay = number(params, "wait")
+    if "latency" in params:
+        reply.delay += parse_latency(params["latency"])()
+    reply.chunk_size = integer(params, "chunked")
+    reply.chunk_delay = number(params, "chunk_delay") / 1000
+    if reply.chunk_delay > 0 and reply.chunk_size <= 0:
+        reply.chunk_size = DEFAULT_CHUNK_SIZE
+    if "reset_after" in params and "reset" not in params:
+        reply.reset_after = integer(params, "reset_after")
+    elif chance(params, "reset"):
+        reply.reset_after = integer(params, "reset_after")
+    return reply
+
+
+# Routes, as the Flask app's (see there)
+def route(request: Request) -> Reply:
+    path, method = request.path, request.method
+    if path == "/status/health":
+        return json_reply(200, {"status": "UP"})
+
+    if path.startswith("/admin/"):
+        action, _, request_id = path[len("/admin/") :].partition("/")
+        if action == "count" and request_id and method in ("GET", "HEAD"):
+            return json_reply(200, {"count": REQUEST_COUNTS.get(request_id)})
+        if action == "clear" and request_id and method == "POST":
+            REQUEST_COUNTS.clear(request_id)
+            return json_reply(200, {"count": 0})
+        if action == "reset" and not request_id and method == "POST":
+            REQUEST_COUNTS.clear()
+            return json_reply(200, {})
+        return json_reply(404, {"error": "not found"})
+
+    prefix, _, subpath = path[1:].partition("/")
+    if prefix not in AUTH_SCHEMES:
+        return json_reply(404, {"error": "not found"})
+    if method not in DEFAULT_CODES:
+        return json_reply(405, {"error": "method not allowed"})
+    scheme = AUTH_SCHEMES[prefix]
+    if scheme is not None and not authorized(request, scheme):
+        # as flask-httpauth would
+        return Reply(
+            401,
+            [
+                ("Content-Type", "text/html; charset=utf-8"),
+                ("WWW-Authenticate", f'{scheme} realm="Authentication Required"'),
+            ],
+            b"Unauthorized Access",
+        )
+    return respond(request, subpath)
+
+
+def handle(request: Request) -> Reply:
+    try:
+        return route(request)
+    except BadRequest as err:
+        return json_reply(err.status, {"error": str(err)})
+
+
+@lru_cache(maxsize=None)
+def status_line(status: int) -> str:
+    try:
+        reason = HTTPStatus(status).phrase
+    except ValueError:
+        reason = "Unknown"
+    return f"HTTP/1.1 {status} {reason}\r\n"
+
+
+class HTTPProtocol(asyncio.Protocol):
+    """
+    HTTP/1.1 with keep-alive and pipelining. Requests on a connection are
+    answered in order; those that can be are answered as they're parsed, and
+    the rest (delayed, chunked, large, or reset) by a task, so one slow
+    response only holds up its own connection.
+    """
+
+    def __init__(self) -> None:
+        self.transport: Optional[asyncio.Transport] = None
+        self.buffer = bytearray()
+        self.pending: Deque[Request] = deque()
+        # a request (the first of `pending`) that couldn't be parsed
+        self.failed: Optional[BadRequest] = None
+        # whether a task is answering the current request
+        self.busy = False
+        self.writable = asyncio.Event()
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        assert isinstance(transport, asyncio.Transport)
+        self.transport = transport
+        self.writable.set()
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        self.transport = None
+        self.pending.clear()
+        # wakes a task waiting to write, which finds the connection gone
+        self.writable.set()
+
+    def pause_writing(self) -> None:
+        self.writable.clear()
+
+    def resume_writing(self) -> None:
+        self.writable.set()
+
+    def data_received(self, data: bytes) -> None:
+        self.buffer += data
+        while self.failed is None:
+            try:
+                request = self.parse()
+            except BadRequest as err:
+                self.failed = err
+                break
+            if request is None:
+                break
+            self.pending.append(request)
+        self.process()
+
+    def parse(self) -> Optional[Request]:
+        while self.buffer.startswith(b"\r\n"):
+            del self.buffer[:2]
+        end = self.buffer.find(b"\r\n\r\n")
+        if end < 0:
+            if len(self.buffer) > MAX_HEAD_BYTES:
+                raise BadRequest(431, "request head too large")
+            return None
+        lines = self.buffer[:end].decode("latin-1").split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ")
+        except ValueError:
+            raise BadRequest(400, "invalid request line")
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            raise BadRequest(411, "chunked request bodies aren't supported")
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            raise BadRequest(400, "invalid content-length")
+        if length > MAX_BODY_BYTES:
+            raise BadRequest(413, "request body too large")
+        start = end + 4
+        if len(self.buffer) < start + length:
+            return None
+        body = bytes(self.buffer[start : start + length])
+        del self.buffer[: start + length]
+
+        path, _, query = target.partition("?")
+        connection = headers.get("connection", "").lower()
+        return Request(
+            method=method,
+            path=unquote(path),
+            params=dict(parse_qsl(query, keep_blank_values=True)) if query else {},
+            headers=headers,
+            body=body,
+            keep_alive=connection != "close"
+            if version == "HTTP/1.1"
+            else connection == "keep-alive",
+        )
+
+    def process(self) -> None:
+        # replies ready at once are written together, so a pipelined batch of
+        # requests is answered with one write
+        ready: List[bytes] = []
+        close = False
+        while not self.busy and self.transport is not None and not close:
+            if not self.pending:
+                if self.failed is not None:
+                    reply = json_reply(self.failed.status, {"error": str(self.failed)})
+                    ready.append(self.serialize(Request("GET", "", {}, {}, b"", False), reply))
+                    close = True
+                break
+            request = self.pending.popleft()
+            reply = handle(request)
+            if reply.immediate and self.writable.is_set():
+                ready.append(self.serialize(request, reply))
+                close = not request.keep_alive
+            else:
+                self.busy = True
+                asyncio.ensure_future(self.write_later(request, reply))
+        if ready and self.transport is not None:
+            self.transport.write(b"".join(ready))
+            if close:
+                self.transport.close()
+
+    def head(self, request: Request, reply: Reply, chunked: bool) -> bytes:
+        head = status_line(reply.status)
+        for name, value in reply.headers:
+            head += f"{name}: {value}\r\n"
+        if chunked:
+            head += "Transfer-Encoding: chunked\r\n"
+        elif reply.status not in (204, 304):
+            head += f"Content-Length: {reply.length}\r\n"
+        if not request.keep_alive:
+            head += "Connection: close\r\n"
+        return (head + "\r\n").encode("latin-1")
+
+    def serialize(self, request: Request, reply: Reply) -> bytes:
+        data = self.head(request, reply, chunked=False)
+        if has_body(request, reply):
+            data += reply.body + BLOCK[: reply.padding] + reply.tail
+        return data
+
+    async def write_later(self, request: Request, reply: Reply) -> None:
+        try:
+            if reply.delay > 0:
+                await asyncio.sleep(reply.delay)
+            chunked = reply.chunk_size > 0 and has_body(request, reply)
+            sent = 0
+            for piece in pieces(self.head(request, reply, chunked), request, reply, chunked):
+                if self.transport is None:
+                    return
+                if reply.reset_after is not None and sent + len(piece) >= reply.reset_after:
+                    self.transport.write(piece[: reply.reset_after - sent])
+                    self.reset()
+                    return
+                self.transport.write(piece)
+                sent += len(piece)
+                if chunked and reply.chunk_delay > 0:
+                    await asyncio.sleep(reply.chunk_delay)
+                await self.writable.wait()
+            if self.transport is None:
+                return
+            if reply.reset_after is not None:
+                self.reset()
+            elif not request.keep_alive:
+                self.transport.close()
+        finally:
+            self.busy = False
+        self.process()
+
+    def reset(self) -> None:
+        """Close the connection with a TCP RST, as a crashing server might"""
+        if self.transport is None:
+            return
+        sock = self.transport.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+        self.transport.abort()
+
+
+def has_body(request: Request, reply: Reply) -> bool:
+    return request.method != "HEAD" and reply.status not in (204, 304)
+
+
+def pieces(
+    head: bytes, request: Request, reply: Reply, chunked: bool
+) -> Iterator[Union[bytes, memoryview]]:
+    """The response, a piece to write at a time"""
+    yield head
+    if not has_body(request, reply):
+        return
+    if not chunked:
+        yield from reply.stream()
+        return
+    buffer = bytearray()
+    for piece in reply.stream():
+        buffer += piece
+        while len(buffer) >= reply.chunk_size:
+            yield b"%x\r\n%s\r\n" % (reply.chunk_size, buffer[: reply.chunk_size])
+            del buffer[: reply.chunk_size]
+    if buffer:
+        yield b"%x\r\n%s\r\n" % (len(buffer), buffer)
+    yield b"0\r\n\r\n"
+
+
+def listen(host: str, port: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(4096)
+    sock.setblocking(False)
+    return sock
+
+
+def run(sock: socket.socket) -> None:
+    loop = new_event_loop()
+    loop.add_signal_handler(signal.SIGTERM, loop.stop)
+    server = loop.run_until_complete(loop.create_server(HTTPProtocol, sock=sock))
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, workers: int = 1) -> None:
+    sock = listen(host, port)
+    app.logger.info(f"Serving on {host}:{port} ({workers} worker(s))")
+    # the workers share the listening socket, so the kernel spreads connections over them
+    children: List[int] = []
+    for _ in range(max(workers, 1) - 1):
+        pid = os.fork()
+        if pid == 0:
+            children = []
+            break
+        children.append(pid)
+    try:
+        run(sock)
+    finally:
+        for pid in children:
+            os.kill(pid, signal.SIGTERM)
+
+
+if __name__ == "__main__":
+    serve(
+        os.environ.get("HOST", DEFAULT_HOST),
+        int(os.environ.get("AIO_PORT", DEFAULT_PORT)),
+        int(os.environ.get("WORKERS", "1")),
+    )
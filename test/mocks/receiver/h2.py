@@ -0,0 +1,165 @@
+"""
+The receiver's routes over cleartext HTTP/2 (with prior knowledge), for testing
+callers that multiplex requests over one connection. Each stream is handed to
+the Flask app in a thread of its own, so a slow response (?wait=) doesn't hold
+up the other streams on its connection.
+
+    python -m receiver.h2  # listens on $HOST:$H2_PORT (default 0.0.0.0:8082)
+"""
+
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import Executor, ThreadPoolExecutor
+from os import environ
+from typing import cast, Dict, List, Optional, Tuple
+
+from h2.config import H2Configuration
+from h2.connection import H2Connection
+from h2.events import (
+    ConnectionTerminated,
+    DataReceived,
+    RequestReceived,
+    StreamEnded,
+    StreamReset,
+    WindowUpdated,
+)
+from h2.exceptions import ProtocolError, StreamClosedError
+
+from . import app
+
+DEFAULT_HOST = "0.0.0.0"
+DEFAULT_PORT = 8082
+
+# headers HTTP/2 forbids, as the connection itself takes care of them
+CONNECTION_HEADERS = {"connection", "keep-alive", "transfer-encoding", "upgrade"}
+
+Headers = List[Tuple[str, str]]
+
+
+def handle(headers: Headers, body: bytes) -> Tuple[int, Headers, bytes]:
+    """Run one request through the Flask app"""
+    pseudo = {name: value for name, value in headers if name.startswith(":")}
+    path, _, query = pseudo[":path"].partition("?")
+    response = app.test_client().open(
+        path,
+        method=pseudo[":method"],
+        query_string=query,
+        headers=[(name, value) for name, value in headers if not name.startswith(":")],
+        data=body,
+    )
+    response_headers = [
+        (name.lower(), value)
+        for name, value in response.headers.items()
+        if name.lower() not in CONNECTION_HEADERS
+    ]
+    return response.status_code, response_headers, response.get_data()
+
+
+class H2Protocol(asyncio.Protocol):
+    def __init__(self, executor: Executor) -> None:
+        self.executor = executor
+        self.conn = H2Connection(H2Configuration(client_side=False, header_encoding="utf-8"))
+        self.transport: Optional[asyncio.Transport] = None
+        # request headers and body so far, by stream
+        self.requests: Dict[int, Tuple[Headers, bytearray]] = {}
+        # response body not yet sent (waiting on flow control), by stream
+        self.unsent: Dict[int, bytes] = {}
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        assert isinstance(transport, asyncio.Transport)
+        self.transport = transport
+        self.conn.initiate_connection()
+        self.flush()
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        self.transport = None
+
+    def flush(self) -> None:
+        data = self.conn.data_to_send()
+        if data and self.transport is not None:
+            self.transport.write(data)
+
+    def data_received(self, data: bytes) -> None:
+        try:
+            events = self.conn.receive_data(data)
+        except ProtocolError:
+            self.flush()
+            if self.transport is not None:
+                self.transport.close()
+            return
+
+        for event in events:
+            if isinstance(event, RequestReceived):
+                # decoded to str, as header_encoding is set
+                headers = cast(Headers, list(event.headers or []))
+                self.requests[event.stream_id] = (headers, bytearray())
+            elif isinstance(event, DataReceived):
+                if event.stream_id in self.requests:
+                    self.requests[event.stream_id][1].extend(event.data)
+                self.conn.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+            elif isinstance(event, StreamEnded):
+                headers, body = self.requests.pop(event.stream_id)
+                asyncio.ensure_future(self.respond(event.stream_id, headers, bytes(body)))
+            elif isinstance(event, StreamReset):
+                self.requests.pop(event.stream_id, None)
+                self.unsent.pop(event.stream_id, None)
+            elif isinstance(event, WindowUpdated):
+                self.send_unsent()
+            elif isinstance(event, ConnectionTerminated) and self.transport is not None:
+                self.transport.close()
+        self.flush()
+
+    async def respond(self, stream_id: int, headers: Headers, body: bytes) -> None:
+        loop = asyncio.get_running_loop()
+        status, response_headers, data = await loop.run_in_executor(
+            self.executor, handle, headers, body
+        )
+        if self.transport is None:
+            return
+        try:
+            self.conn.send_headers(
+                stream_id, [(":status", str(status)), *response_headers], end_stream=not data
+            )
+        except (ProtocolError, StreamClosedError):
+            return
+        if data:
+            self.unsent[stream_id] = data
+            self.send_unsent()
+        self.flush()
+
+    def send_unsent(self) -> None:
+        for stream_id, data in list(self.unsent.items()):
+            try:
+                while data:
+                    size = min(
+                        self.conn.local_flow_control_window(stream_id),
+                        self.conn.max_outbound_frame_size,
+                    )
+                    if size <= 0:
+                        break
+                    self.conn.send_data(stream_id, data[:size])
+                    data = data[size:]
+                if data:
+                    self.unsent[stream_id] = data
+                else:
+                    del self.unsent[stream_id]
+                    self.conn.end_stream(stream_id)
+            except (ProtocolError, StreamClosedError):
+                self.unsent.pop(stream_id, None)
+
+
+def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> None:
+    executor = ThreadPoolExecutor(max_workers=64)
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(loop.create_server(lambda: H2Protocol(executor), host, port))
+    app.logger.info(f"Serving HTTP/2 on {host}:{port}")
+    try:
+        loop.run_forever()
+    finally:
+        server.close()
+        executor.shutdown(wait=False)
+
+
+if __name__ == "__main__":
+    serve(environ.get("HOST", DEFAULT_HOST), int(environ.get("H2_PORT", DEFAULT_PORT)))
@@ -9,6 +9,10 @@ import pytest
 
 TEST_HOST = "localhost"
 TEST_PORT = 8080
+# the same routes over HTTP/2 (python -m receiver.h2)
+TEST_H2_PORT = 8082
+# the same routes, plus fault injection, served by asyncio (python -m receiver.aio)
+TEST_AIO_PORT = 8081
 
 BASIC_AUTH_CREDENTIALS = urlsafe_b64encode("username:password".encode()).decode()
 BASIC_AUTH_HEADERS = {"Authorization": f"Basic {BASIC_AUTH_CREDENTIALS}"}
@@ -42,66 +46,66 @@ class InternalTestCase:
     response: InternalTestResponse
 
 
-@pytest.mark.parametrize(
-    "InternalTestCase",
-    (
-        InternalTestCase(
-            request=InternalTestRequest(
-                path="/noauth",
-            ),
-            response=InternalTestResponse(),
+TEST_CASES = (
+    InternalTestCase(
+        request=InternalTestRequest(
+            path="/noauth",
         ),
-        InternalTestCase(
-            request=InternalTestRequest(
-                path="/basic",
-                headers=BASIC_AUTH_HEADERS,
-            ),
-            response=InternalTestResponse(),
+        response=InternalTestResponse(),
+    ),
+    InternalTestCase(
+        request=InternalTestRequest(
+            path="/basic",
+            headers=BASIC_AUTH_HEADERS,
         ),
-        InternalTestCase(
-            request=InternalTestRequest(
-                path="/bearer",
-                headers=BEARER_AUTH_HEADERS,
-            ),
-            response=InternalTestResponse(),
+        response=InternalTestResponse(),
+    ),
+    InternalTestCase(
+        request=InternalTestRequest(
+            path="/bearer",
+            headers=BEARER_AUTH_HEADERS,
         ),
-        InternalTestCase(
-            request=InternalTestRequest(
-                path="/bearer",
-                headers=BASIC_AUTH_HEADERS,
-            ),
-            response=InternalTestResponse(status=401),
+        response=InternalTestResponse(),
+    ),
+    InternalTestCase(
+        request=InternalTestRequest(
+            path="/bearer",
+            headers=BASIC_AUTH_HEADERS,
         ),
-        InternalTestCase(
-            request=InternalTestRequest(
-                path="/noauth/subpath",
-                params={"status": 301},
-            ),
-            response=InternalTestResponse(status=301),
+        response=InternalTestResponse(status=401),
+    ),
+    InternalTestCase(
+        request=InternalTestRequest(
+            path="/noauth/subpath",
+            params={"status": 301},
         ),
-        InternalTestCase(
-            request=InternalTestRequest(
-                path="/noauth${HOME}",
-                params={"status": 301},
-            ),
-            response=InternalTestResponse(status=301),
+        response=InternalTestResponse(status=301),
+    ),
+    InternalTestCase(
+        request=InternalTestRequest(
+            path="/noauth${HOME}",
+            params={"status": 301},
         ),
-        InternalTestCase(
-            request=InternalTestRequest(
-                method=HTTPMethod.POST,
-                path="/noauth",
-            ),
-            response=InternalTestResponse(status=201),
+        response=InternalTestResponse(status=301),
+    ),
+    InternalTestCase(
+        request=InternalTestRequest(
+            method=HTTPMethod.POST,
+            path="/noauth",
         ),
-        InternalTestCase(
-            request=InternalTestRequest(
-                method=HTTPMethod.DELETE,
-                path="/noauth",
-            ),
-            response=InternalTestResponse(status=204),
+        response=InternalTestResponse(status=201),
+    ),
+    InternalTestCase(
+        request=InternalTestRequest(
+            method=HTTPMethod.DELETE,
+            path="/noauth",
         ),
+        response=InternalTestResponse(status=204),
     ),
 )
+
+
+@pytest.mark.parametrize("InternalTestCase", TEST_CASES)
 def test_(InternalTestCase: InternalTestCase) -> None:
     results = Caller(
         host=InternalTestCase.request.host,
@@ -0,0 +1,120 @@
+import asyncio
+from pathlib import Path
+from threading import get_ident
+from typing import Any, List
+from uuid import uuid4
+
+from caller.aio import AsyncCaller, AsyncSession
+from caller.caller import FailedAPICall, HTTPResponse
+from caller.history import HistoryStore
+import pytest
+
+from .test_ import InternalTestCase, TEST_AIO_PORT, TEST_CASES, TEST_HOST, TEST_PORT
+
+
+@pytest.mark.parametrize("InternalTestCase", TEST_CASES)
+def test_async_(InternalTestCase: InternalTestCase) -> None:
+    results = asyncio.run(
+        AsyncCaller(
+            host=InternalTestCase.request.host,
+            port=InternalTestCase.request.port,
+            insecure=True,
+        )(
+            method=InternalTestCase.request.method,
+            path=InternalTestCase.request.path,
+            params=InternalTestCase.request.params,
+            headers=InternalTestCase.request.headers,
+            body=InternalTestCase.request.body,
+            timeout=InternalTestCase.request.timeout,
+            retries=InternalTestCase.request.retries,
+            retry_on=InternalTestCase.request.retry_on,
+        )
+    )
+    assert results[-1].status == InternalTestCase.response.status
+
+
+def test_async_fan_out_is_bounded() -> None:
+    async def fan_out() -> List[List[HTTPResponse]]:
+        async with AsyncSession(max_concurrency=4) as session:
+            caller = AsyncCaller(host=TEST_HOST, port=TEST_PORT, insecure=True, session=session)
+            return await asyncio.gather(*[caller(path=f"/noauth/{i}") for i in range(40)])
+
+    results = asyncio.run(fan_out())
+    assert [r[-1].body["subpath"] for r in results] == [f"/{i}" for i in range(40)]  # type: ignore
+    assert all(r[-1].status == 200 for r in results)
+
+
+def test_async_retries_then_fails() -> None:
+    request_id = str(uuid4())
+    with pytest.raises(FailedAPICall) as err:
+        asyncio.run(
+            AsyncCaller(host=TEST_HOST, port=TEST_PORT, insecure=True)(
+                path="/noauth",
+                params={"fails": 5, "requestId": request_id},
+                retries=1,
+                retry_on=["50X"],
+                fail_on=["50X"],
+            )
+        )
+    assert err.value.attempts == 2
+    assert err.value.status == 500
+
+
+def test_async_connection_error() -> None:
+    with pytest.raises(FailedAPICall) as err:
+        asyncio.run(AsyncCaller(host=TEST_HOST, port=1, insecure=True)(path="/"))
+    assert err.value.status == 0
+    assert err.value.responses[-1].body["error"] == "ConnectError"  # type: ignore
+
+
+def test_async_caller_keeps_its_session() -> None:
+    async def run() -> List[HTTPResponse]:
+        async with AsyncCaller(host=TEST_HOST, port=TEST_AIO_PORT, insecure=True) as caller:
+            first = await caller(path="/noauth")
+            return first + await caller(path="/noauth")
+
+    first, second = asyncio.run(run())
+    assert first.timings is not None and first.timings.connect
+    # the second call reuses the first's connection
+    assert second.timings is not None and not second.timings.connect
+
+
+def test_async_caller_session_stays_in_its_loop() -> None:
+    caller = AsyncCaller(host=TEST_HOST, port=TEST_AIO_PORT, insecure=True)
+    asyncio.run(caller(path="/noauth"))
+    # its connections can't be closed from the next loop, so it refuses to drop them
+    with pytest.raises(RuntimeError):
+        asyncio.run(caller(path="/noauth"))
+
+    async def run() -> List[HTTPResponse]:
+        async with caller:
+            return await caller(path="/noauth")
+
+    caller = AsyncCaller(host=TEST_HOST, port=TEST_AIO_PORT, insecure=True)
+    assert asyncio.run(run())[-1].status == 200
+    assert asyncio.run(run())[-1].status == 200
+
+
+class ThreadRecordingHistory(HistoryStore):
+    def __init__(self, path: str) -> None:
+        super().__init__(path)
+        self.threads: List[int] = []
+
+    def record(self, *args: Any, **kwargs: Any) -> None:
+        self.threads.append(get_ident())
+        super().record(*args, **kwargs)
+
+
+def test_async_caller_records_history_off_the_loop(tmp_path: Path) -> None:
+    history = ThreadRecordingHistory(str(tmp_path / "history.db"))
+
+    async def run() -> int:
+        async with AsyncCaller(
+            host=TEST_HOST, port=TEST_AIO_PORT, insecure=True, history=history
+        ) as caller:
+            await caller(path="/noauth")
+        return get_ident()
+
+    loop_thread = asyncio.run(run())
+    assert history.threads and loop_thread not in history.threads
+    history.close()
@@ -1,6 +1,8 @@
 from base64 import b64encode
+from typing import Optional
 
-from caller.__main__ import kvp_type
+from caller import http2
+from caller.__main__ import get_cli_args, get_serve_args, kvp_type
 import pytest
 
 
@@ -34,3 +36,21 @@ def test_arg_parse_kvp_type(arg: str, name: str, value: str) -> None:
     key, value = kvp_type(arg)
     assert key == name
     assert value == value
+
+
+def test_http2_needs_h2(monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture) -> None:
+    assert get_cli_args(["-u", "example.com", "--http2", "--h2c"]).h2c
+
+    def find_spec(name: str) -> Optional[object]:
+        return None
+
+    monkeypatch.setattr(http2, "find_spec", find_spec)
+    for get_args, argv in (
+        (get_cli_args, ["-u", "example.com"]),
+        (get_serve_args, ["-s", "schedules.yaml"]),
+    ):
+        with pytest.raises(SystemExit):
+            get_args(argv + ["--http2"])
+        assert "HTTP/2 needs the h2 package installed" in capsys.readouterr().err
+    with pytest.raises(SystemExit):
+        get_cli_args(["-u", "example.com", "--h2c"])
@@ -0,0 +1,79 @@
+import asyncio
+import hashlib
+from pathlib import Path
+
+from caller.aio import AsyncCaller
+from caller.body import BodyMode, BodyPolicy, BodyReader
+from caller.caller import Caller
+import pytest
+
+from .test_ import TEST_HOST, TEST_PORT
+
+CHUNKS = [b'{"key": ', b'"value"', b"}"]
+PAYLOAD = b"".join(CHUNKS)
+SHA256 = hashlib.sha256(PAYLOAD).hexdigest()
+
+
+@pytest.mark.parametrize(
+    "policy, expected",
+    [
+        (BodyPolicy(BodyMode.DISCARD), {"bytes": len(PAYLOAD)}),
+        (BodyPolicy(BodyMode.HASH), {"bytes": len(PAYLOAD), "sha256": SHA256}),
+        (BodyPolicy(BodyMode.TRUNCATE, max_bytes=64), {"key": "value"}),
+        (
+            BodyPolicy(BodyMode.TRUNCATE, max_bytes=4),
+            {"bytes": len(PAYLOAD), "truncated": True, "content": '{"ke'},
+        ),
+    ],
+)
+def test_body_reader(policy: BodyPolicy, expected: object) -> None:
+    assert BodyReader(policy).read(CHUNKS) == expected
+
+
+def test_body_reader_file(tmp_path: Path) -> None:
+    path = tmp_path / "body.json"
+    body = BodyReader(BodyPolicy(BodyMode.FILE, path=str(path))).read(CHUNKS)
+    assert body == {"bytes": len(PAYLOAD), "sha256": SHA256, "path": str(path)}
+    assert path.read_bytes() == PAYLOAD
+
+
+def test_body_reader_file_aborted(tmp_path: Path) -> None:
+    def broken():  # type: ignore[no-untyped-def]
+        yield b"partial"
+        raise ConnectionError()
+
+    path = tmp_path / "body.json"
+    with pytest.raises(ConnectionError):
+        BodyReader(BodyPolicy(BodyMode.FILE, path=str(path))).read(broken())
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_body_policy_requires_path() -> None:
+    with pytest.raises(ValueError):
+        BodyPolicy(BodyMode.FILE)
+
+
+def test_caller_streams_body(tmp_path: Path) -> None:
+    caller = Caller(host=TEST_HOST, port=TEST_PORT, insecure=True)
+    full = caller(path="/noauth/sub")[-1].body
+    assert full == {"subpath": "/sub"}
+
+    hashed = caller(path="/noauth/sub", body_policy=BodyPolicy(BodyMode.HASH))[-1].body
+    assert isinstance(hashed, dict) and hashed["bytes"] > 0 and "sha256" in hashed
+
+    path = tmp_path / "body.json"
+    filed = caller(path="/noauth/sub", body_policy=BodyPolicy(BodyMode.FILE, path=str(path)))
+    assert filed[-1].body == {**hashed, "path": str(path)}
+
+    truncated = caller(path="/noauth/sub", body_policy=BodyPolicy(BodyMode.TRUNCATE, max_bytes=2))
+    assert truncated[-1].body == {"bytes": hashed["bytes"], "truncated": True, "content": '{"'}
+
+
+def test_async_caller_streams_body() -> None:
+    results = asyncio.run(
+        AsyncCaller(host=TEST_HOST, port=TEST_PORT, insecure=True)(
+            path="/noauth/sub", body_policy=BodyPolicy(BodyMode.DISCARD)
+        )
+    )
+    assert results[-1].status == 200
+    assert set(results[-1].body) == {"bytes"}
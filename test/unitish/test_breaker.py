@@ -0,0 +1,203 @@
+import asyncio
+from threading import Timer
+from time import perf_counter
+from typing import List
+
+from caller.breaker import (
+    BreakerConfig,
+    BreakerRegistry,
+    BreakerRejected,
+    BreakerState,
+    CircuitBreaker,
+)
+from caller.caller import Caller, FailedAPICall
+from caller.retry import RetryPolicy, RetryStrategy
+import pytest
+
+from .test_ import TEST_HOST, TEST_PORT
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def attempt(breaker: CircuitBreaker, failed: bool) -> None:
+    breaker.release(breaker.acquire(), failed)
+
+
+def test_opens_after_consecutive_failures_and_recovers() -> None:
+    clock = FakeClock()
+    breaker = CircuitBreaker(
+        "host:443", BreakerConfig(failure_threshold=3, reset_timeout=10), clock
+    )
+
+    # a success resets the count
+    for failed in (True, True, False, True, True):
+        attempt(breaker, failed)
+    assert breaker.state == BreakerState.CLOSED
+
+    attempt(breaker, True)
+    assert breaker.state == BreakerState.OPEN
+    with pytest.raises(BreakerRejected, match="^Circuit open for host:443"):
+        breaker.acquire()
+
+    # after the timeout, one trial call goes through; a failure reopens it
+    clock.now = 10.0
+    trial = breaker.acquire()
+    assert trial.trial and breaker.state == BreakerState.HALF_OPEN
+    with pytest.raises(BreakerRejected, match="waiting on a trial call"):
+        breaker.acquire()
+    breaker.release(trial, failed=True)
+    assert breaker.state == BreakerState.OPEN
+
+    # and a success closes it
+    clock.now = 20.0
+    attempt(breaker, False)
+    assert breaker.state == BreakerState.CLOSED
+
+
+def test_concurrency_limit_is_aimd() -> None:
+    config = BreakerConfig(failure_threshold=100, initial_limit=8, min_limit=1, max_limit=10)
+    breaker = CircuitBreaker("host:443", config)
+
+    slots = [breaker.acquire() for _ in range(8)]
+    with pytest.raises(BreakerRejected, match=r"^Concurrency limit \(8\) reached for host:443"):
+        breaker.acquire(timeout=0)
+    for slot in slots:
+        breaker.release(slot, failed=False)
+    # additive increase: about one per `limit` successes
+    assert breaker.stats()["limit"] == 8
+    for _ in range(10):
+        attempt(breaker, False)
+    assert breaker.stats()["limit"] == 10  # capped
+
+    # multiplicative decrease
+    attempt(breaker, True)
+    assert breaker.stats()["limit"] == 5
+    for _ in range(5):
+        attempt(breaker, True)
+    assert breaker.stats()["limit"] == 1  # floored
+
+
+def test_limit_is_cut_once_per_window() -> None:
+    config = BreakerConfig(failure_threshold=100, initial_limit=8)
+    breaker = CircuitBreaker("host:443", config)
+
+    # a burst of failures in flight together cuts the limit once
+    slots = [breaker.acquire() for _ in range(8)]
+    for slot in slots:
+        breaker.release(slot, failed=True)
+    assert breaker.stats()["limit"] == 4
+    # and the next attempt begins a new window
+    attempt(breaker, True)
+    assert breaker.stats()["limit"] == 2
+
+
+def test_only_the_trial_attempt_decides() -> None:
+    clock = FakeClock()
+    breaker = CircuitBreaker("host:443", BreakerConfig(failure_threshold=1), clock)
+    earlier = breaker.acquire()
+    attempt(breaker, True)
+    assert breaker.state == BreakerState.OPEN
+
+    clock.now = 60.0
+    trial = breaker.acquire()
+    # an attempt from before the circuit opened ending doesn't close it
+    breaker.release(earlier, failed=False)
+    assert breaker.state == BreakerState.HALF_OPEN
+    breaker.release(trial, failed=False)
+    assert breaker.state == BreakerState.CLOSED
+
+
+def test_attempts_wait_for_a_slot() -> None:
+    breaker = CircuitBreaker(
+        "host:443", BreakerConfig(initial_limit=1, max_limit=1, queue_timeout=0.2)
+    )
+    slot = breaker.acquire()
+    Timer(0.05, breaker.release, (slot, False)).start()
+    start = perf_counter()
+    breaker.release(breaker.acquire(), failed=False)
+    assert 0.04 < perf_counter() - start < 0.2
+
+    # for up to the queue timeout
+    slot = breaker.acquire()
+    start = perf_counter()
+    with pytest.raises(BreakerRejected, match="waited 0.2 seconds for a slot"):
+        breaker.acquire()
+    assert perf_counter() - start >= 0.2
+
+    async def wait() -> None:
+        asyncio.get_running_loop().call_later(0.05, breaker.release, slot, False)
+        breaker.release(await breaker.acquire_async(), failed=False)
+        with pytest.raises(BreakerRejected, match="waited 0.1 seconds"):
+            held = await breaker.acquire_async()
+            await breaker.acquire_async(timeout=0.1)
+        breaker.release(held, failed=False)
+
+    asyncio.run(wait())
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"failure_threshold": 0},
+        {"min_limit": 0},
+        {"initial_limit": 4, "max_limit": 2},
+        {"backoff_ratio": 1.0},
+        {"queue_timeout": -1.0},
+    ],
+)
+def test_config_invalid(kwargs: dict) -> None:
+    with pytest.raises(ValueError):
+        BreakerConfig(**kwargs)
+
+
+def test_registry_keys_by_host_and_port() -> None:
+    registry = BreakerRegistry()
+    assert registry.get("a", 443) is registry.get("a", 443)
+    assert registry.get("a", 443) is not registry.get("a", 8443)
+    assert set(registry.stats()) == {"a:443", "a:8443"}
+
+
+def test_caller_fails_fast_once_open() -> None:
+    breakers = BreakerRegistry(BreakerConfig(failure_threshold=2, reset_timeout=60))
+    caller = Caller(host=TEST_HOST, port=TEST_PORT, insecure=True, breakers=breakers)
+
+    statuses: List[int] = []
+    for _ in range(2):
+        with pytest.raises(FailedAPICall) as err:
+            caller(path="/noauth", params={"status": 503}, fail_on=["50X"])
+        statuses.append(err.value.status)
+    assert statuses == [503, 503]
+
+    start = perf_counter()
+    with pytest.raises(FailedAPICall) as err:
+        caller(path="/noauth", timeout=30)
+    assert perf_counter() - start < 0.1
+    assert str(err.value).startswith(f"Circuit open for {TEST_HOST}:{TEST_PORT}")
+    assert err.value.attempts == 0
+
+    # other origins are unaffected
+    assert breakers.get(TEST_HOST, TEST_PORT + 1).state == BreakerState.CLOSED
+
+
+def test_retries_stop_when_the_circuit_opens() -> None:
+    breakers = BreakerRegistry(BreakerConfig(failure_threshold=2, reset_timeout=60))
+    caller = Caller(host=TEST_HOST, port=TEST_PORT, insecure=True, breakers=breakers)
+    with pytest.raises(FailedAPICall) as err:
+        caller(
+            path="/noauth",
+            params={"status": 503},
+            retries=5,
+            retry_on=["50X"],
+            fail_on=["50X"],
+            retry_policy=RetryPolicy(
+                strategy=RetryStrategy.FULL_JITTER, base=0.001, max_delay=0.001
+            ),
+        )
+    assert err.value.attempts == 2
+    assert str(err.value).startswith("Circuit open")
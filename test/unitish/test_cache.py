@@ -0,0 +1,133 @@
+from json import dumps, loads
+import os
+from pathlib import Path
+from typing import Any
+
+from caller.body import BodyMode, BodyPolicy
+from caller.cache import ResponseCache
+from caller.caller import Caller, HTTPResponse, RenderedRequest
+import pytest
+
+from .test_ import TEST_HOST, TEST_PORT
+
+
+def rendered(headers: dict = {}, params: dict = {}) -> RenderedRequest:
+    return RenderedRequest(
+        scheme="http",
+        method="get",
+        host="example.com",
+        url="http://example.com:80/items",
+        params=params,
+        headers=headers,
+        body=None,
+    )
+
+
+def response(body: str = "x", **headers: str) -> HTTPResponse:
+    return HTTPResponse(duration=0.1, status=200, headers=headers, body=body)
+
+
+@pytest.mark.parametrize(
+    "a, b, same",
+    [
+        (rendered(), rendered(), True),
+        (rendered(params={"a": 1, "b": 2}), rendered(params={"b": 2, "a": 1}), True),
+        (rendered({"X-Request-Id": "1"}), rendered({"X-Request-Id": "2"}), True),
+        (rendered({"Accept": "text/csv"}), rendered({"accept": "text/csv"}), True),
+        (rendered({"Accept": "text/csv"}), rendered({"Accept": "application/json"}), False),
+        (rendered({"Authorization": "Bearer a"}), rendered({"Authorization": "Bearer b"}), False),
+        (rendered(params={"page": 1}), rendered(params={"page": 2}), False),
+    ],
+)
+def test_key(a: RenderedRequest, b: RenderedRequest, same: bool) -> None:
+    assert (ResponseCache.key(a) == ResponseCache.key(b)) is same
+
+
+def test_stores_only_responses_with_validators(tmp_path: Path) -> None:
+    cache = ResponseCache(str(tmp_path))
+    assert not cache.put("a", response())
+    assert not cache.put("b", HTTPResponse(duration=0, status=500, headers={"ETag": "1"}, body=""))
+    assert cache.put("c", response(ETag='"1"'))
+    assert cache.put("d", response(**{"Last-Modified": "Wed, 21 Oct 2015 07:28:00 GMT"}))
+
+    assert cache.get("a") is None
+    entry = cache.get("c")
+    assert entry is not None and entry.body == "x"
+    assert entry.validators() == {"If-None-Match": '"1"'}
+    entry = cache.get("d")
+    assert entry is not None
+    assert entry.validators() == {"If-Modified-Since": "Wed, 21 Oct 2015 07:28:00 GMT"}
+
+
+def age(path: Path, seconds: float) -> None:
+    data = loads(path.read_text())
+    data["stored"] -= seconds
+    path.write_text(dumps(data))
+
+
+def test_expires_after_ttl(tmp_path: Path) -> None:
+    cache = ResponseCache(str(tmp_path), ttl=60)
+    cache.put("a", response(ETag='"1"'))
+    entry = cache.get("a")
+    assert entry is not None
+
+    # a 304 confirming it renews it
+    age(tmp_path / "a.json", 120)
+    cache.touch(entry)
+    assert cache.get("a") is not None
+
+    age(tmp_path / "a.json", 120)
+    assert cache.get("a") is None
+    assert not (tmp_path / "a.json").exists()
+
+
+def test_evicts_least_recent_over_max_bytes(tmp_path: Path) -> None:
+    body = "x" * 1000
+    cache = ResponseCache(str(tmp_path), max_bytes=2500)
+    for idx, key in enumerate(["a", "b", "c"]):
+        cache.put(key, response(body, ETag=f'"{key}"'))
+        os.utime(tmp_path / f"{key}.json", (idx, idx))
+    cache.evict()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["b.json", "c.json"]
+
+
+def test_scans_only_once_writes_pass_max_bytes(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    scans = []
+    scandir = os.scandir
+
+    def counting(path: str) -> Any:
+        scans.append(path)
+        return scandir(path)
+
+    monkeypatch.setattr(os, "scandir", counting)
+    cache = ResponseCache(str(tmp_path), max_bytes=2500)
+    body = "x" * 1000
+    cache.put("a", response(body, ETag='"a"'))
+    cache.put("b", response(body, ETag='"b"'))
+    # one scan to size the directory, none while under the limit
+    assert len(scans) == 1
+    cache.put("c", response(body, ETag='"c"'))
+    assert len(scans) == 2
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["b.json", "c.json"]
+
+
+def test_caller_revalidates_with_etag(tmp_path: Path) -> None:
+    cache = ResponseCache(str(tmp_path))
+    caller = Caller(host=TEST_HOST, port=TEST_PORT, insecure=True, cache=cache)
+    params = {"etag": "1", "size": 1000}
+
+    first = caller(path="/noauth/cached", params=params)[-1]
+    assert first.status == 200
+    assert len(list(tmp_path.iterdir())) == 1
+
+    second = caller(path="/noauth/cached", params=params)[-1]
+    assert second.status == 304
+    assert second.body == first.body
+    assert second.headers["Content-Type"] == "application/json"
+
+    # streamed bodies aren't cached, so aren't conditional
+    policy = BodyPolicy(mode=BodyMode.DISCARD)
+    streamed = caller(path="/noauth/cached", params=params, body_policy=policy)[-1]
+    assert streamed.status == 200
@@ -0,0 +1,180 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from json import loads
+from threading import Barrier
+from time import sleep
+from typing import Dict, List, Optional
+from urllib.request import urlopen
+from uuid import uuid4
+
+from caller.aio import AsyncCaller, AsyncSession
+from caller.body import BodyMode, BodyPolicy
+from caller.caller import Caller, HTTPMethod, HTTPResponse, RenderedRequest
+from caller.coalesce import AsyncSingleFlight, coalesce_key, SingleFlight
+import pytest
+
+from .test_ import TEST_HOST, TEST_PORT
+
+
+def rendered(method: str = "get", params: Optional[Dict] = None) -> RenderedRequest:
+    return RenderedRequest(
+        scheme="http",
+        method=method,
+        host="example.com",
+        url="http://example.com:80/items",
+        params=params,
+        headers=None,
+        body=None,
+    )
+
+
+@pytest.mark.parametrize(
+    "headers, other, same",
+    [
+        ({}, {}, True),
+        ({"Accept": "text/csv"}, {"accept": "text/csv"}, True),
+        ({"X-Request-Id": "1", "traceparent": "a"}, {"x-request-id": "2"}, True),
+        ({"Accept": "text/csv"}, {"Accept": "application/json"}, False),
+        ({"Authorization": "Bearer a"}, {"Authorization": "Bearer b"}, False),
+        ({"X-Tenant": "a"}, {}, False),
+    ],
+)
+def test_key_headers(headers: Dict, other: Dict, same: bool) -> None:
+    a, b = coalesce_key(rendered(), headers, None), coalesce_key(rendered(), other, None)
+    assert a is not None and b is not None
+    assert (a == b) is same
+
+
+def test_key_distinct_requests() -> None:
+    key = coalesce_key(rendered(params={"a": 1}), None, None)
+    assert key == coalesce_key(rendered(params={"a": "1"}), None, None)
+    assert key != coalesce_key(rendered(params={"a": 2}), None, None)
+    assert key != coalesce_key(rendered("head", params={"a": 1}), None, None)
+    assert key != coalesce_key(rendered(params={"a": 1}), None, BodyPolicy(mode=BodyMode.DISCARD))
+
+
+@pytest.mark.parametrize("method", ["post", "put", "patch", "delete"])
+def test_key_only_for_safe_methods(method: str) -> None:
+    assert coalesce_key(rendered(method), None, None) is None
+
+
+def test_key_never_for_bodies_streamed_to_files() -> None:
+    policy = BodyPolicy(mode=BodyMode.FILE, path="/tmp/body")
+    assert coalesce_key(rendered(), None, policy) is None
+
+
+def test_single_flight_shares_one_exchange() -> None:
+    flights, barrier, exchanges = SingleFlight(), Barrier(8), []
+
+    def exchange() -> HTTPResponse:
+        exchanges.append(1)
+        sleep(0.2)
+        return HTTPResponse(duration=0.2, status=200, headers={}, body={"n": len(exchanges)})
+
+    def one(_: int) -> HTTPResponse:
+        barrier.wait()
+        return flights.do("key", exchange)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        responses = list(pool.map(one, range(8)))
+    assert len(exchanges) == 1
+    assert len({id(response) for response in responses}) == 8  # copies...
+    assert all(response.body is responses[0].body for response in responses)  # ...sharing
+    assert flights.in_flight() == 0
+
+
+def test_single_flight_shares_errors() -> None:
+    flights, barrier = SingleFlight(), Barrier(4)
+
+    def exchange() -> HTTPResponse:
+        sleep(0.2)
+        raise ConnectionError("down")
+
+    def one(_: int) -> Optional[str]:
+        barrier.wait()
+        try:
+            flights.do("key", exchange)
+        except ConnectionError as err:
+            return str(err)
+        return None
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        assert list(pool.map(one, range(4))) == ["down"] * 4
+    assert flights.in_flight() == 0
+
+
+def test_async_single_flight_outlives_a_cancelled_leader() -> None:
+    exchanges: List[int] = []
+
+    async def exchange() -> HTTPResponse:
+        exchanges.append(1)
+        await asyncio.sleep(0.1)
+        return HTTPResponse(duration=0.1, status=200, headers={}, body={})
+
+    async def run() -> None:
+        flights = AsyncSingleFlight()
+        leader = asyncio.ensure_future(flights.do("key", exchange))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flights.do("key", exchange))
+        await asyncio.sleep(0)
+
+        # the follower still gets the shared response
+        leader.cancel()
+        assert (await follower).status == 200
+        assert leader.cancelled() and len(exchanges) == 1
+        assert flights.in_flight() == 0
+
+        # and the exchange is cancelled once no one is waiting for it
+        alone = asyncio.ensure_future(flights.do("key", exchange))
+        await asyncio.sleep(0)
+        alone.cancel()
+        await asyncio.sleep(0)
+        assert flights.in_flight() == 0
+        assert (await flights.do("key", exchange)).status == 200
+        assert len(exchanges) == 3
+
+    asyncio.run(run())
+
+
+def request_count(request_id: str) -> int:
+    with urlopen(f"http://{TEST_HOST}:{TEST_PORT}/admin/count/{request_id}") as response:
+        return int(loads(response.read())["count"])
+
+
+def test_caller_coalesces_identical_gets() -> None:
+    caller = Caller(host=TEST_HOST, port=TEST_PORT, insecure=True, flights=SingleFlight())
+    request_id = str(uuid4())
+    barrier = Barrier(6)
+
+    def one(_: int) -> List[HTTPResponse]:
+        barrier.wait()
+        return caller(path="/noauth", params={"requestId": request_id, "wait": 1})
+
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        results = list(pool.map(one, range(6)))
+    assert [responses[-1].status for responses in results] == [200] * 6
+    assert request_count(request_id) == 1
+
+    # HEAD requests are coalesced too
+    responses = caller(method=HTTPMethod.HEAD, path="/noauth")
+    assert responses[-1].status == 200
+
+
+def test_async_caller_coalesces_identical_gets() -> None:
+    request_id = str(uuid4())
+
+    async def run() -> List[List[HTTPResponse]]:
+        async with AsyncSession() as session:
+            caller = AsyncCaller(
+                host=TEST_HOST,
+                port=TEST_PORT,
+                insecure=True,
+                session=session,
+                flights=AsyncSingleFlight(),
+            )
+            calls = [caller(path="/noauth", params={"requestId": request_id}) for _ in range(5)]
+            return list(await asyncio.gather(*calls))
+
+    results = asyncio.run(run())
+    assert [responses[-1].status for responses in results] == [200] * 5
+    assert request_count(request_id) == 1
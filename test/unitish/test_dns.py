@@ -0,0 +1,101 @@
+import socket
+from typing import List
+
+from caller.caller import Caller, FailedAPICall
+from caller.dns import DNSCache, lookup
+from caller.pool import SessionPool
+import pytest
+
+from .test_ import TEST_HOST, TEST_PORT
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class Resolver:
+    def __init__(self, error: int = 0) -> None:
+        self.error = error
+        self.lookups: List[str] = []
+
+    def __call__(self, host: str, family: int) -> List[str]:
+        self.lookups.append(host)
+        if self.error:
+            raise socket.gaierror(self.error, "failed")
+        return ["10.0.0.1", "10.0.0.2"]
+
+
+def test_caches_addresses_for_ttl() -> None:
+    clock, resolver = Clock(), Resolver()
+    cache = DNSCache(ttl=60, clock=clock, resolver=resolver)
+    assert cache.resolve("api.example.com") == ["10.0.0.1", "10.0.0.2"]
+    clock.now = 59
+    assert cache.resolve("api.example.com") == ["10.0.0.1", "10.0.0.2"]
+    assert cache.resolve("other.example.com")
+    assert resolver.lookups == ["api.example.com", "other.example.com"]
+
+    clock.now = 61
+    cache.resolve("api.example.com")
+    assert resolver.lookups[-1] == "api.example.com"
+    assert cache.stats() == {"hits": 1, "negative_hits": 0, "misses": 3, "entries": 2}
+
+
+def test_caches_names_that_dont_exist() -> None:
+    clock, resolver = Clock(), Resolver(socket.EAI_NONAME)
+    cache = DNSCache(negative_ttl=10, clock=clock, resolver=resolver)
+    for _ in range(3):
+        with pytest.raises(socket.gaierror) as err:
+            cache.resolve("nope.example.com")
+        assert err.value.errno == socket.EAI_NONAME
+    assert len(resolver.lookups) == 1
+
+    clock.now = 11
+    with pytest.raises(socket.gaierror):
+        cache.resolve("nope.example.com")
+    assert len(resolver.lookups) == 2
+    assert cache.stats()["negative_hits"] == 2
+
+
+def test_doesnt_cache_resolver_failures() -> None:
+    resolver = Resolver(socket.EAI_AGAIN)
+    cache = DNSCache(resolver=resolver)
+    for _ in range(2):
+        with pytest.raises(socket.gaierror):
+            cache.resolve("flaky.example.com")
+    assert len(resolver.lookups) == 2
+
+
+def test_prefetch() -> None:
+    resolver = Resolver()
+    cache = DNSCache(resolver=resolver)
+    assert cache.prefetch(["a.example.com", "b.example.com", "a.example.com"]) == 2
+    assert sorted(resolver.lookups) == ["a.example.com", "b.example.com"]
+    cache.resolve("a.example.com")
+    assert cache.stats()["hits"] == 1
+
+
+def test_connections_resolve_through_the_cache(monkeypatch: pytest.MonkeyPatch) -> None:
+    lookups: List[str] = []
+
+    def counting(host: str, family: int) -> List[str]:
+        lookups.append(host)
+        return lookup(host, family)
+
+    cache = DNSCache(resolver=counting)
+    monkeypatch.setattr("caller.dns._DEFAULT_DNS", cache)
+
+    # a new pool each time, so each call opens a connection
+    for _ in range(3):
+        caller = Caller(host=TEST_HOST, port=TEST_PORT, insecure=True, pool=SessionPool())
+        assert caller(path="/noauth")[-1].status == 200
+    assert lookups == [TEST_HOST]
+    assert cache.stats()["hits"] == 2
+
+    caller = Caller(host="nope.invalid", port=TEST_PORT, insecure=True, pool=SessionPool())
+    with pytest.raises(FailedAPICall) as err:
+        caller(path="/noauth")
+    assert err.value.status == 0
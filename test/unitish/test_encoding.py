@@ -0,0 +1,106 @@
+import gzip
+from json import dumps, loads
+from uuid import uuid4
+
+from caller.__main__ import call_plan, parse_entry_args
+from caller.body import BodyMode, BodyPolicy
+from caller.caller import Caller, CallPlan, HTTPMethod
+from caller.encoding import Compression, encode_body
+import pytest
+
+from .test_ import TEST_HOST, TEST_PORT
+
+BODY = {"items": [{"id": idx, "name": f"item {idx}"} for idx in range(100)]}
+
+
+def test_encode_body() -> None:
+    assert encode_body(None) is None
+
+    encoded = encode_body({"a": 1}, Compression.GZIP, min_bytes=1024)
+    assert encoded is not None
+    assert encoded.content == b'{"a": 1}'
+    assert encoded.headers == {"Content-Type": "application/json"}
+
+    encoded = encode_body(BODY, Compression.GZIP, min_bytes=1024)
+    assert encoded is not None
+    assert encoded.headers["Content-Encoding"] == "gzip"
+    assert loads(gzip.decompress(encoded.content)) == BODY
+    assert encoded.size == len(dumps(BODY)) > len(encoded.content)
+    # the same body always encodes the same
+    assert encode_body(BODY, Compression.GZIP, min_bytes=1024) == encoded
+
+
+def test_plan_encodes_once() -> None:
+    plan = CallPlan(host=TEST_HOST, port=TEST_PORT, method=HTTPMethod.POST, body=BODY)
+    first, second = plan.render(), plan.render()
+    assert first.encoded is not None and first.encoded is second.encoded
+    assert first.send_headers({"X-Tenant": "a"}) == {
+        "Content-Type": "application/json",
+        "X-Tenant": "a",
+    }
+    # given headers win, whatever their case
+    assert first.send_headers({"Content-Type": "application/vnd.api+json"}) == {
+        "Content-Type": "application/vnd.api+json"
+    }
+    assert first.send_headers({"content-type": "text/plain"}) == {"content-type": "text/plain"}
+    assert CallPlan(host=TEST_HOST, port=TEST_PORT).render().encoded is None
+
+
+def test_zstd_needs_zstandard() -> None:
+    try:
+        import zstandard  # noqa: F401
+
+        pytest.skip("zstandard is installed")
+    except ImportError:
+        pass
+    with pytest.raises(ValueError):
+        CallPlan(host=TEST_HOST, port=TEST_PORT, compression=Compression.ZSTD)
+
+
+def test_caller_sends_compressed_bodies_on_every_attempt() -> None:
+    caller = Caller(host=TEST_HOST, port=TEST_PORT, insecure=True)
+    responses = caller(
+        method=HTTPMethod.POST,
+        path="/noauth",
+        params={"echo": 1, "fails": 1, "requestId": str(uuid4())},
+        body=BODY,
+        retries=1,
+        retry_on=[500],
+        compression=Compression.GZIP,
+    )
+    assert [response.status for response in responses] == [500, 201]
+    body = responses[-1].body
+    assert isinstance(body, dict)
+    assert body["body"] == BODY
+    assert body["content_encoding"] == "gzip"
+
+
+@pytest.mark.parametrize("mode", [BodyMode.FULL, BodyMode.DISCARD])
+def test_caller_decompresses_responses(mode: BodyMode) -> None:
+    caller = Caller(host=TEST_HOST, port=TEST_PORT, insecure=True)
+    response = caller(
+        path="/noauth", params={"gzip": 1, "size": 100_000}, body_policy=BodyPolicy(mode=mode)
+    )[-1]
+    assert response.status == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert isinstance(response.body, dict)
+    if mode == BodyMode.FULL:
+        assert len(response.body["padding"]) == 100_000
+    else:
+        # counted as decoded, while streamed
+        assert response.body["bytes"] > 100_000
+
+
+def test_compression_from_mapping() -> None:
+    args = parse_entry_args(
+        {
+            "host": TEST_HOST,
+            "port": TEST_PORT,
+            "method": "post",
+            "body": BODY,
+            "compress": "gzip",
+            "compress_min_bytes": 0,
+        }
+    )
+    encoded = call_plan(args).render().encoded
+    assert encoded is not None and encoded.headers["Content-Encoding"] == "gzip"
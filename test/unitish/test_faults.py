@@ -0,0 +1,122 @@
+import asyncio
+from time import perf_counter
+from uuid import uuid4
+
+from caller.aio import AsyncCaller, AsyncSession
+from caller.body import BodyMode, BodyPolicy
+from caller.caller import Caller, FailedAPICall
+from caller.retry import RetryPolicy, RetryStrategy
+import pytest
+
+from .test_ import TEST_AIO_PORT, TEST_HOST
+
+QUICK_RETRIES = RetryPolicy(strategy=RetryStrategy.FULL_JITTER, base=0.01, max_delay=0.01)
+
+
+@pytest.fixture
+def caller() -> Caller:
+    return Caller(host=TEST_HOST, port=TEST_AIO_PORT, insecure=True)
+
+
+def test_routes_and_fails(caller: Caller) -> None:
+    request_id = str(uuid4())
+    responses = caller(
+        path="/noauth/a/b",
+        params={"fails": 2, "requestId": request_id},
+        retries=2,
+        retry_on=[500],
+        retry_policy=QUICK_RETRIES,
+    )
+    assert [response.status for response in responses] == [500, 500, 200]
+    assert responses[-1].body == {"subpath": "/a/b"}
+    count = caller(path=f"/admin/count/{request_id}")[-1].body
+    assert count == {"count": 3}
+
+    with pytest.raises(FailedAPICall) as err:
+        caller(path="/basic", fail_on=["40X"])
+    assert err.value.status == 401
+    headers = {"Authorization": "Bearer token"}
+    assert caller(path="/bearer", headers=headers)[-1].status == 200
+
+
+def test_connection_resets_are_retried(caller: Caller) -> None:
+    with pytest.raises(FailedAPICall) as err:
+        caller(path="/noauth", params={"reset": 1}, retries=1, retry_policy=QUICK_RETRIES)
+    assert [response.status for response in err.value.responses] == [0, 0]
+
+    # reset partway through the body
+    with pytest.raises(FailedAPICall) as err:
+        caller(path="/noauth", params={"size": 100_000, "reset_after": 5000})
+    assert err.value.status == 0
+
+
+def test_injected_errors_honor_retry_after(caller: Caller) -> None:
+    start = perf_counter()
+    responses = caller(
+        path="/noauth",
+        params={"error_rate": 1, "error_status": 429, "retry_after": 1},
+        retries=1,
+        retry_on=[429],
+        # servers asking for longer than max_delay aren't retried
+        retry_policy=RetryPolicy(strategy=RetryStrategy.FULL_JITTER, base=0.01, max_delay=2),
+    )
+    assert [response.status for response in responses] == [429, 429]
+    assert responses[0].headers["Retry-After"] == "1"
+    assert perf_counter() - start >= 1
+
+
+def test_latency_and_timeouts(caller: Caller) -> None:
+    response = caller(path="/noauth", params={"latency": "100-150"})[-1]
+    assert response.status == 200 and 0.1 <= response.duration < 1
+
+    with pytest.raises(FailedAPICall) as err:
+        caller(path="/noauth", params={"latency": 500}, timeout=0.1)
+    assert err.value.status == 0
+
+    with pytest.raises(FailedAPICall) as err:
+        caller(path="/noauth", params={"latency": "nope"}, fail_on=["40X"])
+    assert err.value.status == 400
+
+
+@pytest.mark.parametrize("mode", [BodyMode.FULL, BodyMode.DISCARD])
+def test_slow_chunked_bodies(caller: Caller, mode: BodyMode) -> None:
+    response = caller(
+        path="/noauth",
+        params={"size": 10_000, "chunked": 1000, "chunk_delay": 10},
+        body_policy=BodyPolicy(mode=mode),
+    )[-1]
+    assert response.status == 200
+    assert response.headers["Transfer-Encoding"] == "chunked"
+    # eleven chunks, ten waits between them
+    assert response.timings is not None and response.timings.total is not None
+    assert response.timings.total >= 0.1
+    assert isinstance(response.body, dict)
+    if mode == BodyMode.FULL:
+        assert len(response.body["padding"]) == 10_000
+    else:
+        assert response.body["bytes"] == 10_030
+
+
+def test_large_payloads(caller: Caller) -> None:
+    response = caller(
+        path="/noauth",
+        params={"size": 50_000_000},
+        body_policy=BodyPolicy(mode=BodyMode.DISCARD),
+    )[-1]
+    assert response.status == 200
+    assert isinstance(response.body, dict) and response.body["bytes"] == 50_000_030
+
+
+def test_concurrent_calls_under_latency() -> None:
+    async def run() -> float:
+        async with AsyncSession(max_concurrency=100) as session:
+            caller = AsyncCaller(host=TEST_HOST, port=TEST_AIO_PORT, insecure=True, session=session)
+            start = perf_counter()
+            results = await asyncio.gather(
+                *(caller(path="/noauth", params={"latency": 200}) for _ in range(100))
+            )
+            assert all(responses[-1].status == 200 for responses in results)
+            return perf_counter() - start
+
+    # delays don't hold up other connections
+    assert asyncio.run(run()) < 2
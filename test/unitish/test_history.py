@@ -0,0 +1,176 @@
+from pathlib import Path
+import sqlite3
+from typing import List
+
+from caller import history
+from caller.breaker import BreakerConfig, BreakerRegistry
+from caller.caller import Caller, CallPlan, FailedAPICall, HTTPMethod, HTTPResponse
+from caller.history import enable_history, HistoryStore, parse_period, query, target_name
+from caller.retry import RetryPolicy, RetryStrategy
+import pytest
+
+from .test_ import TEST_HOST, TEST_PORT
+
+
+def plan(path: str = "/users/1") -> CallPlan:
+    return CallPlan(method=HTTPMethod.GET, host="example.com", port=443, path=path)
+
+
+def responses(*statuses: int, duration: float = 0.1) -> List[HTTPResponse]:
+    return [
+        HTTPResponse(duration=duration, status=status, headers={}, body="") for status in statuses
+    ]
+
+
+def rows(path: Path) -> int:
+    with sqlite3.connect(path) as db:
+        return int(db.execute("SELECT count(*) FROM attempts").fetchone()[0])
+
+
+@pytest.mark.parametrize(
+    "value, seconds",
+    [("90", 90), ("90s", 90), ("15m", 900), ("1.5h", 5400), ("7d", 604800), ("2w", 1209600)],
+)
+def test_parse_period(value: str, seconds: float) -> None:
+    assert parse_period(value) == seconds
+
+
+@pytest.mark.parametrize("value", ["", "d", "7y", "-1d", "1d2h"])
+def test_parse_period_invalid(value: str) -> None:
+    with pytest.raises(ValueError):
+        parse_period(value)
+
+
+def test_target_name_uses_path_template() -> None:
+    assert target_name(plan("/users/42")) == "GET example.com:443/users/:id"
+
+
+def test_records_in_batches(tmp_path: Path) -> None:
+    path = tmp_path / "history.db"
+    store = HistoryStore(str(path), batch_size=3, flush_interval=3600)
+    store.record(plan(), responses(200), "succeeded")
+    store.record(plan(), responses(503), "failed")
+    assert rows(path) == 0
+
+    store.record(plan(), responses(503, 200), "succeeded")
+    assert rows(path) == 4
+
+    store.record(plan(), responses(200), "succeeded")
+    store.close()
+    assert rows(path) == 5
+
+
+def test_query_summarizes_each_target(tmp_path: Path) -> None:
+    path = str(tmp_path / "history.db")
+    store = HistoryStore(path)
+    for idx in range(10):
+        store.record(plan("/users/1"), responses(200, duration=0.1), "succeeded", finished=[idx])
+    store.record(plan("/users/2"), responses(503, 0, 200), "succeeded", finished=[5, 5.5, 6])
+    store.record(plan("/users/3"), responses(503, 503), "failed", finished=[6, 6])
+    store.record(plan("/orders"), responses(200, duration=2.0), "succeeded", finished=[7])
+    store.close()
+
+    summaries = {summary["target"]: summary for summary in query(path)}
+    assert list(summaries) == ["GET example.com:443/orders", "GET example.com:443/users/:id"]
+
+    users = summaries["GET example.com:443/users/:id"]
+    assert users["attempts"] == 15
+    assert users["calls"] == 12
+    assert users["error_rate"] == round(4 / 15, 4)
+    assert users["failure_rate"] == round(1 / 12, 4)
+    assert users["latency"]["p50"] == pytest.approx(0.1, rel=0.1)
+
+    orders = summaries["GET example.com:443/orders"]
+    assert orders["latency"]["p99"] == pytest.approx(2.0, rel=0.1)
+
+    # filtered by time and target
+    [users] = query(path, since=5, until=7, target="users")
+    assert users["calls"] == 4
+    assert list(query(path, since=100)) == []
+
+
+def test_query_trend(tmp_path: Path) -> None:
+    path = str(tmp_path / "history.db")
+    store = HistoryStore(path)
+    for ts in (0, 30, 60, 90, 150):
+        store.record(plan(), responses(200 if ts < 60 else 500), "succeeded", finished=[ts])
+    store.close()
+
+    [summary] = query(path, bucket=60)
+    trend = summary["trend"]
+    assert [bucket["start"] for bucket in trend] == [
+        "1970-01-01T00:00:00+00:00",
+        "1970-01-01T00:01:00+00:00",
+        "1970-01-01T00:02:00+00:00",
+    ]
+    assert [bucket["attempts"] for bucket in trend] == [2, 2, 1]
+    assert [bucket["error_rate"] for bucket in trend] == [0.0, 1.0, 1.0]
+    assert "trend" not in next(query(path))
+
+
+def test_caller_records_attempts(tmp_path: Path) -> None:
+    path = str(tmp_path / "history.db")
+    store = HistoryStore(path)
+    caller = Caller(host=TEST_HOST, port=TEST_PORT, insecure=True, history=store)
+    caller(path="/noauth")
+    store.close()
+
+    [summary] = query(path)
+    assert summary["target"] == f"GET {TEST_HOST}:{TEST_PORT}/noauth"
+    assert summary["calls"] == 1
+    assert summary["failure_rate"] == 0.0
+
+
+def test_calls_without_attempts_get_a_row(tmp_path: Path) -> None:
+    path = str(tmp_path / "history.db")
+    store = HistoryStore(path)
+    store.record(plan(), responses(503), "failed", finished=[0])
+    store.record(plan(), [], "rejected")
+    store.close()
+
+    [summary] = query(path)
+    assert summary["attempts"] == 1 and summary["calls"] == 2
+    assert summary["failure_rate"] == 1.0
+
+
+def test_caller_records_each_attempt_and_rejections(tmp_path: Path) -> None:
+    path = str(tmp_path / "history.db")
+    store = HistoryStore(path)
+    breakers = BreakerRegistry(BreakerConfig(failure_threshold=2, reset_timeout=60))
+    caller = Caller(host=TEST_HOST, port=TEST_PORT, insecure=True, history=store, breakers=breakers)
+    for _ in range(2):
+        with pytest.raises(FailedAPICall):
+            caller(
+                path="/noauth",
+                params={"status": 503},
+                retries=1,
+                retry_on=["50X"],
+                fail_on=["50X"],
+                retry_policy=RetryPolicy(strategy=RetryStrategy.FULL_JITTER, base=0.2),
+            )
+    store.close()
+
+    with sqlite3.connect(path) as db:
+        attempts = list(db.execute("SELECT ts, attempt, outcome FROM attempts ORDER BY rowid"))
+    # the circuit opens after the first call's two attempts, which finish apart
+    assert [(attempt, outcome) for _, attempt, outcome in attempts] == [
+        (1, "failed"),
+        (2, "failed"),
+        (0, "rejected"),
+    ]
+    assert attempts[0][0] < attempts[1][0]
+
+
+def test_enabling_another_file_closes_the_previous_store(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(history, "_DEFAULT_HISTORY", None)
+    first = enable_history(str(tmp_path / "first.db"))
+    first.record(plan(), responses(200), "succeeded")
+    assert enable_history(str(tmp_path / "first.db")) is first
+
+    second = enable_history(str(tmp_path / "second.db"))
+    assert rows(tmp_path / "first.db") == 1
+    with pytest.raises(sqlite3.ProgrammingError):
+        first._db.execute("SELECT 1")
+    second.close()
@@ -0,0 +1,109 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from threading import Barrier
+from time import perf_counter
+from typing import List
+
+from caller.aio import AsyncCaller, AsyncSession
+from caller.body import BodyMode, BodyPolicy
+from caller.caller import Caller, FailedAPICall, HTTPMethod, HTTPResponse
+from caller.encoding import Compression
+from caller.http2 import HTTP2Pool
+import pytest
+
+from .test_ import TEST_H2_PORT, TEST_HOST, TEST_PORT
+
+pytest.importorskip("h2")
+
+
+def test_caller_speaks_http2() -> None:
+    pool = HTTP2Pool(h2c=True)
+    caller = Caller(host=TEST_HOST, port=TEST_H2_PORT, insecure=True, http2=pool)
+
+    response = caller(path="/noauth/things", params={"size": 100_000})[-1]
+    assert response.status == 200
+    assert isinstance(response.body, dict) and response.body["subpath"] == "/things"
+    assert len(response.body["padding"]) == 100_000
+
+    # stream-level timings; connection phases only for the stream that connected
+    assert response.timings is not None
+    assert response.timings.ttfb is not None and response.timings.body is not None
+    assert response.timings.total is not None and response.timings.total >= response.timings.ttfb
+    response = caller(path="/noauth")[-1]
+    assert response.timings is not None and response.timings.connect == 0.0
+
+    assert caller(method=HTTPMethod.HEAD, path="/noauth")[-1].status == 200
+    response = caller(
+        method=HTTPMethod.POST,
+        path="/noauth",
+        params={"echo": 1},
+        body={"a": "x" * 2000},
+        compression=Compression.GZIP,
+    )[-1]
+    assert response.status == 201
+    assert isinstance(response.body, dict) and response.body["content_encoding"] == "gzip"
+    assert response.body["body"] == {"a": "x" * 2000}
+    pool.close()
+
+
+def test_caller_multiplexes_concurrent_calls() -> None:
+    pool = HTTP2Pool(h2c=True)
+    caller = Caller(host=TEST_HOST, port=TEST_H2_PORT, insecure=True, http2=pool)
+    barrier = Barrier(10)
+
+    def one(_: int) -> List[HTTPResponse]:
+        barrier.wait()
+        return caller(path="/noauth", params={"wait": 1})
+
+    start = perf_counter()
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        results = list(executor.map(one, range(10)))
+    assert [responses[-1].status for responses in results] == [200] * 10
+    assert perf_counter() - start < 5
+    assert pool.stats() == {f"http://{TEST_HOST}:{TEST_H2_PORT}": {"connections": 1, "streams": 10}}
+    pool.close()
+
+
+def test_caller_http2_streams_bodies() -> None:
+    pool = HTTP2Pool(h2c=True)
+    caller = Caller(host=TEST_HOST, port=TEST_H2_PORT, insecure=True, http2=pool)
+    policy = BodyPolicy(mode=BodyMode.DISCARD)
+    response = caller(path="/noauth", params={"size": 50_000}, body_policy=policy)[-1]
+    assert response.status == 200
+    assert isinstance(response.body, dict) and response.body["bytes"] > 50_000
+    pool.close()
+
+
+def test_caller_http2_failures_are_status_0() -> None:
+    pool = HTTP2Pool(h2c=True)
+    caller = Caller(host=TEST_HOST, port=1, insecure=True, http2=pool)
+    with pytest.raises(FailedAPICall) as err:
+        caller(path="/noauth")
+    assert err.value.status == 0
+    body = err.value.responses[-1].body
+    assert isinstance(body, dict) and body["error"] == "ConnectError"
+    pool.close()
+
+
+def test_async_session_http2() -> None:
+    async def run() -> List[List[HTTPResponse]]:
+        async with AsyncSession(http2=True, h2c=True) as session:
+            caller = AsyncCaller(host=TEST_HOST, port=TEST_H2_PORT, insecure=True, session=session)
+            return list(await asyncio.gather(*[caller(path="/noauth") for _ in range(5)]))
+
+    results = asyncio.run(run())
+    assert [responses[-1].status for responses in results] == [200] * 5
+
+
+def test_plain_http_stays_http1_without_h2c() -> None:
+    pool = HTTP2Pool()
+    caller = Caller(host=TEST_HOST, port=TEST_PORT, insecure=True, http2=pool)
+    assert caller(path="/noauth")[-1].status == 200
+    pool.close()
+
+    async def run() -> List[HTTPResponse]:
+        async with AsyncSession(http2=True) as session:
+            caller = AsyncCaller(host=TEST_HOST, port=TEST_PORT, insecure=True, session=session)
+            return await caller(path="/noauth")
+
+    assert asyncio.run(run())[-1].status == 200
@@ -0,0 +1,134 @@
+import argparse
+from datetime import datetime
+from pathlib import Path
+from threading import Event, Lock
+from typing import Callable, List, Tuple
+from zoneinfo import ZoneInfo
+
+from caller.lease import Coordinator, SQLiteLeaseBackend
+from caller.schedule import ConcurrencyPolicy, CronExpression, Schedule, Scheduler
+
+START = datetime(2024, 1, 1, tzinfo=ZoneInfo("Etc/UTC")).timestamp()
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = START
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def replicas(path: Path, clock: Clock, count: int = 2) -> List[Coordinator]:
+    return [
+        Coordinator(SQLiteLeaseBackend(str(path)), shards=8, ttl=15, holder=f"r{idx}", clock=clock)
+        for idx in range(count)
+    ]
+
+
+def test_replicas_split_shards(tmp_path: Path) -> None:
+    clock = Clock()
+    first, second = replicas(tmp_path / "leases.db", clock)
+    assert first.rebalance() == set(range(8))
+    # the first to join takes everything, then gives up half as the second joins
+    assert second.rebalance() == set()
+    clock.now += 5
+    first.rebalance()
+    assert len(second.rebalance()) == 4
+    assert first.owned() | second.owned() == set(range(8))
+    assert not first.owned() & second.owned()
+
+
+def test_shards_of_dead_replicas_are_taken_over(tmp_path: Path) -> None:
+    clock = Clock()
+    first, second = replicas(tmp_path / "leases.db", clock)
+    for _ in range(2):
+        first.rebalance()
+        second.rebalance()
+        clock.now += 5
+    taken = second.owned()
+    assert len(taken) == 4
+
+    # the second stops renewing; the first takes its shards once they expire
+    clock.now += 5
+    assert first.rebalance() == set()
+    clock.now += 10
+    assert second.owned() == set()
+    assert first.rebalance() == taken
+    assert first.owned() == set(range(8))
+
+
+def test_leaving_hands_over_at_once(tmp_path: Path) -> None:
+    clock = Clock()
+    first, second = replicas(tmp_path / "leases.db", clock)
+    first.rebalance()
+    first.close()
+    assert second.rebalance() == set(range(8))
+
+
+def test_ticks_are_claimed_once(tmp_path: Path) -> None:
+    clock = Clock()
+    first, second = replicas(tmp_path / "leases.db", clock)
+    first.rebalance()
+    second.rebalance()
+    assert first.claim("a", START + 60)
+    # by the owner only, once, and only forward
+    assert not second.claim("a", START + 60)
+    assert not first.claim("a", START + 60)
+    assert not first.claim("a", START)
+    assert first.fired(["a", "b"]) == {"a": START + 60}
+
+    # an owner whose lease lapsed can't claim
+    clock.now += 20
+    assert not first.claim("a", START + 120)
+
+
+def make_schedule(name: str) -> Schedule:
+    return Schedule(
+        name=name,
+        cron=CronExpression.parse("* * * * *"),
+        args=argparse.Namespace(name=name),
+        concurrency=ConcurrencyPolicy.ALLOW,
+        starting_deadline_seconds=300,
+    )
+
+
+def test_schedulers_fire_each_tick_once(tmp_path: Path) -> None:
+    clock = Clock()
+    fired: List[Tuple[str, str, float]] = []
+    lock = Lock()
+
+    def executor(holder: str) -> Callable[[argparse.Namespace, Event], None]:
+        def execute(args: argparse.Namespace, cancel: Event) -> None:
+            with lock:
+                fired.append((holder, args.name, clock()))
+
+        return execute
+
+    schedules = [make_schedule(f"schedule-{idx}") for idx in range(20)]
+    first, second = (
+        Scheduler(schedules, executor(coordinator.holder), clock=clock, coordinator=coordinator)
+        for coordinator in replicas(tmp_path / "leases.db", clock)
+    )
+
+    def run_until(end: float, schedulers: List[Scheduler]) -> None:
+        while clock.now < end:
+            clock.now += 5
+            for scheduler in schedulers:
+                scheduler.tick(clock.now)
+
+    # both up for a while, then the second dies just before a tick, which the
+    # first fires late, once the second's leases expire
+    run_until(START + 170, [first, second])
+    run_until(START + 360, [first])
+    first.stop()
+    first.run()
+    second.stop()
+    second.run()
+
+    # every tick fired once, by either replica while both were up
+    ticks = [(name, int(at - START) // 60) for _, name, at in fired]
+    assert sorted(ticks) == sorted((s.name, minute) for s in schedules for minute in range(1, 7))
+    assert {holder for holder, _, at in fired if at < START + 170} == {"r0", "r1"}
+    late = [at for _, _, at in fired if START + 180 < at < START + 240]
+    assert late and all(at <= START + 180 + 15 + 5 for at in late)
@@ -0,0 +1,78 @@
+from threading import Lock
+from time import sleep
+from typing import List
+
+from caller.__main__ import get_cli_args
+from caller.caller import FailedAPICall, HTTPResponse
+from caller.load import parse_rate, run_load
+import pytest
+
+
+def ok() -> List[HTTPResponse]:
+    return [HTTPResponse(duration=0.0, status=200, headers={}, body="")]
+
+
+@pytest.mark.parametrize(
+    "value, rate",
+    [("10", 10.0), ("10/s", 10.0), ("2.5/sec", 2.5), ("600/m", 10.0), ("3600 / h", 1.0)],
+)
+def test_parse_rate(value: str, rate: float) -> None:
+    assert parse_rate(value) == pytest.approx(rate)
+
+
+@pytest.mark.parametrize("value", ["", "0/s", "-1/s", "ten/s", "10/d"])
+def test_parse_rate_invalid(value: str) -> None:
+    with pytest.raises(ValueError):
+        parse_rate(value)
+
+
+@pytest.mark.parametrize(
+    "argv",
+    [
+        ["-u", "localhost", "--rate", "10/s"],
+        ["-u", "localhost", "--duration", "1"],
+        ["-u", "localhost", "--rate", "10/s", "--duration", "0"],
+        ["-M", "manifest.json", "--rate", "10/s", "--duration", "1"],
+    ],
+)
+def test_rate_args_invalid(argv: List[str]) -> None:
+    with pytest.raises(SystemExit):
+        get_cli_args(argv)
+
+
+def test_keeps_to_the_rate() -> None:
+    report = run_load(ok, rate=50, duration=1.0)
+    assert report.sent == report.succeeded == 50
+    assert report.failed == report.late == 0
+    assert report.statuses == {"200": 50}
+    assert report.achieved_rate == pytest.approx(50, rel=0.1)
+
+
+def test_latency_counts_time_behind_a_stall() -> None:
+    # one call stalls while only one may be in flight, holding up those due meanwhile
+    lock, calls = Lock(), [0]
+
+    def stall_once() -> List[HTTPResponse]:
+        with lock:
+            calls[0] += 1
+            first = calls[0] == 1
+        if first:
+            sleep(0.5)
+        return ok()
+
+    report = run_load(stall_once, rate=20, duration=1.0, max_in_flight=1)
+    assert report.sent == 20
+    assert report.late > 0
+    # a closed loop would only see the one slow call; the calls behind it waited too
+    assert report.service_time.percentile(90) < 0.1
+    assert report.latency.percentile(75) > 0.1
+    assert report.latency.percentile(100) >= 0.5
+
+
+def test_failures_are_counted() -> None:
+    def fail() -> List[HTTPResponse]:
+        raise FailedAPICall("failed", [HTTPResponse(duration=0.0, status=503, headers={}, body="")])
+
+    report = run_load(fail, rate=20, duration=0.5)
+    assert report.sent == report.failed == 10
+    assert report.statuses == {"503": 10}
@@ -0,0 +1,76 @@
+from io import StringIO
+from json import loads
+from os import environ
+import signal
+import subprocess
+import sys
+from time import sleep
+
+from caller.logging import BackgroundWriter
+import pytest
+
+from .test_ import TEST_AIO_PORT, TEST_HOST
+
+
+@pytest.mark.parametrize("lines", [0, 1, 5000])
+def test_background_writer_writes_every_line_in_order(lines: int) -> None:
+    stream = StringIO()
+    writer = BackgroundWriter(stream, max_queued=100, max_batch=64)
+    for idx in range(lines):
+        writer.write(str(idx))
+    writer.flush()
+    assert stream.getvalue().splitlines() == [str(idx) for idx in range(lines)]
+    writer.close()
+    assert not writer._thread.is_alive()
+
+
+def run_logging(**env: str) -> list:
+    script = (
+        "from caller.logging import getLogger\n"
+        "log = getLogger('test')\n"
+        "log.debug('hidden')\n"
+        "for idx in range(1000):\n"
+        "    log.info('line %s', idx)\n"
+    )
+    stdout = subprocess.run(
+        [sys.executable, "-c", script],
+        capture_output=True,
+        text=True,
+        check=True,
+        env={**environ, "DD_TRACE_ENABLED": "false", **env},
+    ).stdout
+    return [loads(line) for line in stdout.splitlines()]
+
+
+@pytest.mark.parametrize(
+    "env, callsite",
+    [
+        ({}, True),
+        ({"LOG_CALLSITE": "false"}, False),
+        ({"LOG_MODE": "fast"}, False),
+        ({"LOG_MODE": "fast", "LOG_CALLSITE": "true"}, True),
+    ],
+)
+def test_logging_modes(env: dict, callsite: bool) -> None:
+    records = run_logging(**env)
+    # everything is written by exit, in order, and nothing below the level is
+    assert [record["event"] for record in records] == [f"line {idx}" for idx in range(1000)]
+    assert {record["level"] for record in records} == {"info"}
+    assert {record["logger"] for record in records} == {"test"}
+    assert ("lineno" in records[0]) is callsite
+
+
+def test_fast_logs_are_flushed_on_sigterm() -> None:
+    process = subprocess.Popen(
+        [sys.executable, "-m", "caller", "-u", TEST_HOST, "-p", str(TEST_AIO_PORT), "-k"]
+        + ["-l", "/noauth", "-q", "latency=5000"],
+        stdout=subprocess.PIPE,
+        text=True,
+        env={**environ, "DD_TRACE_ENABLED": "false", "LOG_MODE": "fast"},
+    )
+    sleep(1)
+    process.terminate()
+    stdout, _ = process.communicate(timeout=10)
+    assert process.returncode == 128 + signal.SIGTERM
+    events = [loads(line)["event"] for line in stdout.splitlines()]
+    assert events == ["Making request", "Terminated"]
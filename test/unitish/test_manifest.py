@@ -0,0 +1,135 @@
+import argparse
+from json import dumps
+import os
+from pathlib import Path
+from typing import Any, Dict, List
+
+from caller.__main__ import call, parse_entry_args
+from caller.caller import HTTPResponse
+from caller.manifest import (
+    exit_code,
+    load_manifest,
+    ManifestEntry,
+    run_manifest,
+    run_manifest_processes,
+    shard_entries,
+    shard_of,
+)
+import pytest
+import yaml
+
+from .test_ import TEST_HOST, TEST_PORT
+
+TARGETS: List[Dict[str, Any]] = [
+    {"name": "ok", "host": TEST_HOST, "port": TEST_PORT, "path": "/noauth", "insecure": True},
+    {
+        "name": "created",
+        "host": TEST_HOST,
+        "port": TEST_PORT,
+        "path": "/noauth",
+        "method": "post",
+        "body": {"key": "value"},
+        "insecure": True,
+    },
+    {
+        "args": ["--host", TEST_HOST, "--port", str(TEST_PORT), "--path", "/noauth", "--insecure"],
+    },
+]
+
+FAILING = {
+    "name": "unavailable",
+    "host": TEST_HOST,
+    "port": TEST_PORT,
+    "path": "/noauth",
+    "params": {"status": 503},
+    "insecure": True,
+}
+
+
+@pytest.mark.parametrize("suffix", [".json", ".jsonl", ".yaml"])
+def test_load_manifest(tmp_path: Path, suffix: str) -> None:
+    path = tmp_path / f"manifest{suffix}"
+    if suffix == ".jsonl":
+        path.write_text("\n".join(dumps(target) for target in TARGETS))
+    elif suffix == ".yaml":
+        path.write_text(yaml.safe_dump({"targets": TARGETS}))
+    else:
+        path.write_text(dumps(TARGETS))
+
+    entries = load_manifest(str(path), parse_entry_args)
+    assert [entry.name for entry in entries] == ["ok", "created", "entry-2"]
+    assert entries[1].args.method == "post"
+    assert entries[1].args.body == {"key": "value"}
+    assert entries[2].args.insecure
+
+
+def test_run_manifest(tmp_path: Path) -> None:
+    path = tmp_path / "manifest.json"
+    path.write_text(dumps(TARGETS * 4 + [FAILING]))
+
+    results = run_manifest(load_manifest(str(path), parse_entry_args), call, workers=3)
+    assert [result.status for result in results] == [200, 201, 200] * 4 + [503]
+    assert [result.succeeded for result in results] == [True] * 12 + [False]
+    assert exit_code(results) == 1
+    assert exit_code(results[:-1]) == 0
+
+
+def test_manifest_entries_cant_nest(tmp_path: Path) -> None:
+    path = tmp_path / "manifest.json"
+    path.write_text(dumps([["--manifest", "other.json"]]))
+    with pytest.raises(ValueError):
+        load_manifest(str(path), parse_entry_args)
+
+
+def test_shard_of_is_consistent() -> None:
+    origins = [(f"host-{idx}.example.com", 443) for idx in range(500)]
+    before = [shard_of(host, port, 4) for host, port in origins]
+    assert before == [shard_of(host, port, 4) for host, port in origins]
+    assert set(before) == {0, 1, 2, 3}
+
+    # adding a shard only moves origins onto it
+    after = [shard_of(host, port, 5) for host, port in origins]
+    moved = [(a, b) for a, b in zip(before, after) if a != b]
+    assert moved and all(b == 4 for _, b in moved)
+    assert len(moved) < len(origins) / 3
+
+
+def test_shard_entries_by_origin() -> None:
+    entries = [
+        ManifestEntry(name=str(idx), args=parse_entry_args({"host": host, "port": 8080}))
+        for idx, host in enumerate(["a.example.com", "b.example.com"] * 10)
+    ]
+    shards = shard_entries(entries, 3)
+    assert sorted(idx for shard in shards for idx, _ in shard) == list(range(20))
+    # all of an origin's entries are in one shard
+    for host in ("a.example.com", "b.example.com"):
+        assert sum(any(entry.args.host == host for _, entry in shard) for shard in shards) == 1
+
+
+def test_run_manifest_processes(tmp_path: Path) -> None:
+    path = tmp_path / "manifest.json"
+    targets = [{**target, "host": host} for host in (TEST_HOST, "127.0.0.1") for target in TARGETS]
+    path.write_text(dumps(targets * 2 + [FAILING]))
+    entries = load_manifest(str(path), parse_entry_args)
+
+    indexed = dict(run_manifest_processes(entries, call, processes=2, workers=2))
+    assert sorted(indexed) == list(range(len(entries)))
+    results = [indexed[idx] for idx in range(len(entries))]
+    assert [result.status for result in results] == [200, 201, 200] * 4 + [503]
+    assert all(result.duration > 0 for result in results)
+    assert exit_code(results) == 1
+
+
+def crash(args: argparse.Namespace) -> List[HTTPResponse]:
+    os._exit(3)
+
+
+def test_run_manifest_processes_worker_dies(tmp_path: Path) -> None:
+    path = tmp_path / "manifest.json"
+    path.write_text(dumps(TARGETS))
+    entries = load_manifest(str(path), parse_entry_args)
+
+    results = [result for _, result in run_manifest_processes(entries, crash, processes=2)]
+    assert len(results) == 3
+    assert not any(result.succeeded for result in results)
+    assert results[0].error == "worker exited with code 3"
@@ -0,0 +1,93 @@
+from pathlib import Path
+from urllib.request import urlopen
+from uuid import uuid4
+
+from caller.caller import Caller, CallPlan, FailedAPICall, HTTPResponse
+from caller.metrics import CallMetrics, OVERFLOW, path_template
+import pytest
+
+from .test_ import TEST_HOST, TEST_PORT
+
+
+@pytest.mark.parametrize(
+    "path,template",
+    [
+        (None, "/"),
+        ("/users/${USER_ID}/orders", "/users/${USER_ID}/orders"),
+        ("users/1234/orders/", "/users/:id/orders"),
+        ("/items/3f2b8e4c-1d2a-4f5b-9c8d-7e6f5a4b3c2d", "/items/:id"),
+        ("/blobs/0123456789abcdef0123", "/blobs/:id"),
+        ("/v2/status", "/v2/status"),
+    ],
+)
+def test_path_template(path: str, template: str) -> None:
+    assert path_template(path) == template
+
+
+def test_metrics_count_calls_attempts_and_retries() -> None:
+    metrics = CallMetrics()
+    caller = Caller(host=TEST_HOST, port=TEST_PORT, insecure=True, metrics=metrics)
+    caller(
+        path="/noauth/1",
+        params={"fails": 1, "requestId": str(uuid4())},
+        retries=1,
+        retry_on=["50X"],
+    )
+    with pytest.raises(FailedAPICall):
+        caller(path="/noauth/2", params={"status": 503}, fail_on=["50X"])
+
+    text = metrics.expose()
+    labels = f'host="{TEST_HOST}",path="/noauth/:id",method="get"'
+    assert f'caller_calls_total{{{labels},outcome="succeeded"}} 1' in text
+    assert f'caller_calls_total{{{labels},outcome="failed"}} 1' in text
+    assert f'caller_attempts_total{{{labels},status_class="5xx"}} 2' in text
+    assert f'caller_attempts_total{{{labels},status_class="2xx"}} 1' in text
+    assert f"caller_retries_total{{{labels}}} 1" in text
+    assert f'caller_call_duration_seconds_bucket{{{labels},le="+Inf"}} 2' in text
+    assert f"caller_attempt_duration_seconds_count{{{labels}}} 3" in text
+    assert "# TYPE caller_call_duration_seconds histogram" in text
+
+
+def test_metrics_bound_cardinality() -> None:
+    metrics = CallMetrics(max_series=2)
+    response = HTTPResponse(duration=0.1, status=200, headers={}, body="")
+    for host in ("a", "b", "c", "d"):
+        plan = CallPlan(host=host, port=80)
+        metrics.observe(plan, [response], "succeeded", 0.1)
+
+    assert len(metrics.calls.series) == 3
+    assert metrics.calls.series[(OVERFLOW,) * 4] == 2
+    assert len(metrics.call_duration.series) == 3
+
+
+def test_metrics_values_keep_precision() -> None:
+    metrics = CallMetrics()
+    plan = CallPlan(host="h", port=80)
+    metrics.calls.inc(("h", "/", "get", "succeeded"), 1_234_566)
+    metrics.calls.inc(("h", "/", "get", "succeeded"))
+    metrics.call_duration.observe(("h", "/", "get"), 1234567.125)
+
+    text = metrics.expose()
+    assert 'caller_calls_total{host="h",path="/",method="get",outcome="succeeded"} 1234567' in text
+    assert 'caller_call_duration_seconds_sum{host="h",path="/",method="get"} 1234567.125' in text
+    metrics.observe(plan, [], "failed", 0.5)
+    assert 'outcome="failed"} 1\n' in metrics.expose()
+
+
+def test_metrics_textfile_and_endpoint(tmp_path: Path) -> None:
+    metrics = CallMetrics()
+    response = HTTPResponse(duration=0.1, status=0, headers={}, body="")
+    metrics.observe(CallPlan(host="h", port=80), [response], "failed", 0.1)
+
+    path = tmp_path / "caller.prom"
+    metrics.write(str(path))
+    assert path.read_text() == metrics.expose()
+
+    server = metrics.serve(0, host="127.0.0.1")
+    try:
+        port = server.server_address[1]
+        with urlopen(f"http://127.0.0.1:{port}/metrics") as scrape:
+            assert scrape.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            assert 'status_class="none"' in scrape.read().decode()
+    finally:
+        server.shutdown()
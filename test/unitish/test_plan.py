@@ -0,0 +1,50 @@
+from caller.caller import Caller, CallPlan, HTTPMethod
+import pytest
+
+from .test_ import BEARER_AUTH_HEADERS, TEST_HOST, TEST_PORT
+
+
+def test_plan_renders_once_per_environment(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("PLAN_PATH", "noauth")
+    monkeypatch.setenv("PLAN_TOKEN", "a")
+    plan = CallPlan(
+        host=TEST_HOST,
+        port=TEST_PORT,
+        insecure=True,
+        path="/${PLAN_PATH}",
+        headers={"Authorization": "Bearer $PLAN_TOKEN"},
+    )
+
+    first = plan.render()
+    assert first.url == f"http://{TEST_HOST}:{TEST_PORT}/noauth"
+    assert first.headers == {"Authorization": "Bearer a"}
+    assert plan.render() is first
+
+    # unrelated variables don't invalidate the rendered request
+    monkeypatch.setenv("PLAN_UNRELATED", "x")
+    assert plan.render() is first
+
+    monkeypatch.setenv("PLAN_TOKEN", "b")
+    second = plan.render()
+    assert second is not first
+    assert second.headers == {"Authorization": "Bearer b"}
+
+
+def test_plan_validates_up_front() -> None:
+    with pytest.raises(ValueError, match="GET requests cannot have a body"):
+        CallPlan(host=TEST_HOST, port=TEST_PORT, body={"a": 1})
+
+    plan = CallPlan(host=TEST_HOST, port=TEST_PORT, method=HTTPMethod.POST, retry_on=["50X"])
+    assert plan.render().method == "post"
+    assert plan.render().body == {}
+    assert 503 in plan.retry_matcher
+    assert 404 not in plan.retry_matcher
+
+
+def test_plan_executes_repeatedly() -> None:
+    caller = Caller(host=TEST_HOST, port=TEST_PORT, insecure=True)
+    plan = CallPlan(
+        host=TEST_HOST, port=TEST_PORT, insecure=True, path="/bearer", headers=BEARER_AUTH_HEADERS
+    )
+    for _ in range(3):
+        assert caller.execute(plan)[-1].status == 200
@@ -0,0 +1,37 @@
+from uuid import uuid4
+
+from caller.caller import Caller
+from caller.pool import PoolConfig, PoolStats, SessionPool
+
+from .test_ import TEST_HOST, TEST_PORT
+
+
+def test_pool_reuses_connections_across_attempts_and_calls() -> None:
+    pool = SessionPool(PoolConfig(pool_size=2))
+    caller = Caller(host=TEST_HOST, port=TEST_PORT, insecure=True, pool=pool)
+
+    # two failures then a success, all on one connection
+    results = caller(
+        path="/noauth",
+        params={"fails": 2, "requestId": str(uuid4())},
+        retries=2,
+        retry_on=["50X"],
+    )
+    assert [r.status for r in results] == [500, 500, 200]
+    caller(path="/noauth")
+
+    totals = pool.totals()
+    assert totals.connections_created == 1
+    assert totals.connections_reused == 3
+    assert list(pool.stats().keys()) == [f"http://{TEST_HOST}:{TEST_PORT}"]
+
+
+def test_pool_is_keyed_by_origin() -> None:
+    pool = SessionPool()
+    assert pool.session("http", "a", 80) is pool.session("http", "a", 80)
+    assert pool.session("http", "a", 80) is not pool.session("https", "a", 443)
+    assert pool.session("http", "a", 80) is not pool.session("http", "b", 80)
+
+
+def test_pool_stats_add() -> None:
+    assert PoolStats(1, 2, 3, 4) + PoolStats(1, 1, 1, 1) == PoolStats(2, 3, 4, 5)
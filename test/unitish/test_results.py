@@ -0,0 +1,100 @@
+from io import BytesIO
+from json import loads
+from typing import Any, Dict, Optional, Tuple
+
+from caller.caller import HTTPResponse
+from caller.results import json_encoder, ResultField, ResultFields, ResultWriter
+from caller.timing import Timings
+import pytest
+
+RESPONSE = HTTPResponse(
+    duration=0.25,
+    status=200,
+    headers={"Content-Type": "application/json", "X-Request-Id": "abc", "Server": "test"},
+    body={"message": "x" * 100},
+    timings=Timings(ttfb=0.2, body=0.05, total=0.25),
+)
+
+
+def written(fields: ResultFields, **context: Any) -> Dict:
+    stream = BytesIO()
+    with ResultWriter(stream, fields) as writer:
+        writer.write([RESPONSE], **context)
+        assert stream.getvalue().endswith(b"\n")
+        return loads(stream.getvalue())  # type: ignore[no-any-return]
+
+
+def test_default_fields() -> None:
+    record = written(ResultFields(), entry="one")
+    assert record == {
+        "entry": "one",
+        "responses": [
+            {
+                "status": 200,
+                "duration": 0.25,
+                "headers": RESPONSE.headers,
+                "body": RESPONSE.body,
+            }
+        ],
+    }
+
+
+@pytest.mark.parametrize(
+    "fields, expected",
+    [
+        ((ResultField.STATUS,), {"status": 200}),
+        ((ResultField.DURATION, ResultField.STATUS), {"duration": 0.25, "status": 200}),
+        (
+            (ResultField.TIMINGS,),
+            {
+                "timings": {
+                    "dns": 0.0,
+                    "connect": 0.0,
+                    "tls": 0.0,
+                    "ttfb": 0.2,
+                    "body": 0.05,
+                    "total": 0.25,
+                }
+            },
+        ),
+    ],
+)
+def test_field_selection(fields: Tuple[ResultField, ...], expected: Dict) -> None:
+    assert written(ResultFields(fields=fields))["responses"] == [expected]
+
+
+@pytest.mark.parametrize(
+    "headers, expected",
+    [
+        (None, RESPONSE.headers),
+        ((), {}),
+        (
+            ("content-type", "X-REQUEST-ID"),
+            {"Content-Type": "application/json", "X-Request-Id": "abc"},
+        ),
+    ],
+)
+def test_header_subset(headers: Optional[Tuple[str, ...]], expected: Dict) -> None:
+    fields = ResultFields(fields=(ResultField.HEADERS,), headers=headers)
+    assert written(fields)["responses"] == [{"headers": expected}]
+
+
+def test_body_truncation() -> None:
+    fields = ResultFields(fields=(ResultField.BODY,), max_body=20)
+    body = written(fields)["responses"][0]["body"]
+    serialized = json_encoder()(RESPONSE.body).decode()
+    assert body == {"truncated": True, "length": len(serialized), "content": serialized[:20]}
+
+    # bodies within the limit are written as they are
+    fields = ResultFields(fields=(ResultField.BODY,), max_body=1000)
+    assert written(fields)["responses"][0]["body"] == RESPONSE.body
+
+
+def test_select_shares_values() -> None:
+    selected = ResultFields().select(RESPONSE, json_encoder())
+    assert selected["headers"] is RESPONSE.headers
+    assert selected["body"] is RESPONSE.body
+
+
+def test_repr_is_json() -> None:
+    assert loads(repr(RESPONSE))["body"] == RESPONSE.body
@@ -0,0 +1,105 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from time import monotonic, sleep
+from typing import Dict, List, Optional
+from uuid import uuid4
+
+from caller.caller import CallAttempts, Caller, CallPlan, FailedAPICall
+from caller.metrics import CallMetrics
+from caller.retry import retry_after_seconds, RetryBudget, RetryPolicy, RetryStrategy
+import pytest
+
+from .test_ import TEST_HOST, TEST_PORT
+
+NOW = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize(
+    "headers,expected",
+    [
+        ({}, None),
+        ({"Retry-After": "3"}, 3.0),
+        ({"retry-after": "-3"}, 0.0),
+        ({"RateLimit-Reset": "7"}, 7.0),
+        ({"Retry-After": "2", "RateLimit-Reset": "7"}, 2.0),
+        ({"Retry-After": format_datetime(NOW + timedelta(seconds=30), usegmt=True)}, 30.0),
+        ({"Retry-After": "soon"}, None),
+    ],
+)
+def test_retry_after_seconds(headers: Dict[str, str], expected: Optional[float]) -> None:
+    assert retry_after_seconds(headers, now=NOW) == expected
+
+
+@pytest.mark.parametrize("strategy", list(RetryStrategy))
+def test_backoff_stays_in_bounds(strategy: RetryStrategy) -> None:
+    policy = RetryPolicy(strategy=strategy, base=1.0, max_delay=10.0)
+    previous = policy.base
+    for attempt in range(8):
+        delay = policy.backoff(attempt, previous)
+        assert 0 <= delay <= 10.0
+        if strategy == RetryStrategy.EXPONENTIAL:
+            assert delay >= min(2.0**attempt, 10.0)
+        if strategy == RetryStrategy.DECORRELATED_JITTER:
+            assert delay >= policy.base
+        previous = delay
+
+
+def test_budget_shrinks_timeouts_and_gives_up() -> None:
+    now: List[float] = [0.0]
+    budget = RetryBudget(
+        RetryPolicy(strategy=RetryStrategy.EXPONENTIAL, deadline=10.0), clock=lambda: now[0]
+    )
+    assert budget.timeout(60.0) == 10.0
+
+    now[0] = 4.0
+    assert budget.timeout(60.0) == 6.0
+    assert budget.timeout(1.0) == 1.0
+    delay = budget.delay(0, {})
+    assert delay is not None and 1.0 <= delay <= 1.5
+
+    # waiting longer than what's left of the deadline isn't worth it
+    assert budget.delay(0, {"Retry-After": "6"}) is None
+    # once it has passed, no attempt is worth making
+    now[0] = 10.0
+    assert budget.timeout(60.0) is None
+
+
+def test_budget_honors_retry_after() -> None:
+    budget = RetryBudget(RetryPolicy(strategy=RetryStrategy.FULL_JITTER, max_delay=30.0))
+    assert budget.delay(0, {"Retry-After": "20"}) == 20.0
+    # asking for more than the longest delay is asking not to retry
+    assert budget.delay(0, {"Retry-After": "40"}) is None
+
+    ignoring = RetryBudget(RetryPolicy(honor_retry_after=False, base=0.1))
+    delay = ignoring.delay(0, {"Retry-After": "40"})
+    assert delay is not None and delay < 1.0
+
+
+def test_caller_retries_within_deadline() -> None:
+    started = monotonic()
+    results = Caller(host=TEST_HOST, port=TEST_PORT, insecure=True)(
+        path="/noauth",
+        params={"fails": 5, "requestId": str(uuid4()), "retry_after": "1"},
+        retries=5,
+        retry_on=["50X"],
+        fail_on=[],
+        retry_policy=RetryPolicy(base=0.1, deadline=2.5),
+    )
+    # waits of ~1s (as asked) leave room for only a few of the 6 attempts
+    assert 2 <= len(results) <= 3
+    assert all(result.status == 500 for result in results)
+    assert monotonic() - started < 2.5
+
+
+def test_no_attempt_once_the_deadline_passes() -> None:
+    plan = CallPlan(
+        host=TEST_HOST, port=TEST_PORT, insecure=True, retry_policy=RetryPolicy(deadline=0.01)
+    )
+    metrics = CallMetrics()
+    call = CallAttempts(plan, metrics, None, None, None)
+    assert 0 < call.begin() <= 0.01
+    sleep(0.02)
+    with pytest.raises(FailedAPICall) as err:
+        call.begin()
+    assert str(err.value) == "Retry deadline passed after 0 attempt(s)"
+    assert metrics.calls.series[(TEST_HOST, "/", "get", "deadline")] == 1
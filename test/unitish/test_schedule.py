@@ -0,0 +1,130 @@
+import argparse
+from datetime import datetime
+from threading import Event
+from time import sleep
+from typing import List
+from zoneinfo import ZoneInfo
+
+from caller.__main__ import args_from_mapping, get_cli_args
+from caller.schedule import ConcurrencyPolicy, CronExpression, Schedule, Scheduler
+import pytest
+
+UTC = ZoneInfo("Etc/UTC")
+
+
+@pytest.mark.parametrize(
+    "expression, after, expected",
+    [
+        ("* * * * *", datetime(2024, 1, 1, 0, 0, 30), datetime(2024, 1, 1, 0, 1)),
+        ("*/15 * * * *", datetime(2024, 1, 1, 0, 16), datetime(2024, 1, 1, 0, 30)),
+        ("0 */6 * * *", datetime(2024, 1, 1, 7, 0), datetime(2024, 1, 1, 12, 0)),
+        ("30 9 * * mon-fri", datetime(2024, 1, 5, 10, 0), datetime(2024, 1, 8, 9, 30)),
+        ("0 0 1 jan *", datetime(2024, 3, 1), datetime(2025, 1, 1)),
+        ("0 0 29 2 *", datetime(2024, 3, 1), datetime(2028, 2, 29)),
+        ("0 0 13 * 5", datetime(2024, 1, 1), datetime(2024, 1, 5)),  # day OR weekday
+        ("@hourly", datetime(2024, 1, 1, 0, 59), datetime(2024, 1, 1, 1, 0)),
+        ("0 0 * * 7", datetime(2024, 1, 1), datetime(2024, 1, 7)),  # 7 is sunday
+    ],
+)
+def test_cron_next_after(expression: str, after: datetime, expected: datetime) -> None:
+    cron = CronExpression.parse(expression)
+    assert cron.next_after(after.replace(tzinfo=UTC)) == expected.replace(tzinfo=UTC)
+
+
+@pytest.mark.parametrize("expression", ["* * * *", "60 * * * *", "*/0 * * * *", "* * 0 * *"])
+def test_cron_invalid(expression: str) -> None:
+    with pytest.raises(ValueError):
+        CronExpression.parse(expression)
+
+
+def test_args_from_mapping() -> None:
+    argv = args_from_mapping(
+        {
+            "host": "localhost",
+            "port": 8080,
+            "path": "/noauth",
+            "params": [{"name": "status", "value": 201}],
+            "headers": {"X-Request-Id": "abc"},
+            "method": "post",
+            "body": {"key": "value"},
+            "retries": 2,
+            "retry_on": ["50X"],
+            "fail_on": ["4XX"],
+            "insecure": True,
+        }
+    )
+    # full option names, not prefixes argparse happens to accept
+    assert "--retry-on-codes" in argv and "--fail-on-codes" in argv
+    args = get_cli_args(argv)
+    assert args.host == "localhost" and args.port == 8080 and args.insecure
+    assert args.params == {"status": "201"}
+    assert args.headers == {"X-Request-Id": "abc"}
+    assert args.body == {"key": "value"}
+    assert args.retries == 2 and args.retry_on_codes == ["50X"]
+    assert args.fail_on_codes == ["4XX"]
+
+
+def make_schedule(name: str, concurrency: ConcurrencyPolicy, deadline: float = 30) -> Schedule:
+    return Schedule(
+        name=name,
+        cron=CronExpression.parse("* * * * *"),
+        args=argparse.Namespace(name=name),
+        concurrency=concurrency,
+        starting_deadline_seconds=deadline,
+    )
+
+
+@pytest.mark.parametrize(
+    "concurrency, fired, cancelled",
+    [
+        (ConcurrencyPolicy.ALLOW, 2, 0),
+        (ConcurrencyPolicy.FORBID, 1, 0),
+        (ConcurrencyPolicy.REPLACE, 2, 1),
+    ],
+)
+def test_scheduler_concurrency(concurrency: ConcurrencyPolicy, fired: int, cancelled: int) -> None:
+    release = Event()
+    cancels: List[Event] = []
+
+    def execute(args: argparse.Namespace, cancel: Event) -> None:
+        cancels.append(cancel)
+        release.wait(5)
+
+    start = datetime(2024, 1, 1, tzinfo=UTC).timestamp()
+    scheduler = Scheduler([make_schedule("a", concurrency)], execute, clock=lambda: start)
+    assert scheduler.tick(start + 61) == start + 120
+    assert scheduler.tick(start + 121) == start + 180
+    for _ in range(100):
+        if len(cancels) == fired:
+            break
+        sleep(0.01)
+
+    assert len(cancels) == fired
+    assert sum(1 for cancel in cancels if cancel.is_set()) == cancelled
+
+    release.set()
+    scheduler.stop()
+    scheduler.run()
+
+
+def test_scheduler_missed_ticks() -> None:
+    fired: List[str] = []
+
+    def execute(args: argparse.Namespace, cancel: Event) -> None:
+        fired.append(args.name)
+
+    start = datetime(2024, 1, 1, tzinfo=UTC).timestamp()
+    scheduler = Scheduler(
+        [
+            make_schedule("late", ConcurrencyPolicy.ALLOW, deadline=30),
+            make_schedule("tolerant", ConcurrencyPolicy.ALLOW, deadline=600),
+        ],
+        execute,
+        clock=lambda: start,
+    )
+    # five minutes behind: "late" skips its tick, "tolerant" runs it once
+    assert scheduler.tick(start + 300) == start + 360
+    scheduler.stop()
+    scheduler.run()
+
+    assert fired == ["tolerant"]
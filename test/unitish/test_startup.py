@@ -0,0 +1,24 @@
+import subprocess
+import sys
+
+# importing the CLI shouldn't import these; they're deferred until needed
+DEFERRED_MODULES = ["asyncio", "ddtrace", "httpx", "requests", "structlog", "urllib3"]
+
+
+def imported_by(statement: str) -> list:
+    loaded = subprocess.run(
+        [sys.executable, "-c", f"{statement}; import sys; print(' '.join(sys.modules))"],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.split()
+    return [module for module in DEFERRED_MODULES if module in loaded]
+
+
+def test_cli_import_defers_heavy_modules() -> None:
+    assert imported_by("import caller.__main__") == []
+
+
+def test_logging_configures_on_first_use() -> None:
+    statement = "from caller.logging import getLogger; getLogger('test').debug('hi')"
+    assert "structlog" in imported_by(statement)
@@ -0,0 +1,44 @@
+from dataclasses import dataclass
+import re
+from typing import List, Optional, Union
+
+from caller.caller import MAX_STATUS, StatusMatcher
+import pytest
+
+
+@dataclass
+class StatusMatcherTestCase:
+    codes: Optional[List[Union[int, str]]]
+    pattern: str
+
+
+STATUS_MATCHER_TEST_CASES = (
+    StatusMatcherTestCase(codes=None, pattern="(000)"),
+    StatusMatcherTestCase(codes=[], pattern="(000)"),
+    StatusMatcherTestCase(codes=[0, "50X"], pattern="(000|50[0-9])"),
+    StatusMatcherTestCase(codes=["4xx", 503], pattern="(4[0-9][0-9]|503)"),
+    StatusMatcherTestCase(codes=["40X", "5XX"], pattern="(40[0-9]|5[0-9][0-9])"),
+    StatusMatcherTestCase(codes=[301, 1000], pattern="(301)"),
+)
+
+
+@pytest.mark.parametrize("case", STATUS_MATCHER_TEST_CASES)
+def test_status_matcher_matches_like_the_regex(case: StatusMatcherTestCase) -> None:
+    matcher = StatusMatcher(case.codes)
+    assert matcher.pattern == case.pattern
+
+    regex = re.compile(case.pattern)
+    for status in range(MAX_STATUS):
+        assert (status in matcher) == bool(regex.match(f"{status:03d}")), status
+
+
+def test_status_matcher_out_of_range() -> None:
+    matcher = StatusMatcher(["5XX"])
+    assert 599 in matcher
+    assert 600 not in matcher
+    assert -1 not in matcher
+
+
+def test_status_matcher_rejects_other_syntax() -> None:
+    with pytest.raises(ValueError, match='invalid HTTP code value "5.."'):
+        StatusMatcher(["5.."])
@@ -0,0 +1,85 @@
+import asyncio
+from pathlib import Path
+import random
+
+from caller.aio import AsyncCaller
+from caller.caller import Caller, FailedAPICall
+from caller.pool import SessionPool
+from caller.timing import LatencyHistogram, TimingHistograms, Timings
+import pytest
+
+from .test_ import TEST_HOST, TEST_PORT
+
+
+def test_histogram_is_accurate_to_its_precision() -> None:
+    histogram = LatencyHistogram(significant_bits=8)
+    samples = sorted(random.expovariate(10) for _ in range(10_000))
+    for sample in samples:
+        histogram.record(sample)
+
+    assert histogram.count == len(samples)
+    for percent in (50, 90, 99):
+        expected = samples[int(percent / 100 * len(samples)) - 1]
+        assert histogram.percentile(percent) == pytest.approx(expected, rel=0.01, abs=2e-6)
+    assert histogram.percentile(100) >= samples[-1] - 1e-6
+
+
+def test_histograms_merge_exactly() -> None:
+    samples = [random.uniform(0, 2) for _ in range(1000)]
+    whole, first, second = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+    for idx, sample in enumerate(samples):
+        whole.record(sample)
+        (first if idx % 2 else second).record(sample)
+
+    first.merge(LatencyHistogram.from_dict(second.to_dict()))
+    assert first.counts == whole.counts
+    assert first.count == whole.count
+
+    with pytest.raises(ValueError):
+        first.merge(LatencyHistogram(significant_bits=4))
+
+
+def test_timing_histograms_accumulate_across_runs(tmp_path: Path) -> None:
+    path = str(tmp_path / "timings.json")
+    for total in (0.1, 0.2):
+        histograms = TimingHistograms()
+        histograms.record(Timings(total=total, ttfb=total / 2, dns=None))
+        histograms.save(path)
+
+    summary = TimingHistograms.load(path).summary()
+    assert summary["total"]["count"] == 2
+    assert summary["ttfb"]["max"] == pytest.approx(0.1, rel=0.01)
+    assert "dns" not in summary  # never recorded
+    assert summary["connect"]["count"] == 2
+
+
+def test_caller_records_phases() -> None:
+    caller = Caller(host=TEST_HOST, port=TEST_PORT, insecure=True, pool=SessionPool())
+    (response,) = caller(path="/noauth", params={"size": 100_000})
+
+    timings = response.timings
+    assert timings is not None and timings.total is not None
+    assert timings.ttfb is not None and timings.body is not None
+    assert timings.dns is not None and timings.connect is not None and timings.connect > 0
+    assert timings.tls == 0.0  # plain http
+    assert timings.total >= timings.connection() + timings.ttfb
+
+
+def test_failed_attempts_have_durations() -> None:
+    with pytest.raises(FailedAPICall) as err:
+        Caller(host=TEST_HOST, port=1, insecure=True)()
+    (response,) = err.value.responses
+    assert response.status == 0
+    assert response.duration > 0
+    assert response.timings is not None and response.timings.total == response.duration
+
+
+def test_async_caller_records_phases() -> None:
+    (response,) = asyncio.run(
+        AsyncCaller(host=TEST_HOST, port=TEST_PORT, insecure=True)(path="/noauth")
+    )
+    timings = response.timings
+    assert timings is not None
+    assert timings.dns is None  # httpcore resolves and connects in one step
+    assert timings.connect is not None and timings.connect > 0
+    assert timings.ttfb is not None and timings.body is not None and timings.total is not None